@@ -1,32 +1,48 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, timedelta
 from typing import Optional
 
-from app.db.session import get_db
+from app.db.session import get_read_db
 from app.core.analytics_service import AnalyticsService
+from app.utils.exceptions import ValidationError, SnapshotUnavailableError
 
 router = APIRouter()
 
 
 @router.get("/provider-utilization")
 async def get_provider_utilization(
-    days: int = Query(30, ge=1, le=365, description="Number of days to analyze"),
-    db: AsyncSession = Depends(get_db)
+    days: int = Query(30, ge=1, le=365, description="Number of days to analyze, ending today"),
+    start_date: Optional[date] = Query(None, description="Window start (overrides days)"),
+    end_date: Optional[date] = Query(None, description="Window end (default: today)"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Get provider utilization statistics.
+    Get provider utilization statistics for a date window.
     
     Returns metrics including:
+    - Scheduled minutes (from provider schedules effective in the window)
+    - Booked minutes and utilization rate
     - Total appointments
     - Completed appointments
     - No-shows and cancellations
     - Completion rate
     """
-    data = await AnalyticsService.get_provider_utilization(db, days)
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=days - 1)
+    try:
+        data = await AnalyticsService.get_provider_utilization(db, start_date=start_date, end_date=end_date)
+    except (ValidationError, SnapshotUnavailableError) as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
     return {
-        "period_days": days,
-        "providers": data
+        "period_days": (end_date - start_date).days + 1,
+        "start_date": start_date,
+        "end_date": end_date,
+        "providers": data,
+        "freshness": await AnalyticsService.get_freshness(db, "appointment_rollup")
     }
 
 
@@ -34,48 +50,79 @@ async def get_provider_utilization(
 async def get_daily_load(
     start_date: Optional[date] = Query(None, description="Start date (default: 30 days ago)"),
     end_date: Optional[date] = Query(None, description="End date (default: 30 days ahead)"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get daily appointment load statistics.
     
     Shows appointment volume and status breakdown by date.
     """
-    data = await AnalyticsService.get_daily_load(db, start_date, end_date)
+    try:
+        data = await AnalyticsService.get_daily_load(db, start_date, end_date)
+    except SnapshotUnavailableError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
     return {
         "start_date": start_date or (date.today() - timedelta(days=30)),
         "end_date": end_date or (date.today() + timedelta(days=30)),
-        "daily_stats": data
+        "daily_stats": data,
+        "freshness": await AnalyticsService.get_freshness(db, "daily_appointment_load")
     }
 
 
 @router.get("/no-shows")
 async def get_no_show_analysis(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get no-show rate analysis by month.
     
     Returns monthly statistics for the past year.
     """
-    data = await AnalyticsService.get_no_show_analysis(db)
+    try:
+        data = await AnalyticsService.get_no_show_analysis(db)
+    except SnapshotUnavailableError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
     return {
         "analysis_period": "last_12_months",
-        "monthly_stats": data
+        "monthly_stats": data,
+        "freshness": await AnalyticsService.get_freshness(db, "no_show_analysis")
     }
 
 
 @router.get("/wait-times")
 async def get_wait_time_analysis(
-    db: AsyncSession = Depends(get_db)
+    start_date: Optional[date] = Query(None, description="Window start (default: 29 days before end_date)"),
+    end_date: Optional[date] = Query(None, description="Window end (default: today)"),
+    group_by: str = Query("provider", pattern="^(provider|specialty)$", description="provider or specialty"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Get average wait time analysis per provider.
+    Get lead time and wait time percentiles per provider or specialty.
     
-    Calculates time between appointment booking and actual appointment time.
+    Returns p50/p90/p99 in minutes of:
+    - Booking lead time (booked to scheduled start)
+    - Check-in wait (checked in to visit started)
     """
-    data = await AnalyticsService.get_wait_time_analysis(db)
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=29)
+    try:
+        data = await AnalyticsService.get_wait_time_analysis(db, start_date, end_date, group_by)
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
     return {
-        "wait_times": data
+        "start_date": start_date,
+        "end_date": end_date,
+        "group_by": group_by,
+        "wait_times": data,
+        "freshness": await AnalyticsService.get_freshness(db, "appointment_timing_sketches")
     }
 
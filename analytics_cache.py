@@ -0,0 +1,213 @@
+from collections import OrderedDict, deque
+from functools import wraps
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Set, Tuple
+from datetime import date
+import asyncio
+import time
+
+from app.utils.settings_defaults import setting
+from app.db.session import replica_monitor
+
+# (start, end) of the appointment dates a cached result was computed from;
+# None on either side means open-ended
+DateRange = Tuple[Optional[date], Optional[date]]
+
+
+def ranges_overlap(a: DateRange, b: DateRange) -> bool:
+    a_start, a_end = a
+    b_start, b_end = b
+    return (
+        (a_start is None or b_end is None or a_start <= b_end)
+        and (b_start is None or a_end is None or b_start <= a_end)
+    )
+
+
+class AsyncTTLCache:
+    """
+    Bounded LRU cache of awaitable results with a per-entry TTL.
+
+    Concurrent misses for the same key share a single load (single-flight),
+    so a burst of dashboard polls after an expiry runs one query. Every
+    entry records the date range it covers; invalidate() drops the entries
+    overlapping a written range. A load that was running when an overlapping
+    invalidation arrived is returned to its callers but not stored, since
+    its query may have started before the write committed.
+
+    Loads read through get_read_db, so after a write the replica may still
+    return pre-write rows. A load is not stored while an overlapping
+    invalidation is younger than the replica's lag plus one lag check
+    interval; its callers still get the result.
+
+    The cache is per worker: writes made by other workers are only picked
+    up once the entry's TTL runs out.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (expires_at, date range, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, DateRange, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Date ranges of running loads, and the ones invalidated mid-load
+        self._loading: Dict[Hashable, DateRange] = {}
+        self._stale: Set[Hashable] = set()
+        # (monotonic time, date range) of recent invalidations, oldest first
+        self._recent: Deque[Tuple[float, DateRange]] = deque()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.replica_skips = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "replica_skips": self.replica_skips
+        }
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        date_range: DateRange,
+        loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return the cached value for `key`, loading it with `loader` on a miss."""
+        if not self.enabled:
+            return await loader()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            del self._entries[key]
+            self.expirations += 1
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            pending = asyncio.ensure_future(self._load(key, date_range, loader))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shielded so one caller being cancelled doesn't cancel the shared load
+        return await asyncio.shield(pending)
+
+    async def _load(
+        self,
+        key: Hashable,
+        date_range: DateRange,
+        loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        self._loading[key] = date_range
+        try:
+            value = await loader()
+            if key not in self._stale:
+                if self._replica_behind(date_range):
+                    self.replica_skips += 1
+                else:
+                    self._store(key, date_range, value)
+            return value
+        finally:
+            del self._loading[key]
+            self._stale.discard(key)
+
+    def _replica_behind(self, date_range: DateRange) -> bool:
+        """Whether a replica read may predate an invalidation overlapping date_range."""
+        if not replica_monitor.enabled or not replica_monitor.healthy:
+            # Reads are served by the primary
+            return False
+
+        now = time.monotonic()
+        self._prune_recent(now)
+        # Lag is only as current as the last check
+        window = replica_monitor.lag + setting("REPLICA_LAG_CHECK_SECONDS")
+        return any(
+            now - at <= window and ranges_overlap(date_range, written)
+            for at, written in self._recent
+        )
+
+    def _prune_recent(self, now: float):
+        # A healthy replica is never further behind than this
+        horizon = replica_monitor.max_lag + setting("REPLICA_LAG_CHECK_SECONDS")
+        while self._recent and now - self._recent[0][0] > horizon:
+            self._recent.popleft()
+
+    def _store(self, key: Hashable, date_range: DateRange, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, date_range, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, start: Optional[date] = None, end: Optional[date] = None):
+        """Drop entries covering any date in start..end (everything if both are None)."""
+        self.invalidations += 1
+        written = (start, end)
+        if replica_monitor.enabled:
+            now = time.monotonic()
+            self._prune_recent(now)
+            self._recent.append((now, written))
+
+        stale = [
+            key for key, (_, date_range, _) in self._entries.items()
+            if ranges_overlap(date_range, written)
+        ]
+        for key in stale:
+            del self._entries[key]
+
+        self._stale.update(
+            key for key, date_range in self._loading.items()
+            if ranges_overlap(date_range, written)
+        )
+
+
+analytics_cache = AsyncTTLCache(
+    setting("ANALYTICS_CACHE_MAX_ENTRIES"),
+    setting("ANALYTICS_CACHE_TTL_SECONDS")
+)
+
+
+def cached(
+    date_range: Callable[..., DateRange],
+    key: Optional[Callable[..., Hashable]] = None
+):
+    """
+    Cache an AnalyticsService method in analytics_cache.
+
+    `date_range` receives the same arguments as the method after `db` and
+    returns the appointment dates the result depends on, for write
+    invalidation. `key` receives them too and returns what identifies the
+    result, e.g. the resolved window, so that `days=30` and the equivalent
+    explicit dates share an entry; by default the arguments themselves.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(db, *args, **kwargs):
+            identity = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return await analytics_cache.get_or_load(
+                (func.__name__, identity),
+                date_range(*args, **kwargs),
+                lambda: func(db, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
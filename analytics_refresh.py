@@ -0,0 +1,126 @@
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncConnection
+from sqlalchemy import text
+from typing import Optional, Tuple
+from datetime import datetime, timezone
+import asyncio
+import logging
+import time
+
+from app.utils.settings_defaults import setting
+from app.db.session import engine
+from app.core.analytics_cache import analytics_cache
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_VIEWS = ('daily_appointment_load', 'no_show_analysis')
+
+# Channel notified by the statement-level appointments trigger in db.sql
+APPOINTMENTS_CHANNEL = "appointments_changed"
+
+# Session-level lock so only one worker refreshes at a time
+REFRESH_LOCK_KEY = "analytics_refresh"
+
+RECORD_REFRESH_SQL = text("""
+    INSERT INTO analytics_refresh_log (view_name, refreshed_at, duration_ms)
+    VALUES (:view_name, NOW(), :duration_ms)
+    ON CONFLICT (view_name) DO UPDATE
+    SET refreshed_at = EXCLUDED.refreshed_at, duration_ms = EXCLUDED.duration_ms
+""")
+
+
+class AnalyticsRefresher:
+    """
+    Keeps the analytics materialized views fresh.
+
+    Views are refreshed CONCURRENTLY, so dashboards keep reading the old
+    contents while a refresh runs. A refresh happens every
+    ANALYTICS_REFRESH_SECONDS, or sooner once an appointment write marks
+    the views dirty, but never more than once per
+    ANALYTICS_MIN_REFRESH_SECONDS so bursts of bookings coalesce.
+    """
+
+    def __init__(self, interval: float, min_interval: float):
+        self.interval = interval
+        self.min_interval = min_interval
+        self._dirty = asyncio.Event()
+        self.refreshes = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_refresh: Optional[datetime] = None
+
+    def stats(self) -> dict:
+        return {
+            "refreshes": self.refreshes,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "dirty": self._dirty.is_set(),
+            "last_refresh": self.last_refresh.isoformat() if self.last_refresh else None
+        }
+
+    def mark_dirty(self):
+        self._dirty.set()
+
+    async def refresh(self, views: Tuple[str, ...] = ANALYTICS_VIEWS) -> bool:
+        """Refresh `views` now; False if another worker is already refreshing."""
+        async with engine.connect() as conn:
+            locked = (await conn.execute(
+                text("SELECT pg_try_advisory_lock(hashtext(:key))"), {"key": REFRESH_LOCK_KEY}
+            )).scalar()
+            await conn.commit()
+            if not locked:
+                self.skipped += 1
+                return False
+
+            try:
+                for view in views:
+                    started = time.perf_counter()
+                    await conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+                    await conn.execute(RECORD_REFRESH_SQL, {
+                        "view_name": view,
+                        "duration_ms": round((time.perf_counter() - started) * 1000)
+                    })
+                    # Commit per view so each view's lock is held only for its own refresh
+                    await conn.commit()
+            finally:
+                await conn.execute(
+                    text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": REFRESH_LOCK_KEY}
+                )
+                await conn.commit()
+
+        self.refreshes += 1
+        self.last_refresh = datetime.now(timezone.utc)
+        # Cached view reads predate the refresh
+        analytics_cache.invalidate()
+        return True
+
+    async def run(self):
+        """Refresh loop; started from the app lifespan and cancelled on shutdown."""
+        while True:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+
+            try:
+                await self.refresh()
+            except Exception as exc:
+                self.failures += 1
+                logger.warning(f"Analytics refresh failed: {exc}")
+            await asyncio.sleep(self.min_interval)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.mark_dirty()
+
+    async def listen(self, engine: AsyncEngine) -> AsyncConnection:
+        """Mark views dirty on appointment writes from any worker; close on shutdown."""
+        conn = await engine.connect()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.add_listener(APPOINTMENTS_CHANNEL, self._on_notify)
+        return conn
+
+
+analytics_refresher = AnalyticsRefresher(
+    setting("ANALYTICS_REFRESH_SECONDS"),
+    setting("ANALYTICS_MIN_REFRESH_SECONDS")
+)
@@ -1,27 +1,332 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from typing import List, Dict
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
+
+from app.utils.settings_defaults import setting
+from app.core.analytics_cache import cached
+from app.core.analytics_snapshot import analytics_snapshotter
+from app.core.timing_sketches import TIMING_METRICS, TIMING_SKETCHES_SOURCE, SKETCH_COMPRESSION
+from app.utils.tdigest import TDigest
+from app.utils.exceptions import ValidationError
+
+ANALYTICS_ENGINES = ('views', 'rollup', 'snapshot')
+# Read once; benchmarks.py switches engines by assigning to this
+ANALYTICS_ENGINE = setting("ANALYTICS_ENGINE")
+if ANALYTICS_ENGINE not in ANALYTICS_ENGINES:
+    raise ValueError(f"Unknown analytics engine: {ANALYTICS_ENGINE}")
+
+# Longest window accepted by get_provider_utilization
+MAX_UTILIZATION_DAYS = 366
+
+# Longest window accepted by get_wait_time_analysis
+MAX_WAIT_TIME_DAYS = 366
+
+WAIT_TIME_GROUPINGS = ('provider', 'specialty')
+WAIT_TIME_PERCENTILES = (50, 90, 99)
+
+# Scheduled minutes per provider come from a closed-form count of the
+# matching weekdays, so the cost depends on the number of schedule rows,
+# not the window length. Each provider/weekday is split into segments at
+# the rows' effective-range boundaries; inside a segment the same rows
+# apply every week, and their blocks are merged into islands (as in
+# BOOK_APPOINTMENT_SQL) so overlapping rows are not counted twice.
+# Booked minutes and outcome counts are summed from appointment_rollup.
+UTILIZATION_SQL = text("""
+    WITH effective AS (
+        SELECT
+            s.provider_id,
+            s.day_of_week,
+            s.start_time,
+            s.end_time,
+            GREATEST(s.effective_from, CAST(:start_date AS date)) AS range_start,
+            LEAST(COALESCE(s.effective_until, CAST(:end_date AS date)), CAST(:end_date AS date)) AS range_end
+        FROM provider_schedules s
+        WHERE s.effective_from <= :end_date
+        AND (s.effective_until IS NULL OR s.effective_until >= :start_date)
+    ),
+    bounds AS (
+        SELECT provider_id, day_of_week, range_start AS bound FROM effective
+        UNION
+        SELECT provider_id, day_of_week, range_end + 1 FROM effective
+    ),
+    segments AS (
+        SELECT
+            provider_id,
+            day_of_week,
+            bound AS segment_start,
+            LEAD(bound) OVER (PARTITION BY provider_id, day_of_week ORDER BY bound) - 1 AS segment_end
+        FROM bounds
+    ),
+    blocks AS (
+        SELECT
+            g.provider_id,
+            g.day_of_week,
+            g.segment_start,
+            g.segment_end,
+            e.start_time,
+            e.end_time,
+            CASE WHEN e.start_time <= MAX(e.end_time) OVER (
+                PARTITION BY g.provider_id, g.day_of_week, g.segment_start
+                ORDER BY e.start_time, e.end_time
+                ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+            ) THEN 0 ELSE 1 END AS starts_island
+        FROM segments g
+        JOIN effective e
+            ON e.provider_id = g.provider_id
+            AND e.day_of_week = g.day_of_week
+            AND e.range_start <= g.segment_start
+            AND e.range_end >= g.segment_end
+    ),
+    islands AS (
+        SELECT
+            provider_id,
+            day_of_week,
+            segment_start,
+            segment_end,
+            MIN(start_time) AS start_time,
+            MAX(end_time) AS end_time
+        FROM (
+            SELECT
+                blocks.*,
+                SUM(starts_island) OVER (
+                    PARTITION BY provider_id, day_of_week, segment_start
+                    ORDER BY start_time, end_time
+                ) AS island
+            FROM blocks
+        ) AS numbered
+        GROUP BY provider_id, day_of_week, segment_start, segment_end, island
+    ),
+    scheduled AS (
+        SELECT
+            provider_id,
+            SUM(
+                EXTRACT(EPOCH FROM end_time - start_time)::INTEGER / 60 * GREATEST(
+                    0,
+                    FLOOR(
+                        (segment_end - segment_start - (day_of_week - EXTRACT(DOW FROM segment_start)::INTEGER + 7) % 7)
+                        / 7.0
+                    ) + 1
+                )
+            )::BIGINT AS scheduled_minutes
+        FROM islands
+        GROUP BY provider_id
+    ),
+    booked AS (
+        SELECT
+            provider_id,
+            SUM(booked_minutes) FILTER (WHERE status NOT IN ('cancelled', 'no_show')) AS booked_minutes,
+            SUM(appointment_count) AS total_appointments,
+            SUM(appointment_count) FILTER (WHERE status = 'completed') AS completed_appointments,
+            SUM(appointment_count) FILTER (WHERE status = 'no_show') AS no_shows,
+            SUM(appointment_count) FILTER (WHERE status = 'cancelled') AS cancellations
+        FROM appointment_rollup
+        WHERE appointment_date BETWEEN :start_date AND :end_date
+        GROUP BY provider_id
+    )
+    SELECT 
+        p.provider_id,
+        p.first_name || ' ' || p.last_name AS provider_name,
+        p.specialty,
+        COALESCE(sc.scheduled_minutes, 0) AS scheduled_minutes,
+        COALESCE(b.booked_minutes, 0) AS booked_minutes,
+        ROUND(COALESCE(b.booked_minutes, 0)::NUMERIC / NULLIF(sc.scheduled_minutes, 0) * 100, 2) AS utilization_rate,
+        COALESCE(b.total_appointments, 0) AS total_appointments,
+        COALESCE(b.completed_appointments, 0) AS completed_appointments,
+        COALESCE(b.no_shows, 0) AS no_shows,
+        COALESCE(b.cancellations, 0) AS cancellations,
+        ROUND(COALESCE(b.completed_appointments, 0)::NUMERIC / NULLIF(b.total_appointments, 0) * 100, 2) AS completion_rate
+    FROM providers p
+    LEFT JOIN scheduled sc ON sc.provider_id = p.provider_id
+    LEFT JOIN booked b ON b.provider_id = p.provider_id
+    WHERE p.is_active = TRUE
+    ORDER BY utilization_rate DESC NULLS LAST, provider_name
+""")
+
+TIMING_SKETCHES_SQL = text("""
+    SELECT
+        s.provider_id,
+        p.first_name || ' ' || p.last_name AS provider_name,
+        p.specialty,
+        s.metric,
+        s.digest
+    FROM appointment_timing_sketches s
+    JOIN providers p ON p.provider_id = s.provider_id
+    WHERE s.sketch_date BETWEEN :start_date AND :end_date
+""")
+
+ROLLUP_DAILY_LOAD_SQL = text("""
+    SELECT 
+        appointment_date,
+        SUM(appointment_count) AS total_appointments,
+        COUNT(DISTINCT provider_id) FILTER (WHERE appointment_count > 0) AS active_providers,
+        COALESCE(SUM(appointment_count) FILTER (WHERE status IN ('scheduled', 'confirmed')), 0) AS upcoming,
+        COALESCE(SUM(appointment_count) FILTER (WHERE status = 'completed'), 0) AS completed,
+        COALESCE(SUM(appointment_count) FILTER (WHERE status = 'cancelled'), 0) AS cancelled,
+        COALESCE(SUM(appointment_count) FILTER (WHERE status = 'no_show'), 0) AS no_shows
+    FROM appointment_rollup
+    WHERE appointment_date BETWEEN :start_date AND :end_date
+    GROUP BY appointment_date
+    HAVING SUM(appointment_count) > 0
+    ORDER BY appointment_date DESC
+""")
+
+ROLLUP_NO_SHOW_SQL = text("""
+    SELECT 
+        DATE_TRUNC('month', appointment_date)::DATE AS month,
+        SUM(appointment_count) AS total_appointments,
+        COALESCE(SUM(appointment_count) FILTER (WHERE status = 'no_show'), 0) AS no_shows,
+        ROUND(
+            COALESCE(SUM(appointment_count) FILTER (WHERE status = 'no_show'), 0)::NUMERIC / 
+            NULLIF(SUM(appointment_count) FILTER (WHERE status IN ('completed', 'no_show')), 0) * 100, 
+            2
+        ) AS no_show_rate
+    FROM appointment_rollup
+    WHERE appointment_date >= CURRENT_DATE - INTERVAL '1 year'
+    AND appointment_date <= CURRENT_DATE
+    GROUP BY DATE_TRUNC('month', appointment_date)
+    HAVING SUM(appointment_count) > 0
+    ORDER BY month DESC
+""")
+
+
+# Appointment dates each cached result depends on, from the same arguments
+# as the method; AppointmentService writes invalidate overlapping entries.
+# The resolved ranges also key the cache, so defaults and explicit dates
+# for the same window share an entry.
+def utilization_range(days: int = 30, start_date: date = None, end_date: date = None):
+    end_date = end_date or date.today()
+    return (start_date or end_date - timedelta(days=days - 1), end_date)
+
+
+def daily_load_range(start_date: date = None, end_date: date = None):
+    return (
+        start_date or date.today() - timedelta(days=30),
+        end_date or date.today() + timedelta(days=30)
+    )
+
+
+def no_show_range():
+    return (date.today() - timedelta(days=366), date.today())
+
+
+def wait_time_range(start_date: date = None, end_date: date = None, group_by: str = 'provider'):
+    end_date = end_date or date.today()
+    return (start_date or end_date - timedelta(days=29), end_date)
+
+
+def wait_time_key(start_date: date = None, end_date: date = None, group_by: str = 'provider'):
+    return (wait_time_range(start_date, end_date), group_by)
+
+
+def summarize_digest(digest: TDigest) -> Dict:
+    """Sample count and WAIT_TIME_PERCENTILES of a timing digest, in minutes."""
+    summary = {"count": int(digest.count)}
+    for pct in WAIT_TIME_PERCENTILES:
+        value = digest.quantile(pct / 100)
+        summary[f"p{pct}"] = round(value, 1) if value is not None else None
+    return summary
 
 
 class AnalyticsService:
-    """Business logic for analytics and reporting."""
+    """
+    Business logic for analytics and reporting.
+    
+    Utilization is always computed for the requested window from
+    appointment_rollup and provider_schedules. With ANALYTICS_ENGINE=views,
+    daily load and no-show figures come from materialized views kept fresh
+    by AnalyticsRefresher; get_freshness() reports how old each one is.
+    With ANALYTICS_ENGINE=rollup they are summed from appointment_rollup,
+    which triggers keep current, so any window is answered without
+    scanning appointments. With ANALYTICS_ENGINE=snapshot, utilization,
+    daily load and no-shows are aggregated in process from the newest
+    columnar snapshot and never reach Postgres. Wait-time percentiles
+    merge the per-day t-digests that TimingSketchBuilder keeps in
+    appointment_timing_sketches.
+    
+    Report methods are cached in analytics_cache for
+    ANALYTICS_CACHE_TTL_SECONDS; freshness is always read live.
+    """
     
     @staticmethod
-    async def get_provider_utilization(
+    async def get_freshness(
         db: AsyncSession,
-        days: int = 30
-    ) -> List[Dict]:
-        """Get provider utilization statistics."""
+        view_name: str
+    ) -> Dict:
+        """When a materialized view was last refreshed and how long ago."""
+        if ANALYTICS_ENGINE == 'snapshot' and view_name != TIMING_SKETCHES_SOURCE:
+            snapshot = analytics_snapshotter.current()
+            return {
+                "source": snapshot.name,
+                "refreshed_at": snapshot.created_at,
+                "age_seconds": round((datetime.now(timezone.utc) - snapshot.created_at).total_seconds(), 1),
+                "refresh_duration_ms": None
+            }
+        
+        if view_name == 'appointment_rollup' or (
+            ANALYTICS_ENGINE == 'rollup' and view_name != TIMING_SKETCHES_SOURCE
+        ):
+            # Maintained in the same transaction as every appointment write
+            return {
+                "source": "appointment_rollup",
+                "refreshed_at": None,
+                "age_seconds": 0.0,
+                "refresh_duration_ms": None
+            }
+        
         query = text("""
-            SELECT * FROM provider_utilization
+            SELECT
+                refreshed_at,
+                duration_ms,
+                EXTRACT(EPOCH FROM NOW() - refreshed_at) AS age_seconds
+            FROM analytics_refresh_log
+            WHERE view_name = :view_name
         """)
         
-        result = await db.execute(query)
-        rows = result.mappings().all()
-        return [dict(row) for row in rows]
+        result = await db.execute(query, {"view_name": view_name})
+        row = result.mappings().one_or_none()
+        return {
+            "source": view_name,
+            "refreshed_at": row["refreshed_at"] if row else None,
+            "age_seconds": round(float(row["age_seconds"]), 1) if row else None,
+            "refresh_duration_ms": row["duration_ms"] if row else None
+        }
+    
+    @staticmethod
+    @cached(utilization_range, key=utilization_range)
+    async def get_provider_utilization(
+        db: AsyncSession,
+        days: int = 30,
+        start_date: date = None,
+        end_date: date = None
+    ) -> List[Dict]:
+        """
+        Booked against scheduled minutes per active provider over a window.
+        
+        The window is start_date..end_date, defaulting to the `days` days
+        ending today. Scheduled minutes follow each schedule row's effective
+        range, with overlapping blocks on the same day counted once;
+        booked minutes exclude cancellations and no-shows. One query, read
+        from provider_schedules and appointment_rollup only.
+        """
+        end_date = end_date or date.today()
+        start_date = start_date or end_date - timedelta(days=days - 1)
+        if end_date < start_date:
+            raise ValidationError("end_date must be on or after start_date")
+        if (end_date - start_date).days + 1 > MAX_UTILIZATION_DAYS:
+            raise ValidationError(f"Date range cannot exceed {MAX_UTILIZATION_DAYS} days")
+        
+        if ANALYTICS_ENGINE == 'snapshot':
+            return analytics_snapshotter.current().provider_utilization(start_date, end_date)
+        
+        result = await db.execute(
+            UTILIZATION_SQL,
+            {"start_date": start_date, "end_date": end_date}
+        )
+        return [dict(row) for row in result.mappings()]
     
     @staticmethod
+    @cached(daily_load_range, key=daily_load_range)
     async def get_daily_load(
         db: AsyncSession,
         start_date: date = None,
@@ -33,6 +338,16 @@ class AnalyticsService:
         if not end_date:
             end_date = date.today() + timedelta(days=30)
         
+        if ANALYTICS_ENGINE == 'snapshot':
+            return analytics_snapshotter.current().daily_load(start_date, end_date)
+        
+        if ANALYTICS_ENGINE == 'rollup':
+            result = await db.execute(
+                ROLLUP_DAILY_LOAD_SQL,
+                {"start_date": start_date, "end_date": end_date}
+            )
+            return [dict(row) for row in result.mappings()]
+        
         query = text("""
             SELECT * FROM daily_appointment_load
             WHERE appointment_date BETWEEN :start_date AND :end_date
@@ -47,12 +362,21 @@ class AnalyticsService:
         return [dict(row) for row in rows]
     
     @staticmethod
+    @cached(no_show_range, key=no_show_range)
     async def get_no_show_analysis(
         db: AsyncSession
     ) -> List[Dict]:
         """Get no-show analysis by month."""
+        if ANALYTICS_ENGINE == 'snapshot':
+            return analytics_snapshotter.current().no_show_analysis(date.today())
+        
+        if ANALYTICS_ENGINE == 'rollup':
+            result = await db.execute(ROLLUP_NO_SHOW_SQL)
+            return [dict(row) for row in result.mappings()]
+        
         query = text("""
             SELECT * FROM no_show_analysis
+            ORDER BY month DESC
         """)
         
         result = await db.execute(query)
@@ -60,28 +384,69 @@ class AnalyticsService:
         return [dict(row) for row in rows]
     
     @staticmethod
+    @cached(wait_time_range, key=wait_time_key)
     async def get_wait_time_analysis(
-        db: AsyncSession
+        db: AsyncSession,
+        start_date: date = None,
+        end_date: date = None,
+        group_by: str = 'provider'
     ) -> List[Dict]:
-        """Calculate average wait times per provider."""
-        query = text("""
-            SELECT 
-                pr.provider_id,
-                pr.first_name || ' ' || pr.last_name AS provider_name,
-                pr.specialty,
-                COUNT(a.appointment_id) AS total_appointments,
-                AVG(EXTRACT(EPOCH FROM (a.start_time - a.created_at::time)) / 60) AS avg_wait_minutes
-            FROM providers pr
-            LEFT JOIN appointments a ON pr.provider_id = a.provider_id
-            WHERE a.status IN ('completed', 'no_show')
-            AND a.appointment_date >= CURRENT_DATE - INTERVAL '30 days'
-            GROUP BY pr.provider_id, pr.first_name, pr.last_name, pr.specialty
-            HAVING COUNT(a.appointment_id) > 0
-            ORDER BY avg_wait_minutes DESC
-        """)
+        """
+        Booking lead time and check-in-to-start wait percentiles.
         
-        result = await db.execute(query)
-        rows = result.mappings().all()
-        return [dict(row) for row in rows]
-    
-    
+        The window defaults to the 30 days ending today. Per-day t-digests
+        from appointment_timing_sketches are merged per provider or per
+        specialty, so the cost depends on providers x days in the window,
+        never on the number of appointments. Rows are ordered by p90
+        check-in wait, longest first.
+        """
+        if group_by not in WAIT_TIME_GROUPINGS:
+            raise ValidationError(f"group_by must be one of: {', '.join(WAIT_TIME_GROUPINGS)}")
+        start_date, end_date = wait_time_range(start_date, end_date)
+        if end_date < start_date:
+            raise ValidationError("end_date must be on or after start_date")
+        if (end_date - start_date).days + 1 > MAX_WAIT_TIME_DAYS:
+            raise ValidationError(f"Date range cannot exceed {MAX_WAIT_TIME_DAYS} days")
+        
+        result = await db.execute(
+            TIMING_SKETCHES_SQL,
+            {"start_date": start_date, "end_date": end_date}
+        )
+        
+        groups: Dict = {}
+        for row in result.mappings():
+            key = row["provider_id"] if group_by == 'provider' else row["specialty"]
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {
+                    "row": (
+                        {
+                            "provider_id": row["provider_id"],
+                            "provider_name": row["provider_name"],
+                            "specialty": row["specialty"]
+                        }
+                        if group_by == 'provider'
+                        else {"specialty": row["specialty"]}
+                    ),
+                    "providers": set(),
+                    "digests": {metric: TDigest(SKETCH_COMPRESSION) for metric in TIMING_METRICS}
+                }
+            group["providers"].add(row["provider_id"])
+            group["digests"][row["metric"]].merge(
+                TDigest.from_bytes(row["digest"], SKETCH_COMPRESSION)
+            )
+        
+        rows = []
+        for group in groups.values():
+            data = dict(group["row"])
+            if group_by == 'specialty':
+                data["providers"] = len(group["providers"])
+            data["lead_time_minutes"] = summarize_digest(group["digests"]["lead_time"])
+            data["check_in_wait_minutes"] = summarize_digest(group["digests"]["check_in_wait"])
+            rows.append(data)
+        
+        rows.sort(key=lambda data: (
+            data["check_in_wait_minutes"]["p90"] is None,
+            -(data["check_in_wait_minutes"]["p90"] or 0)
+        ))
+        return rows
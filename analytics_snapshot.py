@@ -0,0 +1,548 @@
+"""
+Columnar snapshots of appointments and provider schedules for analytics.
+
+    python analytics_snapshot.py build     # write a new snapshot now
+
+A snapshot is a directory of .npy column files plus manifest.json under
+ANALYTICS_SNAPSHOT_DIR; the CURRENT file names the newest one. With
+ANALYTICS_ENGINE=snapshot, utilization, daily load and no-show queries are
+answered from the memory-mapped columns without touching Postgres.
+
+The app only builds snapshots itself when READ_DATABASE_URL names a
+replica, since every build scans the whole appointments table. Without
+one, schedule the build command instead; it reads from the primary.
+"""
+from sqlalchemy import text
+from typing import Dict, List, Optional
+from datetime import date, datetime, timedelta, timezone
+import argparse
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+
+from app.utils.settings_defaults import setting
+from app.db.session import read_session_factory, replica_monitor
+from app.core.analytics_cache import analytics_cache
+from app.core.availability import merge_intervals
+from app.utils.exceptions import SnapshotUnavailableError
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 2
+
+# Status strings are stored as their index in this tuple
+STATUS_CODES = (
+    'scheduled', 'confirmed', 'checked_in', 'in_progress', 'completed', 'cancelled', 'no_show'
+)
+SCHEDULED, CONFIRMED, _, _, COMPLETED, CANCELLED, NO_SHOW = range(len(STATUS_CODES))
+
+# Dates are stored as days since the epoch; 1970-01-01 was a Thursday (DOW 4)
+EPOCH = date(1970, 1, 1)
+EPOCH_DOW = 4
+OPEN_ENDED = np.iinfo(np.int32).max
+
+# Older snapshot directories kept for readers still mapping them
+SNAPSHOTS_KEPT = 2
+
+# Header of PostgreSQL's binary COPY format: signature, flags, extension length
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+COPY_HEADER_SIZE = len(COPY_SIGNATURE) + 8
+COPY_TRAILER_SIZE = 2
+
+# Providers in index order; the other extracts refer to them by position
+PROVIDER_INDEX_CTE = """
+    WITH provider_index AS (
+        SELECT provider_id, (ROW_NUMBER() OVER (ORDER BY provider_id) - 1)::INTEGER AS idx
+        FROM providers
+    )
+"""
+
+PROVIDERS_SQL = text(PROVIDER_INDEX_CTE + """
+    SELECT
+        p.provider_id,
+        p.first_name || ' ' || p.last_name AS provider_name,
+        p.specialty,
+        p.is_active
+    FROM providers p
+    JOIN provider_index USING (provider_id)
+    ORDER BY provider_index.idx
+""")
+
+# Column extracts are copied out in binary, so every column must be a
+# non-null INTEGER: each row is then a fixed-size record
+# Sorted by date so a window is one contiguous slice of every column
+APPOINTMENT_COLUMNS_SQL = PROVIDER_INDEX_CTE + """
+    SELECT
+        provider_index.idx,
+        a.appointment_date - DATE '1970-01-01',
+        array_position($1::varchar[], a.status::varchar) - 1,
+        EXTRACT(EPOCH FROM a.end_time - a.start_time)::INTEGER / 60
+    FROM appointments a
+    JOIN provider_index USING (provider_id)
+    ORDER BY a.appointment_date
+"""
+
+SCHEDULE_COLUMNS_SQL = PROVIDER_INDEX_CTE + """
+    SELECT
+        provider_index.idx,
+        s.day_of_week::INTEGER,
+        EXTRACT(EPOCH FROM s.start_time)::INTEGER,
+        EXTRACT(EPOCH FROM s.end_time)::INTEGER,
+        s.effective_from - DATE '1970-01-01',
+        COALESCE(s.effective_until - DATE '1970-01-01', $1::INTEGER)
+    FROM provider_schedules s
+    JOIN provider_index USING (provider_id)
+"""
+
+# extract -> (query, arguments, column count)
+EXTRACTS = {
+    "appointments": (APPOINTMENT_COLUMNS_SQL, (list(STATUS_CODES),), 4),
+    "schedules": (SCHEDULE_COLUMNS_SQL, (int(OPEN_ENDED),), 6),
+}
+
+# name -> (extract, column index, dtype)
+COLUMNS = {
+    "appointment_provider": ("appointments", 0, np.int32),
+    "appointment_day": ("appointments", 1, np.int32),
+    "appointment_status": ("appointments", 2, np.int8),
+    "appointment_minutes": ("appointments", 3, np.int16),
+    "schedule_provider": ("schedules", 0, np.int32),
+    "schedule_dow": ("schedules", 1, np.int8),
+    "schedule_start": ("schedules", 2, np.int32),
+    "schedule_end": ("schedules", 3, np.int32),
+    "schedule_from": ("schedules", 4, np.int32),
+    "schedule_until": ("schedules", 5, np.int32),
+}
+
+
+def to_day(value: date) -> int:
+    return (value - EPOCH).days
+
+
+def from_day(value: int) -> date:
+    return EPOCH + timedelta(days=int(value))
+
+
+def read_copy(path: str, width: int) -> np.ndarray:
+    """
+    Memory-map a binary COPY file of `width` INTEGER columns.
+
+    Returns a record array with big-endian fields v0..v{width-1}.
+    """
+    with open(path, "rb") as f:
+        header = f.read(COPY_HEADER_SIZE)
+    if header[:len(COPY_SIGNATURE)] != COPY_SIGNATURE:
+        raise ValueError(f"Not a binary COPY file: {path}")
+    offset = COPY_HEADER_SIZE + int.from_bytes(header[-4:], "big")
+
+    # Per row: field count, then a length and a value for every column
+    fields = [("count", ">i2")]
+    for i in range(width):
+        fields += [(f"len{i}", ">i4"), (f"v{i}", ">i4")]
+    dtype = np.dtype(fields)
+
+    size = os.path.getsize(path) - offset - COPY_TRAILER_SIZE
+    if size % dtype.itemsize:
+        raise ValueError(f"Truncated COPY file: {path}")
+    records = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(size // dtype.itemsize,))
+    if not (records["count"] == width).all() or not all(
+        (records[f"len{i}"] == 4).all() for i in range(width)
+    ):
+        raise ValueError(f"COPY file {path} has NULL or non-INTEGER columns")
+    return records
+
+
+def rate(numerator, denominator) -> Optional[float]:
+    """numerator / denominator as a percentage rounded to 2 places; None when undefined."""
+    if not denominator:
+        return None
+    return round(float(numerator) / float(denominator) * 100, 2)
+
+
+class AnalyticsSnapshot:
+    """
+    One loaded snapshot: memory-mapped columns and the provider list.
+
+    Appointment columns are sorted by date, so every query binary-searches
+    its window and aggregates that slice with bincount group-bys.
+    Scheduled minutes are computed from the (much smaller) schedule
+    columns the same way UTILIZATION_SQL does.
+    """
+
+    def __init__(self, name: str, manifest: dict, columns: Dict[str, np.ndarray]):
+        self.name = name
+        self.manifest = manifest
+        self.providers: List[dict] = manifest["providers"]
+        self.created_at = datetime.fromisoformat(manifest["created_at"])
+        self.columns = columns
+
+    @classmethod
+    def load(cls, path: str) -> "AnalyticsSnapshot":
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest["format"] != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format: {manifest['format']}")
+        columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in COLUMNS
+        }
+        return cls(os.path.basename(path), manifest, columns)
+
+    def _window(self, start_date: date, end_date: date) -> slice:
+        days = self.columns["appointment_day"]
+        return slice(
+            int(np.searchsorted(days, to_day(start_date), side="left")),
+            int(np.searchsorted(days, to_day(end_date), side="right"))
+        )
+
+    def provider_utilization(self, start_date: date, end_date: date) -> List[Dict]:
+        """Same rows as UTILIZATION_SQL."""
+        n = len(self.providers)
+        window = self._window(start_date, end_date)
+        provider = self.columns["appointment_provider"][window]
+        status = self.columns["appointment_status"][window]
+        minutes = self.columns["appointment_minutes"][window]
+
+        booked_mask = (status != CANCELLED) & (status != NO_SHOW)
+        booked = np.bincount(provider[booked_mask], weights=minutes[booked_mask], minlength=n)
+        total = np.bincount(provider, minlength=n)
+        completed = np.bincount(provider[status == COMPLETED], minlength=n)
+        no_shows = np.bincount(provider[status == NO_SHOW], minlength=n)
+        cancellations = np.bincount(provider[status == CANCELLED], minlength=n)
+
+        scheduled = self._scheduled_minutes(n, to_day(start_date), to_day(end_date))
+
+        rows = []
+        for i, info in enumerate(self.providers):
+            if not info["is_active"]:
+                continue
+            rows.append({
+                "provider_id": info["provider_id"],
+                "provider_name": info["provider_name"],
+                "specialty": info["specialty"],
+                "scheduled_minutes": int(scheduled[i]),
+                "booked_minutes": int(booked[i]),
+                "utilization_rate": rate(booked[i], scheduled[i]),
+                "total_appointments": int(total[i]),
+                "completed_appointments": int(completed[i]),
+                "no_shows": int(no_shows[i]),
+                "cancellations": int(cancellations[i]),
+                "completion_rate": rate(completed[i], total[i])
+            })
+        rows.sort(key=lambda row: (
+            row["utilization_rate"] is None,
+            -(row["utilization_rate"] or 0),
+            row["provider_name"]
+        ))
+        return rows
+
+    def _scheduled_minutes(self, n: int, start_day: int, end_day: int) -> np.ndarray:
+        """
+        Scheduled minutes per provider index for start_day..end_day.
+
+        Each provider/weekday is split at the rows' effective-range
+        boundaries; within a segment the rows' blocks are merged once and
+        multiplied by the number of matching weekdays.
+        """
+        range_start = np.maximum(self.columns["schedule_from"], start_day)
+        range_end = np.minimum(self.columns["schedule_until"], end_day)
+
+        groups: Dict[tuple, list] = {}
+        for i in np.flatnonzero(range_start <= range_end):
+            key = (int(self.columns["schedule_provider"][i]), int(self.columns["schedule_dow"][i]))
+            groups.setdefault(key, []).append((
+                int(range_start[i]),
+                int(range_end[i]),
+                int(self.columns["schedule_start"][i]),
+                int(self.columns["schedule_end"][i])
+            ))
+
+        scheduled = np.zeros(n, dtype=np.int64)
+        for (provider, dow), rows in groups.items():
+            bounds = sorted({row[0] for row in rows} | {row[1] + 1 for row in rows})
+            for segment_start, next_bound in zip(bounds, bounds[1:]):
+                segment_end = next_bound - 1
+                blocks = merge_intervals([
+                    (start, end) for first, last, start, end in rows
+                    if first <= segment_start and last >= segment_end
+                ])
+                if not blocks:
+                    continue
+                first_offset = (dow - (segment_start + EPOCH_DOW) % 7 + 7) % 7
+                occurrences = max(0, (segment_end - segment_start - first_offset) // 7 + 1)
+                scheduled[provider] += occurrences * sum((end - start) // 60 for start, end in blocks)
+        return scheduled
+
+    def daily_load(self, start_date: date, end_date: date) -> List[Dict]:
+        """Same rows as ROLLUP_DAILY_LOAD_SQL."""
+        n = len(self.providers)
+        days = to_day(end_date) - to_day(start_date) + 1
+        if days <= 0:
+            return []
+
+        window = self._window(start_date, end_date)
+        day = self.columns["appointment_day"][window].astype(np.int64) - to_day(start_date)
+        status = self.columns["appointment_status"][window]
+        provider = self.columns["appointment_provider"][window]
+
+        by_status = np.bincount(
+            day * len(STATUS_CODES) + status, minlength=days * len(STATUS_CODES)
+        ).reshape(days, len(STATUS_CODES))
+        total = by_status.sum(axis=1)
+        active_providers = np.bincount(np.unique(day * n + provider) // n, minlength=days)
+
+        return [
+            {
+                "appointment_date": from_day(to_day(start_date) + i),
+                "total_appointments": int(total[i]),
+                "active_providers": int(active_providers[i]),
+                "upcoming": int(by_status[i, SCHEDULED] + by_status[i, CONFIRMED]),
+                "completed": int(by_status[i, COMPLETED]),
+                "cancelled": int(by_status[i, CANCELLED]),
+                "no_shows": int(by_status[i, NO_SHOW])
+            }
+            for i in np.flatnonzero(total)[::-1]
+        ]
+
+    def no_show_analysis(self, today: date) -> List[Dict]:
+        """Same rows as ROLLUP_NO_SHOW_SQL."""
+        try:
+            year_ago = today.replace(year=today.year - 1)
+        except ValueError:
+            year_ago = today.replace(year=today.year - 1, day=28)
+
+        window = self._window(year_ago, today)
+        months = (
+            self.columns["appointment_day"][window]
+            .astype("datetime64[D]")
+            .astype("datetime64[M]")
+            .astype(np.int64)
+        )
+        if not len(months):
+            return []
+        status = self.columns["appointment_status"][window]
+
+        first = months.min()
+        month = months - first
+        count = int(month.max()) + 1
+        total = np.bincount(month, minlength=count)
+        no_shows = np.bincount(month[status == NO_SHOW], minlength=count)
+        completed = np.bincount(month[status == COMPLETED], minlength=count)
+
+        return [
+            {
+                "month": np.datetime64(int(first + i), "M").astype("datetime64[D]").item(),
+                "total_appointments": int(total[i]),
+                "no_shows": int(no_shows[i]),
+                "no_show_rate": rate(no_shows[i], completed[i] + no_shows[i])
+            }
+            for i in np.flatnonzero(total)[::-1]
+        ]
+
+
+class AnalyticsSnapshotter:
+    """
+    Writes snapshots on a schedule and serves the newest one.
+
+    Workers sharing ANALYTICS_SNAPSHOT_DIR take turns through a file lock,
+    and a worker skips its build when another one published within the
+    last interval; every worker picks up a new snapshot on its next query.
+    Extraction runs in one REPEATABLE READ transaction so all columns
+    agree. Rows are streamed with binary COPY into files in the staging
+    directory and converted to columns in a thread, off the event loop.
+    """
+
+    def __init__(self, directory: str, interval: float):
+        self.directory = directory
+        self.interval = interval
+        self._snapshot: Optional[AnalyticsSnapshot] = None
+        self._current_mtime: Optional[int] = None
+        self.builds = 0
+        self.skipped = 0
+        self.failures = 0
+        self.loads = 0
+        self.last_build_ms: Optional[int] = None
+
+    @property
+    def _current_path(self) -> str:
+        return os.path.join(self.directory, "CURRENT")
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "builds": self.builds,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "loads": self.loads,
+            "last_build_ms": self.last_build_ms,
+            "snapshot": snapshot.name if snapshot else None,
+            "created_at": snapshot.created_at.isoformat() if snapshot else None,
+            "appointments": snapshot.manifest["rows"]["appointments"] if snapshot else None
+        }
+
+    def current(self) -> AnalyticsSnapshot:
+        """The newest snapshot, reloaded whenever CURRENT changes."""
+        try:
+            mtime = os.stat(self._current_path).st_mtime_ns
+        except FileNotFoundError:
+            raise SnapshotUnavailableError()
+
+        if mtime != self._current_mtime:
+            with open(self._current_path) as f:
+                name = f.read().strip()
+            try:
+                self._snapshot = AnalyticsSnapshot.load(os.path.join(self.directory, name))
+            except ValueError as exc:
+                # Written by an older release; the next build replaces it
+                raise SnapshotUnavailableError(str(exc))
+            self._current_mtime = mtime
+            self.loads += 1
+            # Results cached from the previous snapshot are now stale
+            analytics_cache.invalidate()
+        return self._snapshot
+
+    async def _extract(self, staging: str) -> List[dict]:
+        """Copy the column extracts into `staging`; returns the provider list."""
+        async with read_session_factory()() as db:
+            await db.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY"))
+            providers = [
+                {
+                    "provider_id": str(row["provider_id"]),
+                    "provider_name": row["provider_name"],
+                    "specialty": row["specialty"],
+                    "is_active": row["is_active"]
+                }
+                for row in (await db.execute(PROVIDERS_SQL)).mappings()
+            ]
+
+            # Same transaction, so the copies see the snapshot the providers came from
+            conn = await db.connection()
+            raw = await conn.get_raw_connection()
+            for extract, (query, args, _) in EXTRACTS.items():
+                await raw.driver_connection.copy_from_query(
+                    query, *args,
+                    output=os.path.join(staging, f"{extract}.copy"),
+                    format="binary"
+                )
+        return providers
+
+    def _write(self, staging: str, providers: List[dict]) -> str:
+        """Convert the copied extracts to column files and publish them."""
+        rows = {}
+        for extract, (_, _, width) in EXTRACTS.items():
+            records = read_copy(os.path.join(staging, f"{extract}.copy"), width)
+            rows[extract] = len(records)
+            # One column in memory at a time; the records stay on disk
+            for column, (source, index, dtype) in COLUMNS.items():
+                if source == extract:
+                    np.save(
+                        os.path.join(staging, f"{column}.npy"),
+                        np.ascontiguousarray(records[f"v{index}"], dtype=dtype)
+                    )
+            del records
+            os.remove(os.path.join(staging, f"{extract}.copy"))
+
+        created_at = datetime.now(timezone.utc)
+        name = created_at.strftime("snapshot-%Y%m%dT%H%M%S%fZ")
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "created_at": created_at.isoformat(),
+            "status_codes": list(STATUS_CODES),
+            "rows": rows,
+            "providers": providers
+        }
+        with open(os.path.join(staging, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+
+        # Publish: the directory rename and the CURRENT replace are both atomic
+        os.rename(staging, os.path.join(self.directory, name))
+        pointer = os.path.join(self.directory, ".CURRENT")
+        with open(pointer, "w") as f:
+            f.write(name)
+        os.replace(pointer, self._current_path)
+
+        # Unlinked files stay readable for workers that still map them
+        snapshots = sorted(d for d in os.listdir(self.directory) if d.startswith("snapshot-"))
+        for old in snapshots[:-SNAPSHOTS_KEPT]:
+            shutil.rmtree(os.path.join(self.directory, old), ignore_errors=True)
+        return name
+
+    def _is_fresh(self) -> bool:
+        """Whether the published snapshot is younger than the build interval."""
+        try:
+            age = time.time() - os.stat(self._current_path).st_mtime
+        except FileNotFoundError:
+            return False
+        return age < self.interval
+
+    async def build(self, force: bool = False) -> Optional[str]:
+        """
+        Extract and publish a snapshot.
+
+        Returns None if another worker is building or, unless `force`, if
+        another worker published one within the last interval.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.skipped += 1
+                return None
+            if not force and self._is_fresh():
+                self.skipped += 1
+                return None
+
+            started = time.perf_counter()
+            staging = os.path.join(
+                self.directory, f".staging-{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}"
+            )
+            os.makedirs(staging)
+            try:
+                providers = await self._extract(staging)
+                name = await asyncio.to_thread(self._write, staging, providers)
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+
+        self.builds += 1
+        self.last_build_ms = round((time.perf_counter() - started) * 1000)
+        return name
+
+    async def run(self):
+        """
+        Snapshot loop; started from the app lifespan and cancelled on shutdown.
+
+        Builds only while the replica is healthy, so the full-table scans
+        never fall back to the primary.
+        """
+        while True:
+            try:
+                if replica_monitor.healthy:
+                    await self.build()
+                else:
+                    self.skipped += 1
+            except Exception as exc:
+                self.failures += 1
+                logger.warning(f"Analytics snapshot failed: {exc}")
+            await asyncio.sleep(self.interval)
+
+
+analytics_snapshotter = AnalyticsSnapshotter(
+    setting("ANALYTICS_SNAPSHOT_DIR"),
+    setting("ANALYTICS_SNAPSHOT_SECONDS")
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["build"])
+    parser.parse_args()
+    name = asyncio.run(analytics_snapshotter.build(force=True))
+    print(f"Published {name}" if name else "Another snapshot build is running")
@@ -1,11 +1,20 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, text, func
-from sqlalchemy.exc import IntegrityError
-from typing import Optional, List
+from sqlalchemy import select, and_, or_, text, func, TextClause
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Optional, List, Dict, Tuple
+from collections import defaultdict
+from functools import lru_cache
+from itertools import islice
+import heapq
 from datetime import date, time, datetime, timedelta
 from uuid import UUID
 
 from app.db.models import Appointment, Patient, Provider, ProviderSchedule, Visit
+from app.core.availability import ProviderDayIndex, sql_day_of_week
+from app.core.slot_holds import slot_holds, overlapping_hold
+from app.core.booking_queue import booking_serializer
+from app.core.schedule_cache import schedule_cache
+from app.core.analytics_cache import analytics_cache
 from app.schemas.appointment import (
     AppointmentCreate,
     AppointmentUpdate,
@@ -13,12 +22,17 @@ from app.schemas.appointment import (
     AppointmentResponse,
     AppointmentDetailResponse
 )
+from app.schemas.booking import BulkItemStatus, RecurrenceRule, SlotHoldCreate
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.fast_json import schema_fields
+from app.utils.fieldsets import select_fields
 from app.utils.exceptions import (
     AppointmentConflictError,
     ProviderUnavailableError,
     NotFoundError,
     ValidationError,
-    InvalidTransitionError
+    InvalidTransitionError,
+    SeriesConflictError
 )
 
 
@@ -33,6 +47,207 @@ ALLOWED_TRANSITIONS = {
     'no_show': []
 }
 
+# Appointment timing rules
+MIN_DURATION = timedelta(minutes=15)
+MAX_DURATION = timedelta(hours=2)
+MIN_ADVANCE = timedelta(hours=2)
+MAX_ADVANCE = timedelta(days=90)
+
+# Weeks between occurrences for each recurrence frequency
+RECURRENCE_INTERVAL_WEEKS = {
+    'weekly': 1,
+    'biweekly': 2
+}
+
+# Schedule check, conflict check and insert in one statement for book_appointment_fast.
+# Blocks that overlap or touch are merged into islands first, matching
+# ProviderDayIndex and the schedule cache, so a slot may span adjacent blocks.
+# :schedule_checked skips the schedule scan when the cache already answered.
+BOOK_APPOINTMENT_SQL = text("""
+    WITH blocks AS (
+        SELECT
+            ps.start_time,
+            ps.end_time,
+            CASE WHEN ps.start_time <= MAX(ps.end_time) OVER (
+                ORDER BY ps.start_time, ps.end_time
+                ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+            ) THEN 0 ELSE 1 END AS starts_island
+        FROM provider_schedules ps
+        WHERE ps.provider_id = :provider_id
+        AND ps.day_of_week = :day_of_week
+        AND ps.effective_from <= :appointment_date
+        AND (ps.effective_until IS NULL OR ps.effective_until >= :appointment_date)
+    ),
+    islands AS (
+        SELECT
+            start_time,
+            end_time,
+            SUM(starts_island) OVER (ORDER BY start_time, end_time) AS island
+        FROM blocks
+    ),
+    schedule AS (
+        SELECT CAST(:schedule_checked AS boolean) OR EXISTS (
+            SELECT 1 FROM islands
+            GROUP BY island
+            HAVING MIN(start_time) <= :start_time AND MAX(end_time) >= :end_time
+        ) AS available
+    ),
+    conflict AS (
+        SELECT EXISTS (
+            SELECT 1 FROM appointments a
+            WHERE a.provider_id = :provider_id
+            AND a.appointment_date = :appointment_date
+            AND a.status NOT IN ('cancelled', 'no_show')
+            AND a.start_time < :end_time
+            AND a.end_time > :start_time
+        ) AS found
+    ),
+    inserted AS (
+        INSERT INTO appointments (
+            patient_id, provider_id, appointment_date, start_time, end_time,
+            appointment_type, notes, status
+        )
+        SELECT
+            CAST(:patient_id AS uuid),
+            CAST(:provider_id AS uuid),
+            CAST(:appointment_date AS date),
+            CAST(:start_time AS time),
+            CAST(:end_time AS time),
+            CAST(:appointment_type AS varchar),
+            CAST(:notes AS text),
+            'scheduled'
+        FROM schedule, conflict
+        WHERE schedule.available AND NOT conflict.found
+        ON CONFLICT DO NOTHING
+        RETURNING *
+    )
+    SELECT
+        schedule.available AS schedule_available,
+        conflict.found AS has_conflict,
+        inserted.*
+    FROM schedule
+    CROSS JOIN conflict
+    LEFT JOIN inserted ON TRUE
+""")
+
+# Longest window served by the availability calendar and slot searches
+MAX_CALENDAR_DAYS = 62
+
+# AppointmentDetailResponse columns as (SQL expression, join alias it needs)
+APPOINTMENT_DETAIL_COLUMNS = {
+    **{column.name: (f"a.{column.name}", None) for column in Appointment.__table__.columns},
+    'patient_name': ("p.first_name || ' ' || p.last_name", 'p'),
+    'provider_name': ("pr.first_name || ' ' || pr.last_name", 'pr'),
+    'provider_specialty': ("pr.specialty", 'pr')
+}
+APPOINTMENT_DETAIL_FIELDS = {
+    name: column for name, column in APPOINTMENT_DETAIL_COLUMNS.items()
+    if name in schema_fields(AppointmentDetailResponse)
+}
+APPOINTMENT_JOINS = {
+    'p': "JOIN patients p ON a.patient_id = p.patient_id",
+    'pr': "JOIN providers pr ON a.provider_id = pr.provider_id"
+}
+# Always selected so list_cursor works on narrowed pages
+APPOINTMENT_KEY_FIELDS = ['appointment_date', 'start_time', 'appointment_id']
+
+
+def appointment_projection(
+    fields: Optional[List[str]] = None,
+    keys: List[str] = ()
+) -> Tuple[str, str]:
+    """
+    SELECT list and joins for the requested detail fields (all when None).
+    
+    Patient and provider joins are only emitted when a requested field
+    needs them; both are on non-null foreign keys, so dropping them never
+    changes which appointments match.
+    """
+    if fields is None:
+        columns = list(APPOINTMENT_DETAIL_COLUMNS.values())
+        names = list(APPOINTMENT_DETAIL_COLUMNS)
+    else:
+        names = list(dict.fromkeys([*keys, *fields]))
+        columns = select_fields(APPOINTMENT_DETAIL_FIELDS, names)
+    
+    select_list = ",\n".join(f"{expression} AS {name}" for name, (expression, _) in zip(names, columns))
+    aliases = {alias for _, alias in columns if alias}
+    joins = "\n".join(join for alias, join in APPOINTMENT_JOINS.items() if alias in aliases)
+    return select_list, joins
+
+
+# Shared by get_appointment_with_details, get_appointments_by_ids and list_appointments
+APPOINTMENT_DETAIL_SQL = """
+    SELECT {select_list}
+    FROM appointments a
+    {joins}
+    WHERE {where}
+    {tail}
+"""
+
+LIST_APPOINTMENTS_FILTERS = {
+    'patient_id': "a.patient_id = :patient_id",
+    'provider_id': "a.provider_id = :provider_id",
+    'appointment_date': "a.appointment_date = :appointment_date",
+    'status': "a.status = :status",
+    'cursor': (
+        "(a.appointment_date, a.start_time, a.appointment_id) < "
+        "(CAST(:cursor_date AS date), CAST(:cursor_time AS time), CAST(:cursor_id AS uuid))"
+    )
+}
+LIST_APPOINTMENTS_TAIL = (
+    "ORDER BY a.appointment_date DESC, a.start_time DESC, a.appointment_id DESC "
+    "LIMIT :limit OFFSET :skip"
+)
+
+
+def detail_fields_key(fields: Optional[List[str]]) -> Optional[Tuple[str, ...]]:
+    """
+    Requested fields in APPOINTMENT_DETAIL_FIELDS order, as a statement cache key.
+    
+    Every ordering of the same fields then shares one statement. Responses
+    keep the requested order because they are projected from the row
+    mappings by name. Unknown names are rejected here so they never reach
+    the cache.
+    """
+    if fields is None:
+        return None
+    select_fields(APPOINTMENT_DETAIL_FIELDS, fields)
+    requested = set(fields)
+    return tuple(name for name in APPOINTMENT_DETAIL_FIELDS if name in requested)
+
+
+@lru_cache(maxsize=256)
+def appointment_detail_statement(
+    where: str,
+    fields: Optional[Tuple[str, ...]] = None,
+    keys: Tuple[str, ...] = (),
+    tail: str = ""
+) -> TextClause:
+    """
+    Prebuilt detail query for one WHERE clause and field selection.
+    
+    Every call with the same arguments returns the same text() object, so
+    the text() construction and its SQL compilation happen once per
+    combination. Pass `fields` through detail_fields_key().
+    """
+    select_list, joins = appointment_projection(
+        list(fields) if fields is not None else None, list(keys)
+    )
+    return text(APPOINTMENT_DETAIL_SQL.format(
+        select_list=select_list, joins=joins, where=where, tail=tail
+    ))
+
+
+def appointment_statement_stats() -> dict:
+    """lru_cache counters of appointment_detail_statement (statement builds saved)."""
+    info = appointment_detail_statement.cache_info()
+    return {
+        "statements": info.currsize,
+        "builder_hits": info.hits,
+        "builder_misses": info.misses
+    }
+
 
 class AppointmentService:
     """Business logic for appointment management."""
@@ -45,29 +260,78 @@ class AppointmentService:
         start_time: time,
         end_time: time
     ) -> bool:
-        """Check if provider has availability for the requested time."""
-        day_of_week = appointment_date.weekday()
-        # Adjust: Python's weekday() is 0=Monday, SQL uses 0=Sunday
-        sql_day_of_week = (day_of_week + 1) % 7
+        """
+        Check if provider has availability for the requested time.
         
-        result = await db.execute(
-            select(ProviderSchedule)
-            .where(
-                and_(
-                    ProviderSchedule.provider_id == provider_id,
-                    ProviderSchedule.day_of_week == sql_day_of_week,
-                    ProviderSchedule.effective_from <= appointment_date,
-                    or_(
-                        ProviderSchedule.effective_until.is_(None),
-                        ProviderSchedule.effective_until >= appointment_date
-                    ),
-                    ProviderSchedule.start_time <= start_time,
-                    ProviderSchedule.end_time >= end_time
-                )
-            )
+        Answered from the compiled schedule cache; provider_schedules is only
+        read the first time a provider is checked after a schedule change.
+        """
+        return await schedule_cache.covers(
+            db, provider_id, appointment_date, start_time, end_time
+        )
+    
+    @staticmethod
+    async def check_slot_holds(
+        db: AsyncSession,
+        provider_id: UUID,
+        patient_id: UUID,
+        appointment_date: date,
+        start_time: time,
+        end_time: time
+    ):
+        """Fail fast if another patient holds any part of the requested slot."""
+        holds = await slot_holds.list_active(db, [provider_id], appointment_date, appointment_date)
+        if overlapping_hold(holds, patient_id, start_time, end_time):
+            raise AppointmentConflictError("Time slot is held by another patient")
+    
+    @staticmethod
+    async def hold_slot(
+        db: AsyncSession,
+        hold_data: SlotHoldCreate
+    ) -> dict:
+        """
+        Reserve a free slot for a patient for a short time.
+        
+        While the hold is live the slot is hidden from availability results
+        and other patients cannot book it.
+        """
+        await AppointmentService.validate_appointment_time(
+            hold_data.appointment_date,
+            hold_data.start_time,
+            hold_data.end_time
         )
         
-        return result.scalar_one_or_none() is not None
+        indexes = await AppointmentService.load_day_indexes(
+            db, [hold_data.provider_id], hold_data.appointment_date, hold_data.appointment_date
+        )
+        index = indexes.get((hold_data.provider_id, hold_data.appointment_date))
+        
+        if index is None or not index.covers(hold_data.start_time, hold_data.end_time):
+            raise ProviderUnavailableError(
+                "Provider is not available at the requested time"
+            )
+        
+        if index.overlaps_busy(hold_data.start_time, hold_data.end_time):
+            raise AppointmentConflictError("Time slot is already booked")
+        
+        return await slot_holds.acquire(
+            db,
+            hold_data.provider_id,
+            hold_data.patient_id,
+            hold_data.appointment_date,
+            hold_data.start_time,
+            hold_data.end_time,
+            hold_data.ttl_seconds
+        )
+    
+    @staticmethod
+    async def release_hold(
+        db: AsyncSession,
+        hold_id: UUID
+    ):
+        """Release a slot hold before it expires."""
+        if not await slot_holds.release(db, hold_id):
+            raise NotFoundError("Hold not found")
     
     @staticmethod
     async def validate_appointment_time(
@@ -76,11 +340,6 @@ class AppointmentService:
         end_time: time
     ):
         """Validate appointment timing constraints."""
-        MIN_DURATION = timedelta(minutes=15)
-        MAX_DURATION = timedelta(hours=2)
-        MIN_ADVANCE = timedelta(hours=2)
-        MAX_ADVANCE = timedelta(days=90)
-        
         # Calculate duration
         start_dt = datetime.combine(appointment_date, start_time)
         end_dt = datetime.combine(appointment_date, end_time)
@@ -101,81 +360,358 @@ class AppointmentService:
             raise ValidationError("Cannot book more than 90 days ahead")
     
     @staticmethod
-    async def book_appointment(
+    async def book_appointment_fast(
         db: AsyncSession,
         appointment_data: AppointmentCreate
-    ) -> Appointment:
+    ) -> dict:
         """
-        Book a new appointment with full validation and concurrency safety.
+        Book a new appointment in a single round-trip.
+        
+        The schedule check, conflict check and insert run as one CTE statement.
+        The schedule is checked against the compiled schedule cache first, and
+        the statement only scans provider_schedules while the cache is
+        bypassed. ON CONFLICT DO NOTHING lets the exclusion constraint settle races
+        without raising, so a lost race is reported from the RETURNING row
+        instead of through an IntegrityError and rollback. When booking
+        serialization is enabled the statement and commit run under the
+        provider/day lock.
         """
-        # Validate timing
         await AppointmentService.validate_appointment_time(
             appointment_data.appointment_date,
             appointment_data.start_time,
             appointment_data.end_time
         )
         
-        # Check provider schedule
-        has_schedule = await AppointmentService.check_provider_schedule(
+        await AppointmentService.check_slot_holds(
             db,
             appointment_data.provider_id,
+            appointment_data.patient_id,
             appointment_data.appointment_date,
             appointment_data.start_time,
             appointment_data.end_time
         )
         
-        if not has_schedule:
+        schedule_checked = not schedule_cache.bypassed
+        if schedule_checked and not await AppointmentService.check_provider_schedule(
+            db,
+            appointment_data.provider_id,
+            appointment_data.appointment_date,
+            appointment_data.start_time,
+            appointment_data.end_time
+        ):
             raise ProviderUnavailableError(
                 "Provider is not available at the requested time"
             )
         
-        # Check for conflicts (belt-and-suspenders with DB constraint)
-        conflict = await db.execute(
-            select(Appointment)
-            .where(
-                and_(
-                    Appointment.provider_id == appointment_data.provider_id,
-                    Appointment.appointment_date == appointment_data.appointment_date,
-                    Appointment.status.not_in(['cancelled', 'no_show']),
-                    or_(
-                        and_(
-                            Appointment.start_time < appointment_data.end_time,
-                            Appointment.end_time > appointment_data.start_time
-                        )
+        # Opt-in serialization orders competing bookings for the same provider/day
+        async with booking_serializer.serialize(
+            db, appointment_data.provider_id, appointment_data.appointment_date
+        ):
+            result = await db.execute(
+                BOOK_APPOINTMENT_SQL,
+                {
+                    "patient_id": str(appointment_data.patient_id),
+                    "provider_id": str(appointment_data.provider_id),
+                    "appointment_date": appointment_data.appointment_date,
+                    "day_of_week": sql_day_of_week(appointment_data.appointment_date),
+                    "start_time": appointment_data.start_time,
+                    "end_time": appointment_data.end_time,
+                    "appointment_type": appointment_data.appointment_type.value,
+                    "notes": appointment_data.notes,
+                    "schedule_checked": schedule_checked
+                }
+            )
+            row = dict(result.mappings().one())
+            
+            schedule_available = row.pop("schedule_available")
+            has_conflict = row.pop("has_conflict")
+            
+            if row["appointment_id"] is None:
+                await db.rollback()
+                if not schedule_available:
+                    raise ProviderUnavailableError(
+                        "Provider is not available at the requested time"
                     )
+                if has_conflict:
+                    raise AppointmentConflictError("Time slot is already booked")
+                raise AppointmentConflictError("Time slot was just booked by another user")
+            
+            released = await slot_holds.release_matching(
+                db,
+                appointment_data.provider_id,
+                appointment_data.patient_id,
+                appointment_data.appointment_date,
+                appointment_data.start_time,
+                appointment_data.end_time
+            )
+            await db.commit()
+            await slot_holds.release_after_commit(db, released)
+            analytics_cache.invalidate(appointment_data.appointment_date, appointment_data.appointment_date)
+            return row
+    
+    @staticmethod
+    async def insert_appointment_rows(
+        db: AsyncSession,
+        items: List[AppointmentCreate]
+    ) -> Dict[Tuple[UUID, date, time], UUID]:
+        """
+        Insert appointments with one multi-row INSERT.
+        
+        Rows rejected by the exclusion constraint are skipped rather than
+        failing the statement. Returns the new appointment IDs keyed by
+        (provider_id, appointment_date, start_time).
+        """
+        if not items:
+            return {}
+        
+        result = await db.execute(
+            pg_insert(Appointment)
+            .values([
+                {
+                    "patient_id": item.patient_id,
+                    "provider_id": item.provider_id,
+                    "appointment_date": item.appointment_date,
+                    "start_time": item.start_time,
+                    "end_time": item.end_time,
+                    "appointment_type": item.appointment_type.value,
+                    "notes": item.notes,
+                    "status": 'scheduled'
+                }
+                for item in items
+            ])
+            .on_conflict_do_nothing()
+            .returning(
+                Appointment.appointment_id,
+                Appointment.provider_id,
+                Appointment.appointment_date,
+                Appointment.start_time
+            )
+        )
+        return {
+            (row.provider_id, row.appointment_date, row.start_time): row.appointment_id
+            for row in result
+        }
+    
+    @staticmethod
+    async def book_appointments_bulk(
+        db: AsyncSession,
+        items: List[AppointmentCreate]
+    ) -> List[dict]:
+        """
+        Book many appointments at once and report a result per item.
+        
+        Timing rules are checked in Python, patients, schedules and existing
+        appointments are loaded with set-based queries, and overlaps within
+        the batch are caught in memory before anything reaches Postgres.
+        Every item that passes is inserted with a single multi-row INSERT.
+        """
+        results = [{"index": i, "status": BulkItemStatus.BOOKED} for i in range(len(items))]
+        
+        def fail(i: int, status: BulkItemStatus, error: str):
+            results[i].update(status=status, error=error)
+        
+        candidates = []
+        for i, item in enumerate(items):
+            try:
+                await AppointmentService.validate_appointment_time(
+                    item.appointment_date, item.start_time, item.end_time
                 )
+                candidates.append(i)
+            except ValidationError as e:
+                fail(i, BulkItemStatus.INVALID, e.message)
+        
+        known_patients, indexes, holds_by_day = set(), {}, defaultdict(list)
+        if candidates:
+            patient_ids = {items[i].patient_id for i in candidates}
+            found = await db.execute(
+                select(Patient.patient_id).where(Patient.patient_id.in_(patient_ids))
             )
+            known_patients = set(found.scalars())
+            
+            provider_ids = list({items[i].provider_id for i in candidates})
+            first_date = min(items[i].appointment_date for i in candidates)
+            last_date = max(items[i].appointment_date for i in candidates)
+            
+            indexes = await AppointmentService.load_day_indexes(
+                db, provider_ids, first_date, last_date
+            )
+            for hold in await slot_holds.list_active(db, provider_ids, first_date, last_date):
+                holds_by_day[(hold["provider_id"], hold["appointment_date"])].append(hold)
+        
+        accepted = []
+        for i in candidates:
+            item = items[i]
+            index = indexes.get((item.provider_id, item.appointment_date))
+            
+            if item.patient_id not in known_patients:
+                fail(i, BulkItemStatus.INVALID, "Patient not found")
+            elif index is None or not index.covers(item.start_time, item.end_time):
+                fail(
+                    i, BulkItemStatus.UNAVAILABLE,
+                    "Provider is not available at the requested time"
+                )
+            elif index.overlaps_busy(item.start_time, item.end_time):
+                fail(i, BulkItemStatus.CONFLICT, "Time slot is already booked")
+            elif overlapping_hold(
+                holds_by_day[(item.provider_id, item.appointment_date)],
+                item.patient_id, item.start_time, item.end_time
+            ):
+                fail(i, BulkItemStatus.CONFLICT, "Time slot is held by another patient")
+            else:
+                # Reserve in memory so later items in the batch see this booking
+                index.add_busy(item.start_time, item.end_time)
+                accepted.append(i)
+        
+        inserted = await AppointmentService.insert_appointment_rows(
+            db, [items[i] for i in accepted]
         )
         
-        if conflict.scalar_one_or_none():
-            raise AppointmentConflictError("Time slot is already booked")
+        # Booked items consume their patient's own holds; only days where
+        # the patient holds something cost a round-trip
+        released = []
+        for i in accepted:
+            item = items[i]
+            day_holds = holds_by_day[(item.provider_id, item.appointment_date)]
+            if (
+                (item.provider_id, item.appointment_date, item.start_time) in inserted
+                and any(hold["patient_id"] == item.patient_id for hold in day_holds)
+            ):
+                released += await slot_holds.release_matching(
+                    db,
+                    item.provider_id,
+                    item.patient_id,
+                    item.appointment_date,
+                    item.start_time,
+                    item.end_time
+                )
+        
+        await db.commit()
+        await slot_holds.release_after_commit(db, released)
+        if inserted:
+            booked_dates = [key[1] for key in inserted]
+            analytics_cache.invalidate(min(booked_dates), max(booked_dates))
+        
+        for i in accepted:
+            item = items[i]
+            appointment_id = inserted.get((item.provider_id, item.appointment_date, item.start_time))
+            if appointment_id:
+                results[i]["appointment_id"] = appointment_id
+            else:
+                fail(i, BulkItemStatus.CONFLICT, "Time slot was just booked by another user")
+        
+        return results
+    
+    @staticmethod
+    async def book_appointment_series(
+        db: AsyncSession,
+        appointment_data: AppointmentCreate,
+        recurrence: RecurrenceRule
+    ) -> List[dict]:
+        """
+        Book a recurring series of appointments atomically.
+        
+        The series is expanded in memory and every occurrence is checked
+        against the timing rules, the provider's schedule and existing
+        appointments (one range query each) before anything is inserted.
+        Either every occurrence is booked or SeriesConflictError lists the
+        dates that failed and nothing is written.
+        """
+        step = timedelta(weeks=RECURRENCE_INTERVAL_WEEKS[recurrence.frequency.value])
+        occurrences = [
+            appointment_data.model_copy(
+                update={"appointment_date": appointment_data.appointment_date + step * n}
+            )
+            for n in range(recurrence.occurrences)
+        ]
         
-        # Create appointment
-        appointment = Appointment(
-            patient_id=appointment_data.patient_id,
-            provider_id=appointment_data.provider_id,
-            appointment_date=appointment_data.appointment_date,
-            start_time=appointment_data.start_time,
-            end_time=appointment_data.end_time,
-            appointment_type=appointment_data.appointment_type.value,
-            notes=appointment_data.notes,
-            status='scheduled'
+        conflicts = []
+        for occurrence in occurrences:
+            try:
+                await AppointmentService.validate_appointment_time(
+                    occurrence.appointment_date, occurrence.start_time, occurrence.end_time
+                )
+            except ValidationError as e:
+                conflicts.append({
+                    "appointment_date": occurrence.appointment_date,
+                    "reason": e.message
+                })
+        
+        if conflicts:
+            raise SeriesConflictError(conflicts)
+        
+        first_date = occurrences[0].appointment_date
+        last_date = occurrences[-1].appointment_date
+        indexes = await AppointmentService.load_day_indexes(
+            db, [appointment_data.provider_id], first_date, last_date
         )
+        holds_by_day = defaultdict(list)
+        for hold in await slot_holds.list_active(
+            db, [appointment_data.provider_id], first_date, last_date
+        ):
+            holds_by_day[hold["appointment_date"]].append(hold)
         
-        db.add(appointment)
+        for occurrence in occurrences:
+            index = indexes.get((occurrence.provider_id, occurrence.appointment_date))
+            if index is None or not index.covers(occurrence.start_time, occurrence.end_time):
+                reason = "Provider is not available at the requested time"
+            elif index.overlaps_busy(occurrence.start_time, occurrence.end_time):
+                reason = "Time slot is already booked"
+            elif overlapping_hold(
+                holds_by_day[occurrence.appointment_date],
+                occurrence.patient_id, occurrence.start_time, occurrence.end_time
+            ):
+                reason = "Time slot is held by another patient"
+            else:
+                continue
+            conflicts.append({
+                "appointment_date": occurrence.appointment_date,
+                "reason": reason
+            })
         
-        try:
-            await db.commit()
-            await db.refresh(appointment)
-            return appointment
-        except IntegrityError as e:
+        if conflicts:
+            raise SeriesConflictError(conflicts)
+        
+        inserted = await AppointmentService.insert_appointment_rows(db, occurrences)
+        keys = [
+            (occurrence.provider_id, occurrence.appointment_date, occurrence.start_time)
+            for occurrence in occurrences
+        ]
+        
+        if len(inserted) < len(occurrences):
             await db.rollback()
-            error_msg = str(e.orig)
-            if "appointments_provider_id" in error_msg or "exclude" in error_msg.lower():
-                raise AppointmentConflictError(
-                    "Time slot was just booked by another user"
+            raise SeriesConflictError([
+                {"appointment_date": key[1], "reason": "Time slot was just booked by another user"}
+                for key in keys if key not in inserted
+            ])
+        
+        released = []
+        for occurrence in occurrences:
+            if any(
+                hold["patient_id"] == occurrence.patient_id
+                for hold in holds_by_day[occurrence.appointment_date]
+            ):
+                released += await slot_holds.release_matching(
+                    db,
+                    occurrence.provider_id,
+                    occurrence.patient_id,
+                    occurrence.appointment_date,
+                    occurrence.start_time,
+                    occurrence.end_time
                 )
-            raise
+        
+        await db.commit()
+        await slot_holds.release_after_commit(db, released)
+        series_dates = [key[1] for key in keys]
+        analytics_cache.invalidate(min(series_dates), max(series_dates))
+        return [
+            {
+                "appointment_id": inserted[key],
+                "appointment_date": occurrence.appointment_date,
+                "start_time": occurrence.start_time,
+                "end_time": occurrence.end_time
+            }
+            for key, occurrence in zip(keys, occurrences)
+        ]
     
     @staticmethod
     async def get_appointment(
@@ -191,26 +727,38 @@ class AppointmentService:
     @staticmethod
     async def get_appointment_with_details(
         db: AsyncSession,
-        appointment_id: UUID
+        appointment_id: UUID,
+        fields: Optional[List[str]] = None
     ) -> Optional[dict]:
-        """Get appointment with patient and provider details."""
-        query = text("""
-            SELECT 
-                a.*,
-                p.first_name || ' ' || p.last_name AS patient_name,
-                pr.first_name || ' ' || pr.last_name AS provider_name,
-                pr.specialty AS provider_specialty
-            FROM appointments a
-            JOIN patients p ON a.patient_id = p.patient_id
-            JOIN providers pr ON a.provider_id = pr.provider_id
-            WHERE a.appointment_id = :appointment_id
-        """)
+        """Get appointment with patient and provider details, or just `fields`."""
+        query = appointment_detail_statement(
+            "a.appointment_id = :appointment_id",
+            detail_fields_key(fields)
+        )
         
         result = await db.execute(query, {"appointment_id": str(appointment_id)})
         row = result.mappings().one_or_none()
         
         return dict(row) if row else None
     
+    @staticmethod
+    async def get_appointments_by_ids(
+        db: AsyncSession,
+        appointment_ids: List[UUID],
+        fields: Optional[List[str]] = None
+    ) -> Dict[UUID, dict]:
+        """Fetch many appointments with details in one query, keyed by appointment_id."""
+        query = appointment_detail_statement(
+            "a.appointment_id = ANY(CAST(:appointment_ids AS uuid[]))",
+            detail_fields_key(fields),
+            ('appointment_id',)
+        )
+        
+        result = await db.execute(
+            query, {"appointment_ids": [str(appointment_id) for appointment_id in appointment_ids]}
+        )
+        return {row['appointment_id']: dict(row) for row in result.mappings()}
+    
     @staticmethod
     async def list_appointments(
         db: AsyncSession,
@@ -219,35 +767,37 @@ class AppointmentService:
         appointment_date: Optional[date] = None,
         status: Optional[str] = None,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None
     ) -> List[dict]:
-        """List appointments with filters."""
-        query = text("""
-            SELECT 
-                a.*,
-                p.first_name || ' ' || p.last_name AS patient_name,
-                pr.first_name || ' ' || pr.last_name AS provider_name,
-                pr.specialty AS provider_specialty
-            FROM appointments a
-            JOIN patients p ON a.patient_id = p.patient_id
-            JOIN providers pr ON a.provider_id = pr.provider_id
-            WHERE 1=1
-            {patient_filter}
-            {provider_filter}
-            {date_filter}
-            {status_filter}
-            ORDER BY a.appointment_date DESC, a.start_time DESC
-            LIMIT :limit OFFSET :skip
-        """)
-        
-        filters = {
-            'patient_filter': f"AND a.patient_id = :patient_id" if patient_id else "",
-            'provider_filter': f"AND a.provider_id = :provider_id" if provider_id else "",
-            'date_filter': f"AND a.appointment_date = :appointment_date" if appointment_date else "",
-            'status_filter': f"AND a.status = :status" if status else ""
-        }
+        """
+        List appointments with filters.
+        
+        Pass the cursor from list_cursor() to continue after the last row of
+        the previous page; every page then costs one index range scan on
+        idx_appointments_keyset instead of skipping `skip` rows.
         
-        query_str = query.text.format(**filters)
+        With `fields`, only those columns (plus the keyset columns) are
+        selected and unneeded joins are skipped. Each filter combination
+        maps to one cached statement from appointment_detail_statement().
+        """
+        applied = {
+            'patient_id': patient_id,
+            'provider_id': provider_id,
+            'appointment_date': appointment_date,
+            'status': status,
+            'cursor': cursor
+        }
+        where = " AND ".join(
+            condition for name, condition in LIST_APPOINTMENTS_FILTERS.items() if applied[name]
+        )
+        query = appointment_detail_statement(
+            where or "TRUE",
+            detail_fields_key(fields),
+            tuple(APPOINTMENT_KEY_FIELDS),
+            LIST_APPOINTMENTS_TAIL
+        )
         
         params = {'skip': skip, 'limit': limit}
         if patient_id:
@@ -258,12 +808,30 @@ class AppointmentService:
             params['appointment_date'] = appointment_date
         if status:
             params['status'] = status
+        if cursor:
+            if skip:
+                raise ValidationError("skip cannot be combined with cursor")
+            cursor_date, cursor_time, cursor_id = decode_cursor(cursor, 3)
+            try:
+                params['cursor_date'] = date.fromisoformat(cursor_date)
+                params['cursor_time'] = time.fromisoformat(cursor_time)
+                params['cursor_id'] = str(UUID(cursor_id))
+            except (TypeError, ValueError, AttributeError):
+                raise ValidationError("Invalid cursor")
         
-        result = await db.execute(text(query_str), params)
+        result = await db.execute(query, params)
         rows = result.mappings().all()
         
         return [dict(row) for row in rows]
     
+    @staticmethod
+    def list_cursor(rows: List[dict], limit: int) -> Optional[str]:
+        """Cursor for the page after `rows`, or None if this was the last page."""
+        if len(rows) < limit:
+            return None
+        last = rows[-1]
+        return encode_cursor(last['appointment_date'], last['start_time'], last['appointment_id'])
+    
     @staticmethod
     async def update_appointment_status(
         db: AsyncSession,
@@ -314,6 +882,7 @@ class AppointmentService:
         
         await db.commit()
         await db.refresh(appointment)
+        analytics_cache.invalidate(appointment.appointment_date, appointment.appointment_date)
         return appointment
     
     @staticmethod
@@ -327,6 +896,7 @@ class AppointmentService:
         
         if not appointment:
             raise NotFoundError("Appointment not found")
+        previous_date = appointment.appointment_date
         
         # If rescheduling, validate new time
         if any([update_data.appointment_date, update_data.start_time, update_data.end_time]):
@@ -352,12 +922,17 @@ class AppointmentService:
             appointment.notes = update_data.notes
         
         if update_data.status:
-            return await AppointmentService.update_appointment_status(
+            appointment = await AppointmentService.update_appointment_status(
                 db, appointment_id, update_data.status, update_data.cancellation_reason
             )
+            # A reschedule also moved the appointment off its previous date
+            analytics_cache.invalidate(previous_date, previous_date)
+            return appointment
         
         await db.commit()
         await db.refresh(appointment)
+        analytics_cache.invalidate(previous_date, previous_date)
+        analytics_cache.invalidate(appointment.appointment_date, appointment.appointment_date)
         return appointment
     
     @staticmethod
@@ -371,6 +946,95 @@ class AppointmentService:
             db, appointment_id, AppointmentStatus.CANCELLED, reason
         )
     
+    @staticmethod
+    async def load_day_indexes(
+        db: AsyncSession,
+        provider_ids: List[UUID],
+        start_date: date,
+        end_date: date,
+        include_holds: bool = False
+    ) -> Dict[Tuple[UUID, date], ProviderDayIndex]:
+        """
+        Build availability indexes for every provider and day in a date window.
+        
+        Uses one query for the schedules effective in the window and one for
+        the non-cancelled appointments in it, regardless of window length.
+        Days without any schedule block are left out. With include_holds,
+        slots under an active hold are marked busy as well.
+        """
+        schedules = await db.execute(
+            select(
+                ProviderSchedule.provider_id,
+                ProviderSchedule.day_of_week,
+                ProviderSchedule.start_time,
+                ProviderSchedule.end_time,
+                ProviderSchedule.effective_from,
+                ProviderSchedule.effective_until
+            )
+            .where(
+                and_(
+                    ProviderSchedule.provider_id.in_(provider_ids),
+                    ProviderSchedule.effective_from <= end_date,
+                    or_(
+                        ProviderSchedule.effective_until.is_(None),
+                        ProviderSchedule.effective_until >= start_date
+                    )
+                )
+            )
+        )
+        schedules_by_day = defaultdict(list)
+        for row in schedules:
+            schedules_by_day[(row.provider_id, row.day_of_week)].append(row)
+        
+        if not schedules_by_day:
+            return {}
+        
+        booked = await db.execute(
+            select(
+                Appointment.provider_id,
+                Appointment.appointment_date,
+                Appointment.start_time,
+                Appointment.end_time
+            )
+            .where(
+                and_(
+                    Appointment.provider_id.in_(provider_ids),
+                    Appointment.appointment_date.between(start_date, end_date),
+                    Appointment.status.not_in(['cancelled', 'no_show'])
+                )
+            )
+        )
+        booked_by_day = defaultdict(list)
+        for row in booked:
+            booked_by_day[(row.provider_id, row.appointment_date)].append(
+                (row.start_time, row.end_time)
+            )
+        
+        if include_holds:
+            for hold in await slot_holds.list_active(db, provider_ids, start_date, end_date):
+                booked_by_day[(hold["provider_id"], hold["appointment_date"])].append(
+                    (hold["start_time"], hold["end_time"])
+                )
+        
+        indexes = {}
+        day = start_date
+        while day <= end_date:
+            dow = sql_day_of_week(day)
+            for provider_id in provider_ids:
+                blocks = [
+                    (row.start_time, row.end_time)
+                    for row in schedules_by_day.get((provider_id, dow), [])
+                    if row.effective_from <= day
+                    and (row.effective_until is None or row.effective_until >= day)
+                ]
+                if blocks:
+                    indexes[(provider_id, day)] = ProviderDayIndex(
+                        blocks, booked_by_day.get((provider_id, day), [])
+                    )
+            day += timedelta(days=1)
+        
+        return indexes
+    
     @staticmethod
     async def get_available_slots(
         db: AsyncSession,
@@ -379,22 +1043,124 @@ class AppointmentService:
         slot_duration: int = 30
     ) -> List[dict]:
         """Get available time slots for a provider on a specific date."""
-        query = text("""
-            SELECT * FROM get_available_slots(
-                :provider_id::uuid,
-                :date::date,
-                :duration::interval
-            )
-        """)
+        indexes = await AppointmentService.load_day_indexes(
+            db, [provider_id], date, date, include_holds=True
+        )
+        index = indexes.get((provider_id, date))
+        if index is None:
+            return []
+        
+        return [
+            {"start_time": str(start), "end_time": str(end)}
+            for start, end in index.iter_free_slots(slot_duration)
+        ]
+    
+    @staticmethod
+    async def get_availability_calendar(
+        db: AsyncSession,
+        provider_id: UUID,
+        start_date: date,
+        end_date: date,
+        slot_duration: int = 30
+    ) -> List[dict]:
+        """Get available time slots for a provider for every day in a date range."""
+        if end_date < start_date:
+            raise ValidationError("end_date must be on or after start_date")
+        
+        if (end_date - start_date).days + 1 > MAX_CALENDAR_DAYS:
+            raise ValidationError(f"Date range cannot exceed {MAX_CALENDAR_DAYS} days")
+        
+        indexes = await AppointmentService.load_day_indexes(
+            db, [provider_id], start_date, end_date, include_holds=True
+        )
+        
+        calendar = []
+        day = start_date
+        while day <= end_date:
+            index = indexes.get((provider_id, day))
+            slots = index.iter_free_slots(slot_duration) if index else []
+            calendar.append({
+                "date": day,
+                "available_slots": [
+                    {"start_time": str(start), "end_time": str(end)} for start, end in slots
+                ]
+            })
+            day += timedelta(days=1)
+        
+        return calendar
+    
+    @staticmethod
+    async def find_earliest_available(
+        db: AsyncSession,
+        specialty: str,
+        start_date: date,
+        end_date: date,
+        slot_duration: int = 30,
+        limit: int = 10
+    ) -> List[dict]:
+        """
+        Find the earliest free slots across all active providers of a specialty.
+        
+        Loads every provider's schedules and appointments for the window in bulk,
+        then lazily k-way merges each provider's free slots in time order and
+        stops once `limit` slots are found. Only slots bookable under
+        MIN_ADVANCE and MAX_ADVANCE are returned.
+        """
+        if end_date < start_date:
+            raise ValidationError("end_date must be on or after start_date")
+        
+        if (end_date - start_date).days + 1 > MAX_CALENDAR_DAYS:
+            raise ValidationError(f"Date range cannot exceed {MAX_CALENDAR_DAYS} days")
+        
+        now = datetime.now()
+        earliest_start = now + MIN_ADVANCE
+        latest_start = now + MAX_ADVANCE
+        end_date = min(end_date, latest_start.date())
+        if end_date < start_date:
+            return []
         
         result = await db.execute(
-            query,
-            {
-                "provider_id": str(provider_id),
-                "date": date,
-                "duration": f"{slot_duration} minutes"
-            }
+            select(
+                Provider.provider_id,
+                (Provider.first_name + ' ' + Provider.last_name).label('provider_name'),
+                Provider.specialty
+            )
+            .where(
+                and_(
+                    Provider.specialty.ilike(f"%{specialty}%"),
+                    Provider.is_active.is_(True)
+                )
+            )
+        )
+        providers = {row.provider_id: row for row in result}
+        if not providers:
+            return []
+        
+        indexes = await AppointmentService.load_day_indexes(
+            db, list(providers), start_date, end_date, include_holds=True
         )
         
-        slots = result.mappings().all()
-        return [{"start_time": str(slot['start_time']), "end_time": str(slot['end_time'])} for slot in slots]
+        def provider_slots(provider_id: UUID):
+            day = start_date
+            while day <= end_date:
+                index = indexes.get((provider_id, day))
+                if index:
+                    for start, end in index.iter_free_slots(slot_duration):
+                        start_dt = datetime.combine(day, start)
+                        if earliest_start <= start_dt <= latest_start:
+                            yield start_dt, str(provider_id), provider_id, day, start, end
+                day += timedelta(days=1)
+        
+        merged = heapq.merge(*(provider_slots(provider_id) for provider_id in providers))
+        
+        return [
+            {
+                "provider_id": provider_id,
+                "provider_name": providers[provider_id].provider_name,
+                "specialty": providers[provider_id].specialty,
+                "date": day,
+                "start_time": str(start),
+                "end_time": str(end)
+            }
+            for _, _, provider_id, day, start, end in islice(merged, limit)
+        ]
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
-from datetime import date
+from datetime import date, timedelta
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db, is_sticky
 from app.core.appointment_service import AppointmentService
+from app.core.export_service import ExportService, EXPORT_MEDIA_TYPES
+from app.utils.fast_json import fast_json_response, fast_json_object, batch_json_response
+from app.utils.fieldsets import parse_fields
 from app.schemas.appointment import (
     AppointmentCreate,
     AppointmentUpdate,
@@ -13,12 +18,23 @@ from app.schemas.appointment import (
     AppointmentDetailResponse,
     AppointmentStatus
 )
+from app.schemas.booking import (
+    BulkItemStatus,
+    AppointmentBulkCreate,
+    AppointmentBulkResponse,
+    AppointmentSeriesCreate,
+    AppointmentSeriesResponse,
+    SlotHoldCreate,
+    SlotHoldResponse
+)
+from app.schemas.common import BatchIdsRequest
 from app.utils.exceptions import (
     AppointmentConflictError,
     ProviderUnavailableError,
     NotFoundError,
     ValidationError,
-    InvalidTransitionError
+    InvalidTransitionError,
+    SeriesConflictError
 )
 
 router = APIRouter()
@@ -38,10 +54,12 @@ async def book_appointment(
     - Appointment time validation (min 15 min, max 2 hours)
     - Advance booking rules (2 hours minimum, 90 days maximum)
     
+    The schedule check, conflict check and insert run as a single statement.
+    
     Returns 409 Conflict if time slot is unavailable.
     """
     try:
-        return await AppointmentService.book_appointment(db, appointment)
+        return await AppointmentService.book_appointment_fast(db, appointment)
     except (AppointmentConflictError, ProviderUnavailableError, ValidationError) as e:
         raise HTTPException(status_code=e.status_code, detail={
             "error": e.error_code,
@@ -49,40 +67,256 @@ async def book_appointment(
         })
 
 
+@router.post("/bulk", response_model=AppointmentBulkResponse)
+async def book_appointments_bulk(
+    bulk: AppointmentBulkCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Book up to 1000 appointments in one request.
+    
+    Each item is validated with the same rules as single booking. Items that
+    pass are inserted together; the response reports per item whether it was
+    booked or why it failed (invalid, unavailable, conflict), including
+    overlaps between items of the same batch.
+    """
+    results = await AppointmentService.book_appointments_bulk(db, bulk.appointments)
+    booked = sum(1 for result in results if result["status"] == BulkItemStatus.BOOKED)
+    return {
+        "booked": booked,
+        "failed": len(results) - booked,
+        "results": results
+    }
+
+
+@router.post("/series", response_model=AppointmentSeriesResponse, status_code=status.HTTP_201_CREATED)
+async def book_appointment_series(
+    series: AppointmentSeriesCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Book a weekly or biweekly series of appointments.
+    
+    The first occurrence is the appointment in the request; the rest repeat
+    at the same time of day. The series is booked all-or-nothing: if any
+    occurrence fails, nothing is booked and the 409 response lists each
+    failing date with its reason.
+    """
+    try:
+        appointments = await AppointmentService.book_appointment_series(
+            db, series.appointment, series.recurrence
+        )
+    except SeriesConflictError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message,
+            "conflicts": jsonable_encoder(e.conflicts)
+        })
+    return {
+        "frequency": series.recurrence.frequency,
+        "appointments": appointments
+    }
+
+
+@router.post("/holds", response_model=SlotHoldResponse, status_code=status.HTTP_201_CREATED)
+async def hold_slot(
+    hold: SlotHoldCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Hold a free slot for a patient while they finish booking.
+    
+    The hold expires after ttl_seconds (default 120). While it is live the
+    slot is left out of availability results and booking it as a different
+    patient fails immediately with 409. Booking it as the same patient
+    releases the hold.
+    """
+    try:
+        return await AppointmentService.hold_slot(db, hold)
+    except (AppointmentConflictError, ProviderUnavailableError, ValidationError) as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+
+
+@router.delete("/holds/{hold_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def release_hold(
+    hold_id: UUID,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Release a slot hold before it expires.
+    """
+    try:
+        await AppointmentService.release_hold(db, hold_id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+
+
 @router.get("/", response_model=List[AppointmentDetailResponse])
 async def list_appointments(
+    response: Response,
     patient_id: Optional[UUID] = Query(None, description="Filter by patient"),
     provider_id: Optional[UUID] = Query(None, description="Filter by provider"),
     appointment_date: Optional[date] = Query(None, description="Filter by date"),
     status: Optional[AppointmentStatus] = Query(None, description="Filter by status"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    fast: bool = Query(False, description="Encode rows directly with orjson, skipping model validation"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. appointment_id,start_time,status,patient_name"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     List appointments with optional filters.
+    
+    Newest first. For deep paging pass the X-Next-Cursor response header
+    back as `cursor` instead of increasing `skip` (the two cannot be
+    combined); the header is omitted on the last page. Set `fast=true` for large pages to skip per-row model
+    construction. `fields` narrows both the query and each returned object.
     """
     status_value = status.value if status else None
-    appointments = await AppointmentService.list_appointments(
-        db, patient_id, provider_id, appointment_date, status_value, skip, limit
-    )
+    try:
+        selected = parse_fields(fields)
+        appointments = await AppointmentService.list_appointments(
+            db, patient_id, provider_id, appointment_date, status_value, skip, limit, cursor, selected
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+    
+    fast = fast or bool(selected)
+    if fast:
+        response = fast_json_response(appointments, AppointmentDetailResponse, selected)
+    
+    next_cursor = AppointmentService.list_cursor(appointments, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    if fast:
+        return response
     return [AppointmentDetailResponse(**apt) for apt in appointments]
 
 
+@router.get("/earliest-available")
+async def find_earliest_available(
+    specialty: str = Query(..., min_length=1, description="Provider specialty"),
+    start_date: date = Query(..., description="Search from this date"),
+    end_date: Optional[date] = Query(None, description="Search until this date (default: start_date + 13 days)"),
+    slot_duration: int = Query(30, ge=15, le=120, description="Slot duration in minutes"),
+    limit: int = Query(10, ge=1, le=100, description="Number of slots to return"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Find the earliest open slots across every active provider of a specialty.
+    
+    Slots are returned in chronological order across providers, starting no
+    earlier than the minimum booking notice.
+    """
+    end_date = end_date or start_date + timedelta(days=13)
+    try:
+        slots = await AppointmentService.find_earliest_available(
+            db, specialty, start_date, end_date, slot_duration, limit
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+    return {
+        "specialty": specialty,
+        "start_date": start_date,
+        "end_date": end_date,
+        "slot_duration_minutes": slot_duration,
+        "available_slots": slots
+    }
+
+
+@router.get("/export")
+async def export_appointments(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    patient_id: Optional[UUID] = Query(None, description="Filter by patient"),
+    provider_id: Optional[UUID] = Query(None, description="Filter by provider"),
+    appointment_date: Optional[date] = Query(None, description="Filter by date"),
+    status: Optional[AppointmentStatus] = Query(None, description="Filter by status"),
+    start_date: Optional[date] = Query(None, description="Earliest appointment date"),
+    end_date: Optional[date] = Query(None, description="Latest appointment date")
+):
+    """
+    Stream all matching appointments as NDJSON or CSV.
+    
+    Rows are read from a server-side cursor and written as they arrive,
+    oldest first, so exports of any size use bounded memory.
+    """
+    # `status` is the filter here, not the fastapi status module
+    if start_date and end_date and end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must be on or after start_date")
+    
+    return StreamingResponse(
+        ExportService.stream_appointments(
+            format, patient_id, provider_id, appointment_date,
+            status.value if status else None, start_date, end_date,
+            sticky=is_sticky(request)
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=appointments.{format}"}
+    )
+
+
+@router.post("/batch")
+async def get_appointments_batch(
+    batch: BatchIdsRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. appointment_id,start_time,status,patient_name"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Fetch up to 5000 appointments by ID in a single query.
+    
+    `items` follows the order of `ids`, with null for IDs that do not
+    exist; those IDs are also listed in `missing`.
+    """
+    try:
+        selected = parse_fields(fields)
+        found = await AppointmentService.get_appointments_by_ids(db, batch.ids, selected)
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+    return batch_json_response(batch.ids, found, AppointmentDetailResponse, selected)
+
+
 @router.get("/{appointment_id}", response_model=AppointmentDetailResponse)
 async def get_appointment(
     appointment_id: UUID,
-    db: AsyncSession = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. appointment_id,start_time,status"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Get a specific appointment by ID with full details.
+    Get a specific appointment by ID with full details, or just `fields`.
     """
-    appointment = await AppointmentService.get_appointment_with_details(db, appointment_id)
+    try:
+        selected = parse_fields(fields)
+        appointment = await AppointmentService.get_appointment_with_details(db, appointment_id, selected)
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
     if not appointment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Appointment not found"
         )
+    if selected:
+        return fast_json_object(appointment, AppointmentDetailResponse, selected)
     return AppointmentDetailResponse(**appointment)
 
 
@@ -134,7 +368,7 @@ async def get_available_slots(
     provider_id: UUID,
     date: date = Query(..., description="Date to check availability"),
     slot_duration: int = Query(30, ge=15, le=120, description="Slot duration in minutes"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get available time slots for a provider on a specific date.
@@ -152,3 +386,34 @@ async def get_available_slots(
         "available_slots": slots
     }
 
+
+@router.get("/providers/{provider_id}/availability")
+async def get_availability_calendar(
+    provider_id: UUID,
+    start_date: date = Query(..., description="First day of the calendar"),
+    end_date: date = Query(..., description="Last day of the calendar (inclusive)"),
+    slot_duration: int = Query(30, ge=15, le=120, description="Slot duration in minutes"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get available time slots for a provider across a date range.
+    
+    Returns one entry per day in the range, computed from a constant number
+    of queries regardless of how many days are requested (max 62 days).
+    """
+    try:
+        days = await AppointmentService.get_availability_calendar(
+            db, provider_id, start_date, end_date, slot_duration
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+    return {
+        "provider_id": provider_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "slot_duration_minutes": slot_duration,
+        "days": days
+    }
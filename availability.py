@@ -0,0 +1,131 @@
+from bisect import bisect_right
+from datetime import date, time
+from typing import Iterable, Iterator, List, Tuple
+
+# Half-open interval [start, end) in seconds since midnight
+Interval = Tuple[int, int]
+
+
+def sql_day_of_week(value: date) -> int:
+    """Convert Python's weekday (0=Monday) to the SQL convention (0=Sunday)."""
+    return (value.weekday() + 1) % 7
+
+
+def to_seconds(value: time) -> int:
+    """Seconds since midnight for a time of day."""
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def from_seconds(seconds: int) -> time:
+    """Time of day for a number of seconds since midnight."""
+    return time(seconds // 3600, (seconds % 3600) // 60, seconds % 60)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort intervals and merge the ones that overlap or touch."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class ProviderDayIndex:
+    """
+    Sorted interval index of one provider's working blocks and bookings for one day.
+
+    Schedule blocks and busy intervals are each kept merged and sorted, so
+    coverage and overlap checks are a binary search and listing free slots
+    is a single linear pass over both lists.
+    """
+
+    __slots__ = ("blocks", "busy", "_block_starts", "_busy_starts")
+
+    def __init__(
+        self,
+        blocks: Iterable[Tuple[time, time]] = (),
+        busy: Iterable[Tuple[time, time]] = ()
+    ):
+        self.blocks = merge_intervals(
+            (to_seconds(start), to_seconds(end)) for start, end in blocks
+        )
+        self.busy = merge_intervals(
+            (to_seconds(start), to_seconds(end)) for start, end in busy
+        )
+        self._block_starts = [start for start, _ in self.blocks]
+        self._busy_starts = [start for start, _ in self.busy]
+
+    def add_busy(self, start: time, end: time):
+        """Mark [start, end) as booked."""
+        self.busy = merge_intervals(self.busy + [(to_seconds(start), to_seconds(end))])
+        self._busy_starts = [s for s, _ in self.busy]
+
+    def covers(self, start: time, end: time) -> bool:
+        """Whether [start, end) falls entirely inside a working block."""
+        start_s, end_s = to_seconds(start), to_seconds(end)
+        i = bisect_right(self._block_starts, start_s) - 1
+        return i >= 0 and self.blocks[i][1] >= end_s
+
+    def overlaps_busy(self, start: time, end: time) -> bool:
+        """Whether [start, end) intersects any booked interval."""
+        start_s, end_s = to_seconds(start), to_seconds(end)
+        i = bisect_right(self._busy_starts, start_s) - 1
+        if i >= 0 and self.busy[i][1] > start_s:
+            return True
+        return i + 1 < len(self.busy) and self.busy[i + 1][0] < end_s
+
+    def is_free(self, start: time, end: time) -> bool:
+        """Whether [start, end) is inside the schedule and not booked."""
+        return self.covers(start, end) and not self.overlaps_busy(start, end)
+
+    def iter_free_slots(self, slot_duration: int) -> Iterator[Tuple[time, time]]:
+        """
+        Yield free (start_time, end_time) slots of slot_duration minutes.
+
+        Slots are laid out back to back from the start of each working block,
+        matching the grid of the get_available_slots() SQL function.
+        """
+        step = slot_duration * 60
+        busy = self.busy
+        cursor = 0
+
+        for block_start, block_end in self.blocks:
+            slot = block_start
+            while slot + step <= block_end:
+                while cursor < len(busy) and busy[cursor][1] <= slot:
+                    cursor += 1
+                if cursor < len(busy) and busy[cursor][0] < slot + step:
+                    # Jump to the first grid point at or after the end of this booking
+                    slot += -(-(busy[cursor][1] - slot) // step) * step
+                    continue
+                yield from_seconds(slot), from_seconds(slot + step)
+                slot += step
+
+    def free_slots(self, slot_duration: int) -> List[Tuple[time, time]]:
+        """All free slots of slot_duration minutes, in time order."""
+        return list(self.iter_free_slots(slot_duration))
+
+    def free_gaps(self) -> List[Tuple[time, time]]:
+        """Maximal unbooked stretches inside the working blocks, in time order."""
+        gaps: List[Interval] = []
+        busy = self.busy
+        cursor = 0
+
+        for block_start, block_end in self.blocks:
+            start = block_start
+            while cursor < len(busy) and busy[cursor][1] <= start:
+                cursor += 1
+            # A booking may run past this block, so scan without consuming it
+            i = cursor
+            while i < len(busy) and busy[i][0] < block_end:
+                if busy[i][0] > start:
+                    gaps.append((start, busy[i][0]))
+                start = max(start, busy[i][1])
+                i += 1
+            if start < block_end:
+                gaps.append((start, block_end))
+
+        return [(from_seconds(start), from_seconds(end)) for start, end in gaps]
@@ -0,0 +1,14 @@
+from sqlalchemy import any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from typing import List
+from uuid import UUID
+
+
+def ids_match(column, ids: List[UUID]):
+    """
+    `column = ANY(:ids)` with every id bound as one uuid[] parameter.
+
+    Unlike IN (...) the statement text does not grow with the number of
+    ids, so one prepared statement serves every batch size.
+    """
+    return column == any_(bindparam("ids", list(ids), type_=ARRAY(PG_UUID(as_uuid=True))))
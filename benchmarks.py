@@ -0,0 +1,514 @@
+"""
+Benchmarks for the hot paths of the appointment system.
+
+Run against a database loaded with db.sql and seed.sql:
+
+    python benchmarks.py booking --bookings 200
+    python benchmarks.py contention --concurrency 50 200 1000
+    python benchmarks.py patient-search --patients 1000000
+    python benchmarks.py serialization --rows 1000
+    python benchmarks.py utilization --days 30 365
+    python benchmarks.py analytics-engines --appointments 10000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import json
+import time as timer
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List
+from uuid import uuid4
+
+from pydantic import TypeAdapter
+
+from sqlalchemy import delete, select, and_, func, text
+from sqlalchemy.exc import IntegrityError
+
+from app.db.session import AsyncSessionLocal
+from app.db.models import Appointment, Patient, ProviderSchedule
+from app.core.patient_service import PatientService
+from app.core.appointment_service import AppointmentService, MIN_ADVANCE
+from app.core.booking_queue import booking_serializer
+from app.core import analytics_service
+from app.core.analytics_service import AnalyticsService
+from app.core.analytics_cache import analytics_cache
+from app.core.analytics_refresh import analytics_refresher
+from app.core.analytics_snapshot import analytics_snapshotter
+from app.schemas.appointment import AppointmentCreate, AppointmentDetailResponse
+from app.utils.fast_json import fast_json_response
+from app.utils.exceptions import AppointmentConflictError, ProviderUnavailableError
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def report(name, latencies, elapsed):
+    """Print throughput and latency percentiles (latencies in seconds)."""
+    ms = [latency * 1000 for latency in latencies]
+    print(
+        f"{name:<28} n={len(ms):<6} "
+        f"throughput={len(ms) / elapsed:8.1f}/s "
+        f"mean={statistics.mean(ms):7.2f}ms "
+        f"p50={percentile(ms, 50):7.2f}ms "
+        f"p99={percentile(ms, 99):7.2f}ms"
+    )
+
+
+async def find_free_slots(db, count, slot_minutes=15):
+    """Find `count` bookable slots for the first provider that has a schedule."""
+    provider_id = (await db.execute(select(ProviderSchedule.provider_id).limit(1))).scalar_one()
+    patient_id = (await db.execute(select(Patient.patient_id).limit(1))).scalar_one()
+
+    start = date.today()
+    end = start + timedelta(days=89)
+    indexes = await AppointmentService.load_day_indexes(db, [provider_id], start, end)
+    earliest = datetime.now() + MIN_ADVANCE
+
+    slots = []
+    for (_, day), index in sorted(indexes.items(), key=lambda item: item[0][1]):
+        for slot_start, slot_end in index.iter_free_slots(slot_minutes):
+            if datetime.combine(day, slot_start) >= earliest:
+                slots.append((day, slot_start, slot_end))
+            if len(slots) == count:
+                return provider_id, patient_id, slots
+
+    raise SystemExit(f"Only {len(slots)} free slots available, need {count}")
+
+
+async def delete_benchmark_appointments(provider_id, dates):
+    """Remove the appointments a benchmark booked."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            delete(Appointment).where(
+                and_(
+                    Appointment.provider_id == provider_id,
+                    Appointment.appointment_date.in_(dates),
+                    Appointment.notes == "benchmark"
+                )
+            )
+        )
+        await db.commit()
+
+
+async def legacy_book_appointment(db, appointment_data):
+    """
+    The original ORM booking path, kept as the baseline for book_appointment_fast.
+
+    Schedule check, conflict SELECT, INSERT and refresh each take their own
+    round-trip, and losers of a race surface as an IntegrityError.
+    """
+    await AppointmentService.validate_appointment_time(
+        appointment_data.appointment_date,
+        appointment_data.start_time,
+        appointment_data.end_time
+    )
+
+    has_schedule = await AppointmentService.check_provider_schedule(
+        db,
+        appointment_data.provider_id,
+        appointment_data.appointment_date,
+        appointment_data.start_time,
+        appointment_data.end_time
+    )
+    if not has_schedule:
+        raise ProviderUnavailableError("Provider is not available at the requested time")
+
+    conflict = await db.execute(
+        select(Appointment).where(
+            and_(
+                Appointment.provider_id == appointment_data.provider_id,
+                Appointment.appointment_date == appointment_data.appointment_date,
+                Appointment.status.not_in(['cancelled', 'no_show']),
+                Appointment.start_time < appointment_data.end_time,
+                Appointment.end_time > appointment_data.start_time
+            )
+        )
+    )
+    if conflict.scalar_one_or_none():
+        raise AppointmentConflictError("Time slot is already booked")
+
+    appointment = Appointment(
+        patient_id=appointment_data.patient_id,
+        provider_id=appointment_data.provider_id,
+        appointment_date=appointment_data.appointment_date,
+        start_time=appointment_data.start_time,
+        end_time=appointment_data.end_time,
+        appointment_type=appointment_data.appointment_type.value,
+        notes=appointment_data.notes,
+        status='scheduled'
+    )
+    db.add(appointment)
+
+    try:
+        await db.commit()
+        await db.refresh(appointment)
+        analytics_cache.invalidate(appointment.appointment_date, appointment.appointment_date)
+        return appointment
+    except IntegrityError as e:
+        await db.rollback()
+        error_msg = str(e.orig)
+        if "appointments_provider_id" in error_msg or "exclude" in error_msg.lower():
+            raise AppointmentConflictError("Time slot was just booked by another user")
+        raise
+
+
+async def bench_booking(args):
+    """Compare the ORM booking path (4+ round-trips) with book_appointment_fast."""
+    async with AsyncSessionLocal() as db:
+        provider_id, patient_id, slots = await find_free_slots(db, args.bookings * 2)
+
+    paths = [
+        ("legacy_book_appointment", legacy_book_appointment, slots[::2]),
+        ("book_appointment_fast", AppointmentService.book_appointment_fast, slots[1::2]),
+    ]
+    booked_dates = {day for day, _, _ in slots}
+
+    try:
+        for name, book, path_slots in paths:
+            latencies = []
+            started = timer.perf_counter()
+            for day, slot_start, slot_end in path_slots:
+                data = AppointmentCreate(
+                    patient_id=patient_id,
+                    provider_id=provider_id,
+                    appointment_date=day,
+                    start_time=slot_start,
+                    end_time=slot_end,
+                    notes="benchmark"
+                )
+                async with AsyncSessionLocal() as db:
+                    t0 = timer.perf_counter()
+                    await book(db, data)
+                    latencies.append(timer.perf_counter() - t0)
+            report(name, latencies, timer.perf_counter() - started)
+    finally:
+        await delete_benchmark_appointments(provider_id, booked_dates)
+
+
+async def bench_contention(args):
+    """
+    Concurrent bookers racing for a small set of slots on one provider.
+
+    "legacy" is legacy_book_appointment, the ORM path, where losers hit the
+    exclusion constraint; the other modes run book_appointment_fast with
+    the given booking serialization mode.
+    """
+    async with AsyncSessionLocal() as db:
+        provider_id, patient_id, slots = await find_free_slots(db, args.slots)
+    booked_dates = {day for day, _, _ in slots}
+
+    for concurrency in args.concurrency:
+        for mode in args.modes:
+            if mode == "legacy":
+                booking_serializer.mode = "off"
+                book = legacy_book_appointment
+            else:
+                booking_serializer.mode = mode
+                book = AppointmentService.book_appointment_fast
+            booking_serializer.reset_stats()
+
+            latencies = []
+            outcomes = Counter()
+
+            async def booker(day, slot_start, slot_end):
+                data = AppointmentCreate(
+                    patient_id=patient_id,
+                    provider_id=provider_id,
+                    appointment_date=day,
+                    start_time=slot_start,
+                    end_time=slot_end,
+                    notes="benchmark"
+                )
+                t0 = timer.perf_counter()
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await book(db, data)
+                    outcomes["booked"] += 1
+                except AppointmentConflictError:
+                    outcomes["conflict"] += 1
+                except Exception:
+                    outcomes["error"] += 1
+                latencies.append(timer.perf_counter() - t0)
+
+            started = timer.perf_counter()
+            await asyncio.gather(*(booker(*random.choice(slots)) for _ in range(concurrency)))
+            report(f"{mode} x{concurrency}", latencies, timer.perf_counter() - started)
+            print(f"{'':<28} outcomes={dict(outcomes)} serializer={booking_serializer.stats()}")
+
+            await delete_benchmark_appointments(provider_id, booked_dates)
+
+
+SEED_PATIENTS_SQL = text("""
+    INSERT INTO patients (first_name, last_name, date_of_birth, email, phone, insurance_id)
+    SELECT
+        (ARRAY['John', 'Jane', 'Michael', 'Emily', 'David', 'Sarah'])[1 + g % 6],
+        (ARRAY['Doe', 'Smith', 'Johnson', 'Williams', 'Brown', 'Davis'])[1 + g / 6 % 6] || g,
+        DATE '1940-01-01' + g % 25000,
+        'bench' || g || '@example.com',
+        '+1202' || lpad((g % 10000000)::text, 7, '0'),
+        'BENCH'
+    FROM generate_series(1, :count) AS g
+""")
+
+
+async def bench_patient_search(args):
+    """Compare the ILIKE list_patients search with the trigram search_patients."""
+    async with AsyncSessionLocal() as db:
+        existing = (await db.execute(
+            select(func.count()).select_from(Patient).where(Patient.insurance_id == "BENCH")
+        )).scalar_one()
+        if existing < args.patients:
+            print(f"Seeding {args.patients - existing} patients...")
+            await db.execute(SEED_PATIENTS_SQL, {"count": args.patients - existing})
+            await db.commit()
+            await db.execute(text("ANALYZE patients"))
+
+    terms = ["smith4821", "bench77123@", "(202) 555-1001", "jonhson"]
+    paths = [
+        ("list_patients (ILIKE)", lambda db, term: PatientService.list_patients(db, 0, 20, term)),
+        ("search_patients (pg_trgm)", lambda db, term: PatientService.search_patients(db, term, 20)),
+    ]
+
+    try:
+        for term in terms:
+            print(f"term={term!r}")
+            for name, search in paths:
+                latencies = []
+                started = timer.perf_counter()
+                async with AsyncSessionLocal() as db:
+                    for _ in range(args.iterations):
+                        t0 = timer.perf_counter()
+                        await search(db, term)
+                        latencies.append(timer.perf_counter() - t0)
+                report(f"  {name}", latencies, timer.perf_counter() - started)
+    finally:
+        if not args.keep:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(Patient).where(Patient.insurance_id == "BENCH"))
+                await db.commit()
+
+
+def sample_appointment_rows(count):
+    """Rows shaped like list_appointments output, without touching the database."""
+    now = datetime.now(timezone.utc)
+    patient_id, provider_id = uuid4(), uuid4()
+    return [
+        {
+            "appointment_id": uuid4(),
+            "patient_id": patient_id,
+            "provider_id": provider_id,
+            "appointment_date": date.today() + timedelta(days=i // 32),
+            "start_time": time(8 + i % 32 // 4, i % 4 * 15),
+            "end_time": time(8 + i % 32 // 4, i % 4 * 15 + 14),
+            "status": "scheduled",
+            "appointment_type": "consultation",
+            "notes": "Follow-up on lab results",
+            "cancellation_reason": None,
+            "created_at": now,
+            "updated_at": now,
+            "patient_name": "Jane Smith",
+            "provider_name": "Michael Johnson",
+            "provider_specialty": "Cardiology"
+        }
+        for i in range(count)
+    ]
+
+
+async def bench_serialization(args):
+    """
+    CPU time to turn list_appointments rows into a JSON body.
+
+    "model" mirrors the default route: one AppointmentDetailResponse per row,
+    then FastAPI's response_model validation and JSON encoding. "fast" is
+    the fast=true path.
+    """
+    rows = sample_appointment_rows(args.rows)
+    adapter = TypeAdapter(List[AppointmentDetailResponse])
+
+    def model_path():
+        models = [AppointmentDetailResponse(**row) for row in rows]
+        content = adapter.dump_python(adapter.validate_python(models), mode="json")
+        return json.dumps(content).encode()
+
+    def fast_path():
+        return fast_json_response(rows, AppointmentDetailResponse).body
+
+    for name, encode in [("model", model_path), ("fast", fast_path)]:
+        encode()
+        started = timer.process_time()
+        for _ in range(args.iterations):
+            encode()
+        per_page = (timer.process_time() - started) / args.iterations
+        per_thousand = per_page * 1000 / args.rows
+        print(f"{name:<28} rows={args.rows:<6} cpu/1000 rows={per_thousand * 1000:8.2f}ms")
+
+
+async def bench_utilization(args):
+    """Latency of windowed provider utilization for each window length."""
+    analytics_cache.ttl = 0
+    async with AsyncSessionLocal() as db:
+        for days in args.days:
+            latencies = []
+            started = timer.perf_counter()
+            for _ in range(args.iterations):
+                t0 = timer.perf_counter()
+                rows = await AnalyticsService.get_provider_utilization(db, days)
+                latencies.append(timer.perf_counter() - t0)
+            report(f"utilization {days}d ({len(rows)} providers)", latencies, timer.perf_counter() - started)
+
+
+# Past, non-overlapping 15-minute slots spread over every provider; only
+# final statuses are allowed in the past
+SEED_APPOINTMENTS_SQL = text("""
+    WITH pr AS (
+        SELECT array_agg(provider_id ORDER BY provider_id) AS ids FROM providers
+    ),
+    pa AS (
+        SELECT array_agg(patient_id) AS ids FROM (SELECT patient_id FROM patients LIMIT 10000) AS p
+    )
+    INSERT INTO appointments (
+        patient_id, provider_id, appointment_date, start_time, end_time, status, notes
+    )
+    SELECT
+        pa.ids[1 + g % cardinality(pa.ids)],
+        pr.ids[1 + g % cardinality(pr.ids)],
+        CURRENT_DATE - 1 - (g / cardinality(pr.ids) / 32)::INTEGER,
+        TIME '08:00' + (g / cardinality(pr.ids) % 32) * INTERVAL '15 minutes',
+        TIME '08:15' + (g / cardinality(pr.ids) % 32) * INTERVAL '15 minutes',
+        (ARRAY['completed', 'completed', 'completed', 'completed', 'cancelled', 'no_show'])[1 + g % 6],
+        'benchmark-analytics'
+    FROM generate_series(:offset, :offset + :count - 1) AS g, pr, pa
+    ON CONFLICT DO NOTHING
+""")
+
+ENGINE_QUERIES = [
+    ("utilization 30d", lambda db: AnalyticsService.get_provider_utilization(db, 30)),
+    ("utilization 365d", lambda db: AnalyticsService.get_provider_utilization(db, 365)),
+    ("daily load", lambda db: AnalyticsService.get_daily_load(
+        db, date.today() - timedelta(days=365), date.today()
+    )),
+    ("no-shows", lambda db: AnalyticsService.get_no_show_analysis(db)),
+]
+
+
+async def bench_analytics_engines(args):
+    """
+    The same analytics queries answered by each engine, uncached.
+
+    Seeds appointments going back from yesterday, 32 per provider per day
+    and tagged for cleanup. Then refreshes the materialized views,
+    publishes a snapshot and times each query per engine. Build costs are
+    reported separately from query latency.
+    """
+    analytics_cache.ttl = 0
+    async with AsyncSessionLocal() as db:
+        existing = (await db.execute(
+            select(func.count()).select_from(Appointment)
+            .where(Appointment.notes == "benchmark-analytics")
+        )).scalar_one()
+        offset = existing
+        while existing < args.appointments:
+            count = min(args.batch, args.appointments - existing)
+            print(f"Seeding appointments {existing}..{existing + count}...")
+            await db.execute(SEED_APPOINTMENTS_SQL, {"offset": offset, "count": count})
+            await db.commit()
+            offset += count
+            existing = (await db.execute(
+                select(func.count()).select_from(Appointment)
+                .where(Appointment.notes == "benchmark-analytics")
+            )).scalar_one()
+        await db.execute(text("ANALYZE appointments"))
+
+    try:
+        if "views" in args.engines:
+            t0 = timer.perf_counter()
+            await analytics_refresher.refresh()
+            print(f"{'views refresh':<28} {(timer.perf_counter() - t0) * 1000:10.1f}ms")
+        if "snapshot" in args.engines:
+            t0 = timer.perf_counter()
+            await analytics_snapshotter.build(force=True)
+            analytics_snapshotter.current()
+            print(
+                f"{'snapshot build':<28} {(timer.perf_counter() - t0) * 1000:10.1f}ms "
+                f"appointments={analytics_snapshotter.stats()['appointments']}"
+            )
+
+        for name, query in ENGINE_QUERIES:
+            print(name)
+            for engine in args.engines:
+                analytics_service.ANALYTICS_ENGINE = engine
+                latencies = []
+                started = timer.perf_counter()
+                async with AsyncSessionLocal() as db:
+                    for _ in range(args.iterations):
+                        t0 = timer.perf_counter()
+                        await query(db)
+                        latencies.append(timer.perf_counter() - t0)
+                report(f"  {engine}", latencies, timer.perf_counter() - started)
+    finally:
+        if not args.keep:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(Appointment).where(Appointment.notes == "benchmark-analytics"))
+                await db.commit()
+
+
+BENCHMARKS = {
+    "booking": bench_booking,
+    "contention": bench_contention,
+    "patient-search": bench_patient_search,
+    "serialization": bench_serialization,
+    "utilization": bench_utilization,
+    "analytics-engines": bench_analytics_engines,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    booking = subparsers.add_parser("booking", help="Single-booking latency per code path")
+    booking.add_argument("--bookings", type=int, default=200)
+
+    contention = subparsers.add_parser("contention", help="Throughput and p99 under contention")
+    contention.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    contention.add_argument("--slots", type=int, default=16)
+    contention.add_argument(
+        "--modes", nargs="+", default=["legacy", "off", "local", "advisory"],
+        choices=["legacy", "off", "local", "advisory"]
+    )
+
+    search = subparsers.add_parser("patient-search", help="ILIKE vs trigram patient search")
+    search.add_argument("--patients", type=int, default=1_000_000)
+    search.add_argument("--iterations", type=int, default=20)
+    search.add_argument("--keep", action="store_true", help="Keep seeded patients afterwards")
+
+    serialization = subparsers.add_parser("serialization", help="CPU per 1000 rows per list encoding")
+    serialization.add_argument("--rows", type=int, default=1000)
+    serialization.add_argument("--iterations", type=int, default=50)
+
+    utilization = subparsers.add_parser("utilization", help="Windowed provider utilization latency")
+    utilization.add_argument("--days", type=int, nargs="+", default=[30, 365])
+    utilization.add_argument("--iterations", type=int, default=50)
+
+    engines = subparsers.add_parser("analytics-engines", help="Analytics query latency per engine")
+    engines.add_argument("--appointments", type=int, default=10_000_000)
+    engines.add_argument("--batch", type=int, default=500_000, help="Appointments seeded per transaction")
+    engines.add_argument("--iterations", type=int, default=20)
+    engines.add_argument(
+        "--engines", nargs="+", default=["views", "rollup", "snapshot"],
+        choices=["views", "rollup", "snapshot"]
+    )
+    engines.add_argument("--keep", action="store_true", help="Keep seeded appointments afterwards")
+
+    args = parser.parse_args()
+    asyncio.run(BENCHMARKS[args.benchmark](args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import date, time, datetime
+from uuid import UUID
+from enum import Enum
+
+from app.schemas.appointment import AppointmentCreate
+
+
+class BulkItemStatus(str, Enum):
+    BOOKED = "booked"
+    CONFLICT = "conflict"
+    UNAVAILABLE = "unavailable"
+    INVALID = "invalid"
+
+
+class AppointmentBulkCreate(BaseModel):
+    appointments: List[AppointmentCreate] = Field(..., min_length=1, max_length=1000)
+
+
+class AppointmentBulkItemResult(BaseModel):
+    index: int
+    status: BulkItemStatus
+    appointment_id: Optional[UUID] = None
+    error: Optional[str] = None
+
+
+class AppointmentBulkResponse(BaseModel):
+    booked: int
+    failed: int
+    results: List[AppointmentBulkItemResult]
+
+
+class RecurrenceFrequency(str, Enum):
+    WEEKLY = "weekly"
+    BIWEEKLY = "biweekly"
+
+
+class RecurrenceRule(BaseModel):
+    frequency: RecurrenceFrequency = RecurrenceFrequency.WEEKLY
+    occurrences: int = Field(..., ge=2, le=26)
+
+
+class AppointmentSeriesCreate(BaseModel):
+    appointment: AppointmentCreate
+    recurrence: RecurrenceRule
+
+
+class AppointmentSeriesItem(BaseModel):
+    appointment_id: UUID
+    appointment_date: date
+    start_time: time
+    end_time: time
+
+
+class AppointmentSeriesResponse(BaseModel):
+    frequency: RecurrenceFrequency
+    appointments: List[AppointmentSeriesItem]
+
+
+class SlotHoldCreate(BaseModel):
+    provider_id: UUID
+    patient_id: UUID
+    appointment_date: date
+    start_time: time
+    end_time: time
+    ttl_seconds: int = Field(120, ge=10, le=900)
+
+
+class SlotHoldResponse(BaseModel):
+    hold_id: UUID
+    provider_id: UUID
+    patient_id: UUID
+    appointment_date: date
+    start_time: time
+    end_time: time
+    expires_at: datetime
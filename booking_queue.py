@@ -0,0 +1,95 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+from datetime import date
+from uuid import UUID
+import asyncio
+import time
+
+from app.utils.settings_defaults import setting
+
+SERIALIZATION_MODES = ('off', 'local', 'advisory')
+
+# Transaction-scoped lock on (provider, day); released by COMMIT or ROLLBACK
+ADVISORY_LOCK_SQL = text("SELECT pg_advisory_xact_lock(hashtext(:provider_id), :day)")
+
+
+class BookingSerializer:
+    """
+    Funnels bookings for the same provider and day through one lock.
+
+    Modes:
+    - off: no serialization; the exclusion constraint settles races
+    - local: one asyncio lock per (provider_id, date) inside this worker
+    - advisory: the local lock plus a Postgres advisory lock, so bookings
+      are also ordered across workers
+
+    Serialized bookings see each other's committed rows, so conflicts are
+    found by the conflict check instead of a constraint failure.
+    """
+
+    def __init__(self, mode: str = 'off'):
+        if mode not in SERIALIZATION_MODES:
+            raise ValueError(f"Unknown booking serialization mode: {mode}")
+        self.mode = mode
+        self._locks: Dict[Tuple[UUID, date], asyncio.Lock] = {}
+        self._waiters: Dict[Tuple[UUID, date], int] = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self._serialized = 0
+        self._contended = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def stats(self) -> dict:
+        avg_wait = self._total_wait / self._serialized if self._serialized else 0.0
+        return {
+            "mode": self.mode,
+            "serialized_bookings": self._serialized,
+            "contended_bookings": self._contended,
+            "avg_wait_ms": round(avg_wait * 1000, 3),
+            "max_wait_ms": round(self._max_wait * 1000, 3),
+            "active_keys": len(self._locks)
+        }
+
+    @asynccontextmanager
+    async def serialize(
+        self,
+        db: AsyncSession,
+        provider_id: UUID,
+        appointment_date: date
+    ):
+        """Hold the provider/day lock for the duration of the block."""
+        if self.mode == 'off':
+            yield
+            return
+
+        key = (provider_id, appointment_date)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        if lock.locked():
+            self._contended += 1
+
+        started = time.perf_counter()
+        try:
+            async with lock:
+                if self.mode == 'advisory':
+                    await db.execute(
+                        ADVISORY_LOCK_SQL,
+                        {"provider_id": str(provider_id), "day": appointment_date.toordinal()}
+                    )
+                waited = time.perf_counter() - started
+                self._serialized += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+                yield
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
+
+
+booking_serializer = BookingSerializer(setting("BOOKING_SERIALIZATION"))
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 from uuid import UUID
 
@@ -33,3 +33,17 @@ class PaginatedResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class BatchIdsRequest(BaseModel):
+    ids: List[UUID] = Field(..., min_length=1, max_length=5000)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids": [
+                    "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+                    "9c1e2f4a-7b3d-4e8f-a6c5-1d2e3f4a5b6c"
+                ]
+            }
+        }
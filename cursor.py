@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import date, time, datetime
+from typing import Any, List
+from uuid import UUID
+
+from app.utils.exceptions import ValidationError
+
+
+def _encode_value(value: Any):
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode a keyset position as an opaque URL-safe token."""
+    payload = json.dumps(values, default=_encode_value, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a token from encode_cursor, checking it holds `size` values."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValidationError("Invalid cursor")
+
+    # encode_cursor writes every supported value as a string
+    if (
+        not isinstance(values, list)
+        or len(values) != size
+        or not all(isinstance(value, str) for value in values)
+    ):
+        raise ValidationError("Invalid cursor")
+    return values
@@ -1,5 +1,6 @@
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 CREATE EXTENSION IF NOT EXISTS "btree_gist"; -- Required for EXCLUDE constraints
+CREATE EXTENSION IF NOT EXISTS "pg_trgm"; -- Required for fuzzy patient search
 
 -- Patients Table
 CREATE TABLE patients (
@@ -16,12 +17,21 @@ CREATE TABLE patients (
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW(),
     
+    -- Normalized search columns (see PatientService.search_patients)
+    search_text TEXT GENERATED ALWAYS AS (
+        lower(first_name || ' ' || last_name || ' ' || coalesce(email, ''))
+    ) STORED,
+    phone_digits VARCHAR(20) GENERATED ALWAYS AS (
+        right(regexp_replace(phone, '[^0-9]', '', 'g'), 10)
+    ) STORED,
+    
     CONSTRAINT valid_dob CHECK (date_of_birth < CURRENT_DATE),
     CONSTRAINT valid_email CHECK (email ~* '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}$')
 );
 
 COMMENT ON TABLE patients IS 'Patient demographic and contact information';
 COMMENT ON COLUMN patients.insurance_id IS 'Health insurance policy number';
+COMMENT ON COLUMN patients.phone_digits IS 'Last 10 digits of phone, for format-insensitive matching';
 
 -- Providers Table
 CREATE TABLE providers (
@@ -142,11 +152,76 @@ CREATE TABLE audit_logs (
 
 COMMENT ON TABLE audit_logs IS 'Immutable audit trail for sensitive operations';
 
+-- Slot Holds Table (used when SLOT_HOLD_BACKEND=postgres)
+CREATE TABLE slot_holds (
+    hold_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    provider_id UUID NOT NULL REFERENCES providers(provider_id) ON DELETE CASCADE,
+    patient_id UUID NOT NULL REFERENCES patients(patient_id) ON DELETE CASCADE,
+    appointment_date DATE NOT NULL,
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    
+    CONSTRAINT valid_hold_slot CHECK (end_time > start_time),
+    
+    -- At most one live hold per provider time range
+    EXCLUDE USING gist (
+        provider_id WITH =,
+        appointment_date WITH =,
+        tsrange(
+            (appointment_date + start_time)::timestamp,
+            (appointment_date + end_time)::timestamp,
+            '[)'
+        ) WITH &&
+    )
+);
+
+COMMENT ON TABLE slot_holds IS 'Short-lived slot reservations taken while a patient completes booking';
+
+-- Analytics Refresh Log (one row per materialized view)
+CREATE TABLE analytics_refresh_log (
+    view_name VARCHAR(64) PRIMARY KEY,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    duration_ms INTEGER
+);
+
+COMMENT ON TABLE analytics_refresh_log IS 'When each analytics materialized view was last refreshed';
+
+-- Appointment Rollup (maintained by the maintain_appointment_rollup trigger)
+CREATE TABLE appointment_rollup (
+    provider_id UUID NOT NULL,
+    appointment_date DATE NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    appointment_count INTEGER NOT NULL DEFAULT 0,
+    booked_minutes INTEGER NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (provider_id, appointment_date, status)
+);
+
+COMMENT ON TABLE appointment_rollup IS 'Appointment counts and booked minutes per provider, day and status';
+
+-- Appointment Timing Sketches (rebuilt by app.core.timing_sketches)
+CREATE TABLE appointment_timing_sketches (
+    provider_id UUID NOT NULL,
+    sketch_date DATE NOT NULL,
+    metric VARCHAR(20) NOT NULL,
+    sample_count INTEGER NOT NULL,
+    digest BYTEA NOT NULL,
+    
+    PRIMARY KEY (provider_id, sketch_date, metric),
+    CONSTRAINT valid_timing_metric CHECK (metric IN ('lead_time', 'check_in_wait'))
+);
+
+COMMENT ON TABLE appointment_timing_sketches IS 'Serialized t-digests of lead time and check-in wait per provider and day';
+
 -- Patient Indexes
 CREATE INDEX idx_patients_last_name ON patients(last_name);
 CREATE INDEX idx_patients_email ON patients(email) WHERE email IS NOT NULL;
 CREATE INDEX idx_patients_phone ON patients(phone);
 CREATE INDEX idx_patients_dob ON patients(date_of_birth);
+CREATE INDEX idx_patients_search_trgm ON patients USING gin (search_text gin_trgm_ops);
+CREATE INDEX idx_patients_phone_digits_trgm ON patients USING gin (phone_digits gin_trgm_ops);
 
 -- Provider Indexes
 CREATE INDEX idx_providers_specialty ON providers(specialty);
@@ -168,6 +243,11 @@ CREATE INDEX idx_appointments_patient_date ON appointments(patient_id, appointme
 CREATE INDEX idx_appointments_provider_date ON appointments(provider_id, appointment_date, start_time);
 CREATE INDEX idx_appointments_provider_status ON appointments(provider_id, status) 
     WHERE status IN ('scheduled', 'confirmed');
+-- Keyset pagination for list_appointments (matches its ORDER BY)
+CREATE INDEX idx_appointments_keyset 
+    ON appointments(appointment_date DESC, start_time DESC, appointment_id DESC);
+CREATE INDEX idx_appointments_provider_keyset 
+    ON appointments(provider_id, appointment_date DESC, start_time DESC, appointment_id DESC);
 
 -- Visit Indexes
 CREATE INDEX idx_visits_appointment ON visits(appointment_id);
@@ -183,6 +263,15 @@ CREATE INDEX idx_audit_changed_at ON audit_logs(changed_at DESC);
 CREATE INDEX idx_audit_changed_by ON audit_logs(changed_by);
 CREATE INDEX idx_audit_action ON audit_logs(action);
 
+-- Slot Hold Indexes
+CREATE INDEX idx_slot_holds_expires ON slot_holds(expires_at);
+
+-- Appointment Rollup Indexes
+CREATE INDEX idx_appointment_rollup_date ON appointment_rollup(appointment_date);
+
+-- Appointment Timing Sketch Indexes
+CREATE INDEX idx_timing_sketches_date ON appointment_timing_sketches(sketch_date);
+
 -- Function: Update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -234,6 +323,81 @@ CREATE TRIGGER audit_appointments
     AFTER INSERT OR UPDATE OR DELETE ON appointments
     FOR EACH ROW EXECUTE FUNCTION audit_appointment_changes();
 
+-- Function: Keep appointment_rollup in step with appointments
+CREATE OR REPLACE FUNCTION maintain_appointment_rollup()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'UPDATE'
+        AND OLD.provider_id = NEW.provider_id
+        AND OLD.appointment_date = NEW.appointment_date
+        AND OLD.status = NEW.status
+        AND OLD.start_time = NEW.start_time
+        AND OLD.end_time = NEW.end_time) THEN
+        RETURN NEW;
+    END IF;
+    
+    IF (TG_OP IN ('UPDATE', 'DELETE')) THEN
+        UPDATE appointment_rollup
+        SET appointment_count = appointment_count - 1,
+            booked_minutes = booked_minutes - EXTRACT(EPOCH FROM OLD.end_time - OLD.start_time)::INTEGER / 60
+        WHERE provider_id = OLD.provider_id
+        AND appointment_date = OLD.appointment_date
+        AND status = OLD.status;
+    END IF;
+    
+    IF (TG_OP IN ('INSERT', 'UPDATE')) THEN
+        INSERT INTO appointment_rollup (provider_id, appointment_date, status, appointment_count, booked_minutes)
+        VALUES (
+            NEW.provider_id, NEW.appointment_date, NEW.status, 1,
+            EXTRACT(EPOCH FROM NEW.end_time - NEW.start_time)::INTEGER / 60
+        )
+        ON CONFLICT (provider_id, appointment_date, status) DO UPDATE
+        SET appointment_count = appointment_rollup.appointment_count + 1,
+            booked_minutes = appointment_rollup.booked_minutes + EXCLUDED.booked_minutes;
+    END IF;
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER rollup_appointments
+    AFTER INSERT OR UPDATE OR DELETE ON appointments
+    FOR EACH ROW EXECUTE FUNCTION maintain_appointment_rollup();
+
+-- Function: Notify schedule cache listeners
+CREATE OR REPLACE FUNCTION notify_provider_schedule_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'DELETE') THEN
+        PERFORM pg_notify('provider_schedules_changed', OLD.provider_id::text);
+        RETURN OLD;
+    END IF;
+    PERFORM pg_notify('provider_schedules_changed', NEW.provider_id::text);
+    IF (TG_OP = 'UPDATE' AND OLD.provider_id <> NEW.provider_id) THEN
+        PERFORM pg_notify('provider_schedules_changed', OLD.provider_id::text);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER notify_provider_schedules
+    AFTER INSERT OR UPDATE OR DELETE ON provider_schedules
+    FOR EACH ROW EXECUTE FUNCTION notify_provider_schedule_change();
+
+-- Function: Notify analytics refresher of appointment writes
+CREATE OR REPLACE FUNCTION notify_appointments_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Identical notifications in one transaction are delivered once
+    PERFORM pg_notify('appointments_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER notify_appointments
+    AFTER INSERT OR UPDATE OR DELETE ON appointments
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_appointments_change();
+
 
 -- Function: Check provider availability
 CREATE OR REPLACE FUNCTION check_provider_availability(
@@ -246,16 +410,33 @@ RETURNS BOOLEAN AS $$
 DECLARE
     schedule_exists BOOLEAN;
 BEGIN
--- Check if provider has a schedule for this day/time
-    SELECT EXISTS(
-        SELECT 1 
+-- Check if provider has a schedule for this day/time; blocks that overlap
+-- or touch are merged first, so a slot may span adjacent blocks
+    WITH blocks AS (
+        SELECT
+            ps.start_time,
+            ps.end_time,
+            CASE WHEN ps.start_time <= MAX(ps.end_time) OVER (
+                ORDER BY ps.start_time, ps.end_time
+                ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+            ) THEN 0 ELSE 1 END AS starts_island
         FROM provider_schedules ps
         WHERE ps.provider_id = p_provider_id
         AND ps.day_of_week = EXTRACT(DOW FROM p_appointment_date)
         AND ps.effective_from <= p_appointment_date
         AND (ps.effective_until IS NULL OR ps.effective_until >= p_appointment_date)
-        AND ps.start_time <= p_start_time
-        AND ps.end_time >= p_end_time
+    ),
+    islands AS (
+        SELECT
+            start_time,
+            end_time,
+            SUM(starts_island) OVER (ORDER BY start_time, end_time) AS island
+        FROM blocks
+    )
+    SELECT EXISTS(
+        SELECT 1 FROM islands
+        GROUP BY island
+        HAVING MIN(start_time) <= p_start_time AND MAX(end_time) >= p_end_time
     ) INTO schedule_exists;
     
     RETURN schedule_exists;
@@ -273,42 +454,37 @@ CREATE OR REPLACE FUNCTION get_available_slots(
 )
 RETURNS TABLE(start_time TIME, end_time TIME) AS $$
 DECLARE
-    schedule_start TIME;
-    schedule_end TIME;
+    schedule RECORD;
     current_slot TIME;
 BEGIN
-    -- Get provider schedule for this day
-    SELECT ps.start_time, ps.end_time
-    INTO schedule_start, schedule_end
-    FROM provider_schedules ps
-    WHERE ps.provider_id = p_provider_id
-    AND ps.day_of_week = EXTRACT(DOW FROM p_date)
-    AND ps.effective_from <= p_date
-    AND (ps.effective_until IS NULL OR ps.effective_until >= p_date)
-    LIMIT 1;
-    
-    IF schedule_start IS NULL THEN
-        RETURN;
-    END IF;
-    
-    -- Generate time slots
-    current_slot := schedule_start;
-    
-    WHILE current_slot + p_slot_duration <= schedule_end LOOP
-        -- Check if slot is available
-        IF NOT EXISTS (
-            SELECT 1 FROM appointments a
-            WHERE a.provider_id = p_provider_id
-            AND a.appointment_date = p_date
-            AND a.status NOT IN ('cancelled', 'no_show')
-            AND (
-                (a.start_time < current_slot + p_slot_duration AND a.end_time > current_slot)
-            )
-        ) THEN
-            RETURN QUERY SELECT current_slot, current_slot + p_slot_duration;
-        END IF;
+    -- Walk every schedule block for this day (providers may have split shifts)
+    FOR schedule IN
+        SELECT ps.start_time, ps.end_time
+        FROM provider_schedules ps
+        WHERE ps.provider_id = p_provider_id
+        AND ps.day_of_week = EXTRACT(DOW FROM p_date)
+        AND ps.effective_from <= p_date
+        AND (ps.effective_until IS NULL OR ps.effective_until >= p_date)
+        ORDER BY ps.start_time
+    LOOP
+        current_slot := schedule.start_time;
         
-        current_slot := current_slot + p_slot_duration;
+        WHILE current_slot + p_slot_duration <= schedule.end_time LOOP
+            -- Check if slot is available
+            IF NOT EXISTS (
+                SELECT 1 FROM appointments a
+                WHERE a.provider_id = p_provider_id
+                AND a.appointment_date = p_date
+                AND a.status NOT IN ('cancelled', 'no_show')
+                AND (
+                    (a.start_time < current_slot + p_slot_duration AND a.end_time > current_slot)
+                )
+            ) THEN
+                RETURN QUERY SELECT current_slot, current_slot + p_slot_duration;
+            END IF;
+            
+            current_slot := current_slot + p_slot_duration;
+        END LOOP;
     END LOOP;
 END;
 $$ LANGUAGE plpgsql;
@@ -316,27 +492,49 @@ $$ LANGUAGE plpgsql;
 COMMENT ON FUNCTION get_available_slots IS 
     'Returns all available time slots for a provider on a given date';
 
--- View: Provider Utilization
-CREATE OR REPLACE VIEW provider_utilization AS
+-- Materialized views for analytics
+-- Refreshed concurrently by the API (see analytics_refresh.py); each needs a
+-- unique index for REFRESH MATERIALIZED VIEW CONCURRENTLY.
+
+-- Materialized View: Daily Appointment Load (past year and upcoming)
+CREATE MATERIALIZED VIEW daily_appointment_load AS
+SELECT 
+    appointment_date,
+    COUNT(*) AS total_appointments,
+    COUNT(DISTINCT provider_id) AS active_providers,
+    COUNT(*) FILTER (WHERE status IN ('scheduled', 'confirmed')) AS upcoming,
+    COUNT(*) FILTER (WHERE status = 'completed') AS completed,
+    COUNT(*) FILTER (WHERE status = 'cancelled') AS cancelled,
+    COUNT(*) FILTER (WHERE status = 'no_show') AS no_shows
+FROM appointments
+WHERE appointment_date >= CURRENT_DATE - INTERVAL '1 year'
+GROUP BY appointment_date;
+
+CREATE UNIQUE INDEX idx_daily_appointment_load_date ON daily_appointment_load(appointment_date);
+
+COMMENT ON MATERIALIZED VIEW daily_appointment_load IS 
+    'Appointment volume and status breakdown per day';
+
+-- Materialized View: No-Show Analysis
+CREATE MATERIALIZED VIEW no_show_analysis AS
 SELECT 
-    p.provider_id,
-    p.first_name || ' ' || p.last_name AS provider_name,
-    p.specialty,
-    COUNT(a.appointment_id) AS total_appointments,
-    COUNT(CASE WHEN a.status = 'completed' THEN 1 END) AS completed_appointments,
-    COUNT(CASE WHEN a.status = 'no_show' THEN 1 END) AS no_shows,
-    COUNT(CASE WHEN a.status = 'cancelled' THEN 1 END) AS cancellations,
+    DATE_TRUNC('month', appointment_date)::DATE AS month,
+    COUNT(*) AS total_appointments,
+    COUNT(*) FILTER (WHERE status = 'no_show') AS no_shows,
     ROUND(
-        COUNT(CASE WHEN a.status = 'completed' THEN 1 END)::NUMERIC / 
-        NULLIF(COUNT(a.appointment_id), 0) * 100, 
+        COUNT(*) FILTER (WHERE status = 'no_show')::NUMERIC / 
+        NULLIF(COUNT(*) FILTER (WHERE status IN ('completed', 'no_show')), 0) * 100, 
         2
     ) AS no_show_rate
 FROM appointments
 WHERE appointment_date >= CURRENT_DATE - INTERVAL '1 year'
-GROUP BY DATE_TRUNC('month', appointment_date)
-ORDER BY month DESC;
+AND appointment_date <= CURRENT_DATE
+GROUP BY DATE_TRUNC('month', appointment_date);
 
-COMMENT ON VIEW no_show_analysis IS 
-    'Monthly no-show rates for the past year';
+CREATE UNIQUE INDEX idx_no_show_analysis_month ON no_show_analysis(month);
 
+COMMENT ON MATERIALIZED VIEW no_show_analysis IS 
+    'Monthly no-show rates for the past year';
 
+INSERT INTO analytics_refresh_log (view_name)
+VALUES ('daily_appointment_load'), ('no_show_analysis'), ('appointment_timing_sketches');
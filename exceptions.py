@@ -26,6 +26,12 @@ class AppointmentConflictError(AppException):
         super().__init__(message, "APPOINTMENT_CONFLICT", 409)
 
 
+class SeriesConflictError(AppointmentConflictError):
+    def __init__(self, conflicts: list, message: str = "Series has occurrences that cannot be booked"):
+        super().__init__(message)
+        self.conflicts = conflicts
+
+
 class ProviderUnavailableError(AppException):
     def __init__(self, message: str = "Provider not available"):
         super().__init__(message, "PROVIDER_UNAVAILABLE", 400)
@@ -36,6 +42,11 @@ class InvalidTransitionError(AppException):
         super().__init__(message, "INVALID_TRANSITION", 400)
 
 
+class SnapshotUnavailableError(AppException):
+    def __init__(self, message: str = "No analytics snapshot has been published yet"):
+        super().__init__(message, "SNAPSHOT_UNAVAILABLE", 503)
+
+
 class UnauthorizedError(AppException):
     def __init__(self, message: str = "Unauthorized"):
         super().__init__(message, "UNAUTHORIZED", 401)
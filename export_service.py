@@ -0,0 +1,183 @@
+from sqlalchemy import select, and_
+from typing import AsyncIterator, List, Optional
+from datetime import date, time, datetime
+from decimal import Decimal
+from uuid import UUID
+import csv
+import io
+import json
+
+from app.db.session import read_session_factory
+from app.db.models import Appointment, Patient, Provider, Visit
+
+# Rows fetched from the server-side cursor and encoded per chunk
+EXPORT_BATCH_ROWS = 500
+
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+APPOINTMENT_EXPORT_COLUMNS = [
+    Appointment.appointment_id,
+    Appointment.patient_id,
+    (Patient.first_name + ' ' + Patient.last_name).label('patient_name'),
+    Appointment.provider_id,
+    (Provider.first_name + ' ' + Provider.last_name).label('provider_name'),
+    Provider.specialty.label('provider_specialty'),
+    Appointment.appointment_date,
+    Appointment.start_time,
+    Appointment.end_time,
+    Appointment.status,
+    Appointment.appointment_type,
+    Appointment.notes,
+    Appointment.cancellation_reason,
+    Appointment.created_at,
+    Appointment.updated_at,
+]
+
+VISIT_EXPORT_COLUMNS = [
+    Visit.visit_id,
+    Visit.appointment_id,
+    Visit.patient_id,
+    Visit.provider_id,
+    Visit.visit_date,
+    Visit.chief_complaint,
+    Visit.diagnosis,
+    Visit.treatment_plan,
+    Visit.prescriptions,
+    Visit.notes,
+    Visit.follow_up_required,
+    Visit.follow_up_date,
+    Visit.created_at,
+    Visit.updated_at,
+]
+
+
+def _json_default(value):
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default)
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    return value
+
+
+def encode_rows(rows, columns: List[str], fmt: str) -> bytes:
+    """Encode a chunk of row mappings as NDJSON lines or CSV records."""
+    if fmt == 'ndjson':
+        return "".join(
+            json.dumps({name: row[name] for name in columns}, default=_json_default) + "\n"
+            for row in rows
+        ).encode()
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_csv_value(row[name]) for name in columns] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def csv_header(columns: List[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue().encode()
+
+
+class ExportService:
+    """
+    Streaming exports for billing and BI.
+
+    Rows come from a server-side cursor in chunks of EXPORT_BATCH_ROWS and
+    are encoded straight from the row mappings, so memory stays bounded no
+    matter how many rows match. Each export opens its own read session
+    because the response outlives the request's get_read_db dependency;
+    `sticky` carries the request's read-your-writes state over to it.
+    """
+
+    @staticmethod
+    async def _stream(statement, fmt: str, sticky: bool) -> AsyncIterator[bytes]:
+        columns = [column.name for column in statement.selected_columns]
+        if fmt == 'csv':
+            yield csv_header(columns)
+
+        async with read_session_factory(sticky)() as db:
+            result = await db.stream(
+                statement, execution_options={"yield_per": EXPORT_BATCH_ROWS}
+            )
+            async for rows in result.mappings().partitions(EXPORT_BATCH_ROWS):
+                yield encode_rows(rows, columns, fmt)
+
+    @staticmethod
+    def stream_appointments(
+        fmt: str,
+        patient_id: Optional[UUID] = None,
+        provider_id: Optional[UUID] = None,
+        appointment_date: Optional[date] = None,
+        status: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        sticky: bool = False
+    ) -> AsyncIterator[bytes]:
+        """Stream appointments with the list_appointments filters plus a date range."""
+        conditions = []
+        if patient_id:
+            conditions.append(Appointment.patient_id == patient_id)
+        if provider_id:
+            conditions.append(Appointment.provider_id == provider_id)
+        if appointment_date:
+            conditions.append(Appointment.appointment_date == appointment_date)
+        if status:
+            conditions.append(Appointment.status == status)
+        if start_date:
+            conditions.append(Appointment.appointment_date >= start_date)
+        if end_date:
+            conditions.append(Appointment.appointment_date <= end_date)
+
+        statement = (
+            select(*APPOINTMENT_EXPORT_COLUMNS)
+            .join(Patient, Appointment.patient_id == Patient.patient_id)
+            .join(Provider, Appointment.provider_id == Provider.provider_id)
+            .where(and_(True, *conditions))
+            .order_by(
+                Appointment.appointment_date,
+                Appointment.start_time,
+                Appointment.appointment_id
+            )
+        )
+        return ExportService._stream(statement, fmt, sticky)
+
+    @staticmethod
+    def stream_visits(
+        fmt: str,
+        patient_id: Optional[UUID] = None,
+        provider_id: Optional[UUID] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        sticky: bool = False
+    ) -> AsyncIterator[bytes]:
+        """Stream visits with the list_visits filters plus a date range."""
+        conditions = []
+        if patient_id:
+            conditions.append(Visit.patient_id == patient_id)
+        if provider_id:
+            conditions.append(Visit.provider_id == provider_id)
+        if start_date:
+            conditions.append(Visit.visit_date >= start_date)
+        if end_date:
+            conditions.append(Visit.visit_date <= end_date)
+
+        statement = (
+            select(*VISIT_EXPORT_COLUMNS)
+            .where(and_(True, *conditions))
+            .order_by(Visit.visit_date, Visit.visit_id)
+        )
+        return ExportService._stream(statement, fmt, sticky)
@@ -0,0 +1,63 @@
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from functools import lru_cache
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+from uuid import UUID
+
+
+@lru_cache(maxsize=None)
+def schema_fields(schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """Field names of a response schema, computed once per schema."""
+    return tuple(schema.model_fields)
+
+
+def project_rows(rows: Sequence, fields: Sequence[str]) -> List[dict]:
+    """Project row mappings or ORM objects onto `fields`."""
+    if rows and isinstance(rows[0], Mapping):
+        return [{name: row.get(name) for name in fields} for row in rows]
+    return [{name: getattr(row, name, None) for name in fields} for row in rows]
+
+
+def fast_json_response(
+    rows: Sequence,
+    schema: Type[BaseModel],
+    fields: Optional[Sequence[str]] = None
+) -> ORJSONResponse:
+    """
+    Encode database rows as a JSON list without building response models.
+
+    Rows are already constrained by the database schema, so they are only
+    projected onto the response schema's fields (or the requested subset)
+    and handed to orjson, which encodes dates, times and UUIDs natively.
+    Returning a Response also skips FastAPI's response_model pass.
+    """
+    return ORJSONResponse(project_rows(rows, fields or schema_fields(schema)))
+
+
+def fast_json_object(
+    row,
+    schema: Type[BaseModel],
+    fields: Optional[Sequence[str]] = None
+) -> ORJSONResponse:
+    """Single-row counterpart of fast_json_response for detail routes."""
+    return ORJSONResponse(project_rows([row], fields or schema_fields(schema))[0])
+
+
+def batch_json_response(
+    ids: Sequence[UUID],
+    found: Dict[UUID, object],
+    schema: Type[BaseModel],
+    fields: Optional[Sequence[str]] = None
+) -> ORJSONResponse:
+    """
+    Batch lookup result in request order.
+
+    `items` lines up with `ids`, holding null where nothing was found;
+    those ids are also listed once each in `missing`.
+    """
+    projected = dict(zip(found, project_rows(list(found.values()), fields or schema_fields(schema))))
+    return ORJSONResponse({
+        "items": [projected.get(item_id) for item_id in ids],
+        "missing": list(dict.fromkeys(item_id for item_id in ids if item_id not in projected))
+    })
@@ -0,0 +1,43 @@
+from pydantic import BaseModel
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Type
+
+from app.utils.exceptions import ValidationError
+from app.utils.fast_json import schema_fields
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Split a comma-separated `fields` query parameter.
+
+    Returns None when the parameter is absent, meaning every field.
+    Duplicates are dropped and the requested order is kept.
+    """
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not names:
+        raise ValidationError("fields must name at least one field")
+    return names
+
+
+@lru_cache(maxsize=None)
+def field_columns(model, schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Mapped columns of `model` that are also fields of `schema`, by name."""
+    names = set(schema_fields(schema))
+    return {
+        attr.key: getattr(model, attr.key)
+        for attr in model.__mapper__.column_attrs
+        if attr.key in names
+    }
+
+
+def select_fields(columns: Mapping[str, Any], fields: List[str]) -> List[Any]:
+    """Columns for the requested fields; unknown names are a ValidationError."""
+    unknown = [name for name in fields if name not in columns]
+    if unknown:
+        raise ValidationError(
+            f"Unknown fields: {', '.join(unknown)}. "
+            f"Available: {', '.join(columns)}"
+        )
+    return [columns[name] for name in fields]
@@ -3,11 +3,22 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from sqlalchemy.exc import IntegrityError
+import asyncio
 import logging
 
 from app.config import settings
-from app.db.session import engine
+from app.utils.settings_defaults import setting
+from app.db.session import engine, read_engine, replica_monitor, READ_YOUR_WRITES_COOKIE, READ_DATABASE_URL
+from app.db.prepared_statements import prepared_statements
 from app.utils.exceptions import AppException
+from app.core.booking_queue import booking_serializer
+from app.core.schedule_cache import schedule_cache
+from app.core.appointment_service import appointment_statement_stats
+from app.core.analytics_refresh import analytics_refresher
+from app.core.analytics_service import ANALYTICS_ENGINE
+from app.core.analytics_cache import analytics_cache
+from app.core.timing_sketches import timing_sketch_builder
+from app.core.analytics_snapshot import analytics_snapshotter
 from app.api.v1 import patients, providers, appointments, visits, analytics
 
 # Configure logging
@@ -23,10 +34,55 @@ async def lifespan(app: FastAPI):
     logger.info(f"Environment: {settings.APP_ENV}")
     logger.info(f"Database URL: {settings.DATABASE_URL.split('@')[-1]}")  # Hide credentials
     
+    # Keep the schedule cache coherent with changes made by other workers
+    schedule_listener = await schedule_cache.listen(engine)
+    
+    # Route reads to the replica only while its lag is within bounds
+    lag_monitor = None
+    if replica_monitor.enabled:
+        logger.info(f"Read replica: {READ_DATABASE_URL.split('@')[-1]}")
+        lag_monitor = asyncio.create_task(replica_monitor.run(setting("REPLICA_LAG_CHECK_SECONDS")))
+    
+    # Refresh analytics views on a schedule and after appointment writes;
+    # the rollup engine is kept current by triggers instead
+    appointments_listener = refresher = None
+    if ANALYTICS_ENGINE == 'views':
+        appointments_listener = await analytics_refresher.listen(engine)
+        refresher = asyncio.create_task(analytics_refresher.run())
+    
+    # Publish columnar snapshots for the snapshot engine; builds scan the
+    # whole appointments table, so only from a replica
+    snapshotter = None
+    if ANALYTICS_ENGINE == 'snapshot':
+        if replica_monitor.enabled:
+            snapshotter = asyncio.create_task(analytics_snapshotter.run())
+        else:
+            logger.warning(
+                "No read replica configured; build analytics snapshots with "
+                "`python analytics_snapshot.py build`"
+            )
+    
+    # Keep wait-time sketches current for days with appointment writes
+    sketch_builder = None
+    if timing_sketch_builder.interval > 0:
+        sketch_builder = asyncio.create_task(timing_sketch_builder.run())
+    
     yield
     
     logger.info("Shutting down Healthcare Appointment System...")
+    if sketch_builder:
+        sketch_builder.cancel()
+    if snapshotter:
+        snapshotter.cancel()
+    if refresher:
+        refresher.cancel()
+        await appointments_listener.close()
+    if lag_monitor:
+        lag_monitor.cancel()
+    await schedule_listener.close()
     await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
 
 
 # Create FastAPI app
@@ -165,6 +221,22 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """In-process counters for monitoring."""
+    return {
+        "booking_serializer": booking_serializer.stats(),
+        "schedule_cache": schedule_cache.stats(),
+        "read_replica": replica_monitor.stats(),
+        "appointment_statement_builder": appointment_statement_stats(),
+        "prepared_statement_cache_estimate": prepared_statements.stats(),
+        "analytics_refresh": analytics_refresher.stats(),
+        "analytics_cache": analytics_cache.stats(),
+        "timing_sketches": timing_sketch_builder.stats(),
+        "analytics_snapshot": analytics_snapshotter.stats()
+    }
+
+
 # Optional: Add request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -174,3 +246,22 @@ async def log_requests(request: Request, call_next):
     logger.info(f"Status: {response.status_code}")
     return response
 
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """After a successful write, pin the client's reads to the primary for a while."""
+    response = await call_next(request)
+    if (
+        request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+        and not getattr(request.state, "read_only", False)
+    ):
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            "1",
+            max_age=setting("READ_YOUR_WRITES_SECONDS"),
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
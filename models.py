@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, String, Date, Time, Boolean, Text, Integer,
-    ForeignKey, CheckConstraint, Index, TIMESTAMP, text
+    ForeignKey, CheckConstraint, Index, TIMESTAMP, Computed, LargeBinary, text
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB, INET
 from sqlalchemy.orm import relationship
@@ -26,6 +26,16 @@ class Patient(Base):
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"))
     updated_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"), onupdate=datetime.now)
     
+    # Generated search columns
+    search_text = Column(
+        Text,
+        Computed("lower(first_name || ' ' || last_name || ' ' || coalesce(email, ''))", persisted=True)
+    )
+    phone_digits = Column(
+        String(20),
+        Computed("right(regexp_replace(phone, '[^0-9]', '', 'g'), 10)", persisted=True)
+    )
+    
     # Relationships
     appointments = relationship("Appointment", back_populates="patient")
     visits = relationship("Visit", back_populates="patient")
@@ -40,6 +50,14 @@ class Patient(Base):
         Index("idx_patients_email", "email"),
         Index("idx_patients_phone", "phone"),
         Index("idx_patients_last_name", "last_name"),
+        Index(
+            "idx_patients_search_trgm", "search_text",
+            postgresql_using="gin", postgresql_ops={"search_text": "gin_trgm_ops"}
+        ),
+        Index(
+            "idx_patients_phone_digits_trgm", "phone_digits",
+            postgresql_using="gin", postgresql_ops={"phone_digits": "gin_trgm_ops"}
+        ),
     )
 
 
@@ -136,6 +154,14 @@ class Appointment(Base):
         Index("idx_appointments_status", "status"),
         Index("idx_appointments_provider_date", "provider_id", "appointment_date", "start_time"),
         Index("idx_appointments_patient_date", "patient_id", "appointment_date"),
+        Index(
+            "idx_appointments_keyset",
+            appointment_date.desc(), start_time.desc(), appointment_id.desc()
+        ),
+        Index(
+            "idx_appointments_provider_keyset",
+            provider_id, appointment_date.desc(), start_time.desc(), appointment_id.desc()
+        ),
     )
 
 
@@ -195,3 +221,59 @@ class AuditLog(Base):
         Index("idx_audit_changed_at", "changed_at"),
         Index("idx_audit_changed_by", "changed_by"),
     )
+
+
+class SlotHold(Base):
+    __tablename__ = "slot_holds"
+    
+    hold_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    provider_id = Column(UUID(as_uuid=True), ForeignKey("providers.provider_id", ondelete="CASCADE"), nullable=False)
+    patient_id = Column(UUID(as_uuid=True), ForeignKey("patients.patient_id", ondelete="CASCADE"), nullable=False)
+    appointment_date = Column(Date, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"))
+    
+    # Constraints
+    __table_args__ = (
+        CheckConstraint("end_time > start_time", name="valid_hold_slot"),
+        Index("idx_slot_holds_expires", "expires_at"),
+    )
+
+
+class AnalyticsRefreshLog(Base):
+    __tablename__ = "analytics_refresh_log"
+    
+    view_name = Column(String(64), primary_key=True)
+    refreshed_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+    duration_ms = Column(Integer, nullable=True)
+
+
+class AppointmentRollup(Base):
+    __tablename__ = "appointment_rollup"
+    
+    provider_id = Column(UUID(as_uuid=True), primary_key=True)
+    appointment_date = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    appointment_count = Column(Integer, nullable=False, default=0)
+    booked_minutes = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index("idx_appointment_rollup_date", "appointment_date"),
+    )
+
+
+class AppointmentTimingSketch(Base):
+    __tablename__ = "appointment_timing_sketches"
+    
+    provider_id = Column(UUID(as_uuid=True), primary_key=True)
+    sketch_date = Column(Date, primary_key=True)
+    metric = Column(String(20), primary_key=True)
+    sample_count = Column(Integer, nullable=False)
+    digest = Column(LargeBinary, nullable=False)
+    
+    __table_args__ = (
+        CheckConstraint("metric IN ('lead_time', 'check_in_wait')", name="valid_timing_metric"),
+        Index("idx_timing_sketches_date", "sketch_date"),
+    )
@@ -1,11 +1,127 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Optional, List
+from sqlalchemy import select, func, literal, case, text
+from typing import Optional, List, Dict, Tuple
+from datetime import datetime
 from uuid import UUID
+import re
 
 from app.db.models import Patient
-from app.schemas.patient import PatientCreate, PatientUpdate
-from app.utils.exceptions import NotFoundError
+from app.schemas.patient import PatientCreate, PatientUpdate, PatientResponse
+from app.utils.exceptions import NotFoundError, ValidationError
+from app.utils.fieldsets import field_columns, select_fields
+from app.utils.batch import ids_match
+from app.utils.cursor import encode_cursor, decode_cursor
+
+# Search terms made only of these characters are treated as phone numbers
+PHONE_SEARCH_PATTERN = re.compile(r"^[\d\s().+\-]+$")
+MIN_PHONE_SEARCH_DIGITS = 4
+# A leading +1, or a 1 set off by a separator; a bare leading 1 may be part of a suffix
+COUNTRY_CODE_PATTERN = re.compile(r"^\s*(?:\+1|1(?=[\s.\-(]))")
+
+# One branch per source, each ordered and limited on its own index before
+# the outer merge: idx_appointments_patient_date for appointments,
+# idx_visits_patient for visits and idx_audit_table_record for audit rows.
+TIMELINE_SQL = """
+    SELECT kind, entry_id, occurred_at, data
+    FROM (
+        (
+            SELECT
+                'appointment' AS kind,
+                a.appointment_id AS entry_id,
+                CAST(a.appointment_date + a.start_time AS timestamptz) AS occurred_at,
+                json_build_object(
+                    'appointment_id', a.appointment_id,
+                    'provider_id', a.provider_id,
+                    'provider_name', pr.first_name || ' ' || pr.last_name,
+                    'appointment_date', a.appointment_date,
+                    'start_time', a.start_time,
+                    'end_time', a.end_time,
+                    'status', a.status,
+                    'appointment_type', a.appointment_type
+                ) AS data
+            FROM appointments a
+            JOIN providers pr ON a.provider_id = pr.provider_id
+            WHERE a.patient_id = :patient_id
+            {appointment_cursor}
+            ORDER BY a.appointment_date DESC, a.start_time DESC, a.appointment_id DESC
+            LIMIT :limit
+        )
+        UNION ALL
+        (
+            SELECT
+                'visit',
+                v.visit_id,
+                CAST(v.visit_date + a.end_time AS timestamptz),
+                json_build_object(
+                    'visit_id', v.visit_id,
+                    'appointment_id', v.appointment_id,
+                    'provider_id', v.provider_id,
+                    'chief_complaint', v.chief_complaint,
+                    'diagnosis', v.diagnosis,
+                    'follow_up_required', v.follow_up_required,
+                    'follow_up_date', v.follow_up_date
+                )
+            FROM visits v
+            JOIN appointments a ON v.appointment_id = a.appointment_id
+            WHERE v.patient_id = :patient_id
+            {visit_cursor}
+            ORDER BY 3 DESC, 2 DESC
+            LIMIT :limit
+        )
+        {audit_branch}
+    ) AS timeline
+    ORDER BY occurred_at DESC, entry_id DESC
+    LIMIT :limit
+"""
+
+TIMELINE_AUDIT_BRANCH = """
+        UNION ALL
+        (
+            SELECT
+                'audit',
+                al.log_id,
+                al.changed_at,
+                json_build_object(
+                    'table_name', al.table_name,
+                    'record_id', al.record_id,
+                    'action', al.action,
+                    'old_status', al.old_data->>'status',
+                    'new_status', al.new_data->>'status',
+                    'changed_by', al.changed_by
+                )
+            FROM (
+                SELECT 'appointments' AS table_name, appointment_id AS record_id
+                FROM appointments WHERE patient_id = :patient_id
+                UNION ALL
+                SELECT 'visits', visit_id
+                FROM visits WHERE patient_id = :patient_id
+            ) AS records
+            JOIN audit_logs al
+                ON al.table_name = records.table_name
+                AND al.record_id = records.record_id
+            WHERE TRUE
+            {audit_cursor}
+            ORDER BY al.changed_at DESC, al.log_id DESC
+            LIMIT :limit
+        )
+"""
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Reduce a phone number to its last 10 digits.
+    
+    Mirrors the patients.phone_digits generated column, so
+    "(202) 555-1001" and "+12025551001" both become "2025551001".
+    The +1 country code is dropped first so that partial numbers still
+    match: "+1 202 555" becomes "202555".
+    """
+    return re.sub(r"\D", "", COUNTRY_CODE_PATTERN.sub("", phone, count=1))[-10:]
+
+
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input matches literally."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 class PatientService:
@@ -26,23 +142,57 @@ class PatientService:
     @staticmethod
     async def get_patient(
         db: AsyncSession,
-        patient_id: UUID
+        patient_id: UUID,
+        fields: Optional[List[str]] = None
     ) -> Optional[Patient]:
-        """Get patient by ID."""
+        """Get patient by ID, or a row of just `fields` when given."""
+        if fields:
+            result = await db.execute(
+                select(*select_fields(field_columns(Patient, PatientResponse), fields))
+                .where(Patient.patient_id == patient_id)
+            )
+            return result.mappings().one_or_none()
+        
         result = await db.execute(
             select(Patient).where(Patient.patient_id == patient_id)
         )
         return result.scalar_one_or_none()
     
+    @staticmethod
+    async def get_patients_by_ids(
+        db: AsyncSession,
+        patient_ids: List[UUID],
+        fields: Optional[List[str]] = None
+    ) -> Dict[UUID, Patient]:
+        """Fetch many patients in one query, keyed by patient_id."""
+        if fields:
+            columns = select_fields(
+                field_columns(Patient, PatientResponse),
+                list(dict.fromkeys(['patient_id', *fields]))
+            )
+            result = await db.execute(
+                select(*columns).where(ids_match(Patient.patient_id, patient_ids))
+            )
+            return {row['patient_id']: row for row in result.mappings()}
+        
+        result = await db.execute(
+            select(Patient).where(ids_match(Patient.patient_id, patient_ids))
+        )
+        return {patient.patient_id: patient for patient in result.scalars()}
+    
     @staticmethod
     async def list_patients(
         db: AsyncSession,
         skip: int = 0,
         limit: int = 100,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        fields: Optional[List[str]] = None
     ) -> List[Patient]:
-        """List patients with optional search."""
-        query = select(Patient)
+        """List patients with optional search; rows of just `fields` when given."""
+        if fields:
+            query = select(*select_fields(field_columns(Patient, PatientResponse), fields))
+        else:
+            query = select(Patient)
         
         if search:
             search_filter = f"%{search}%"
@@ -55,7 +205,107 @@ class PatientService:
         
         query = query.offset(skip).limit(limit)
         result = await db.execute(query)
-        return result.scalars().all()
+        return result.mappings().all() if fields else result.scalars().all()
+    
+    @staticmethod
+    async def search_patients(
+        db: AsyncSession,
+        term: str,
+        limit: int = 20
+    ) -> Tuple[str, List[Tuple[Patient, float]]]:
+        """
+        Ranked fuzzy search over patients using the pg_trgm indexes.
+        
+        Phone-like terms are normalized and matched against phone_digits;
+        anything else is matched against the lower-cased name and email in
+        search_text, by substring or trigram word similarity. Returns the
+        mode used and (patient, score) pairs, best match first.
+        """
+        term = term.strip()
+        digits = normalize_phone(term)
+        
+        if PHONE_SEARCH_PATTERN.match(term) and len(digits) >= MIN_PHONE_SEARCH_DIGITS:
+            mode = "phone"
+            score = case(
+                (Patient.phone_digits == digits, literal(1.0)),
+                else_=func.similarity(Patient.phone_digits, digits)
+            )
+            condition = Patient.phone_digits.like(f"%{digits}%")
+        else:
+            mode = "text"
+            needle = term.lower()
+            score = func.word_similarity(needle, Patient.search_text)
+            condition = (
+                Patient.search_text.like(f"%{escape_like(needle)}%", escape="\\")
+                | Patient.search_text.op("%>")(needle)
+            )
+        
+        score = score.label("score")
+        result = await db.execute(
+            select(Patient, score)
+            .where(condition)
+            .order_by(score.desc(), Patient.last_name, Patient.first_name)
+            .limit(limit)
+        )
+        return mode, [(patient, float(rank)) for patient, rank in result.all()]
+    
+    @staticmethod
+    async def get_timeline(
+        db: AsyncSession,
+        patient_id: UUID,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        include_audit: bool = False
+    ) -> List[dict]:
+        """
+        A patient's appointments, visits and optionally audit entries, newest first.
+        
+        The sources are merged by one UNION ALL in the database, ordered by
+        (occurred_at, entry_id) and paged by keyset: pass timeline_cursor()
+        of the previous page as `cursor`.
+        """
+        params = {'patient_id': str(patient_id), 'limit': limit}
+        filters = {
+            'appointment_cursor': '',
+            'visit_cursor': '',
+            'audit_cursor': ''
+        }
+        if cursor:
+            cursor_at, cursor_id = decode_cursor(cursor, 2)
+            try:
+                params['cursor_at'] = datetime.fromisoformat(cursor_at)
+                params['cursor_id'] = str(UUID(cursor_id))
+            except (TypeError, ValueError, AttributeError):
+                raise ValidationError("Invalid cursor")
+            
+            position = "< (CAST(:cursor_at AS timestamptz), CAST(:cursor_id AS uuid))"
+            filters = {
+                # The date bound keeps the scan on idx_appointments_patient_date
+                'appointment_cursor': (
+                    "AND a.appointment_date <= CAST(CAST(:cursor_at AS timestamptz) AS date) "
+                    f"AND (CAST(a.appointment_date + a.start_time AS timestamptz), a.appointment_id) {position}"
+                ),
+                'visit_cursor': f"AND (CAST(v.visit_date + a.end_time AS timestamptz), v.visit_id) {position}",
+                'audit_cursor': f"AND (al.changed_at, al.log_id) {position}"
+            }
+        
+        audit_branch = TIMELINE_AUDIT_BRANCH.format(**filters) if include_audit else ''
+        query = TIMELINE_SQL.format(audit_branch=audit_branch, **filters)
+        
+        result = await db.execute(text(query), params)
+        entries = [dict(row) for row in result.mappings()]
+        
+        if not entries and not cursor and not await PatientService.get_patient(db, patient_id):
+            raise NotFoundError("Patient not found")
+        return entries
+    
+    @staticmethod
+    def timeline_cursor(entries: List[dict], limit: int) -> Optional[str]:
+        """Cursor for the page after `entries`, or None if this was the last page."""
+        if len(entries) < limit:
+            return None
+        last = entries[-1]
+        return encode_cursor(last['occurred_at'], last['entry_id'])
     
     @staticmethod
     async def update_patient(
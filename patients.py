@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.core.patient_service import PatientService
 from app.schemas.patient import PatientCreate, PatientUpdate, PatientResponse
-from app.utils.exceptions import NotFoundError
+from app.utils.exceptions import NotFoundError, ValidationError
+from app.schemas.common import BatchIdsRequest
+from app.utils.fast_json import fast_json_response, fast_json_object, batch_json_response
+from app.utils.fieldsets import parse_fields
 
 router = APIRouter()
 
@@ -34,31 +37,132 @@ async def list_patients(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None, description="Search by name, email, or phone"),
-    db: AsyncSession = Depends(get_db)
+    fast: bool = Query(False, description="Encode rows directly with orjson, skipping model validation"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. patient_id,first_name,last_name"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     List all patients with optional search and pagination.
     """
-    return await PatientService.list_patients(db, skip, limit, search)
+    try:
+        selected = parse_fields(fields)
+        patients = await PatientService.list_patients(db, skip, limit, search, selected)
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+    
+    if fast or selected:
+        return fast_json_response(patients, PatientResponse, selected)
+    return patients
+
+
+@router.get("/search")
+async def search_patients(
+    q: str = Query(..., min_length=2, description="Name, email, or phone number (any format)"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Ranked fuzzy patient search.
+    
+    Phone numbers match regardless of formatting, so "(202) 555-1001" finds
+    "+12025551001". Names and emails match by substring or trigram
+    similarity, tolerating small typos. Each result carries a 0-1 score.
+    """
+    mode, matches = await PatientService.search_patients(db, q, limit)
+    return {
+        "query": q,
+        "mode": mode,
+        "results": [
+            {"score": round(score, 4), "patient": PatientResponse.model_validate(patient)}
+            for patient, score in matches
+        ]
+    }
+
+
+@router.post("/batch")
+async def get_patients_batch(
+    batch: BatchIdsRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. patient_id,first_name,last_name"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Fetch up to 5000 patients by ID in a single query.
+    
+    `items` follows the order of `ids`, with null for IDs that do not
+    exist; those IDs are also listed in `missing`.
+    """
+    try:
+        selected = parse_fields(fields)
+        found = await PatientService.get_patients_by_ids(db, batch.ids, selected)
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+    return batch_json_response(batch.ids, found, PatientResponse, selected)
 
 
 @router.get("/{patient_id}", response_model=PatientResponse)
 async def get_patient(
     patient_id: UUID,
-    db: AsyncSession = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. patient_id,first_name,last_name"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get a specific patient by ID.
     """
-    patient = await PatientService.get_patient(db, patient_id)
+    try:
+        selected = parse_fields(fields)
+        patient = await PatientService.get_patient(db, patient_id, selected)
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
     if not patient:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Patient not found"
         )
+    if selected:
+        return fast_json_object(patient, PatientResponse, selected)
     return patient
 
 
+@router.get("/{patient_id}/timeline")
+async def get_patient_timeline(
+    patient_id: UUID,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    include_audit: bool = Query(False, description="Include audit log entries for the patient's records"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    The patient's appointments, visits and optionally audit history as one
+    stream, newest first.
+    
+    Each entry has a `kind` (appointment, visit or audit), `occurred_at`
+    and kind-specific `data`. Pass the X-Next-Cursor response header back
+    as `cursor` for the next page; it is omitted on the last page.
+    """
+    try:
+        entries = await PatientService.get_timeline(db, patient_id, limit, cursor, include_audit)
+    except (NotFoundError, ValidationError) as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+    
+    next_cursor = PatientService.timeline_cursor(entries, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return entries
+
+
 @router.patch("/{patient_id}", response_model=PatientResponse)
 async def update_patient(
     patient_id: UUID,
@@ -0,0 +1,53 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from collections import OrderedDict
+
+# prepared_statement_cache_size of SQLAlchemy's asyncpg adapter: the
+# per-connection LRU of prepared statements, passed to the engines
+PREPARED_STATEMENT_CACHE_SIZE = 256
+
+
+class PreparedStatementStats:
+    """
+    Estimated hit rate of the asyncpg adapter's prepared statement cache.
+
+    The adapter does not expose its cache counters, so each pooled
+    connection keeps a mirror LRU of the SQL texts it has executed, sized
+    like the real cache. A statement already in the mirror is counted as
+    served from a prepared plan; anything else as prepared again. The
+    figures are an estimate: the adapter also evicts on its own, for
+    example after a schema change invalidates a statement.
+    """
+
+    def __init__(self, size: int = PREPARED_STATEMENT_CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        executed = self.hits + self.misses
+        return {
+            "cache_size": self.size,
+            "estimated_hits": self.hits,
+            "estimated_misses": self.misses,
+            "estimated_hit_rate": round(self.hits / executed, 4) if executed else None
+        }
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Connection.info lives as long as the pooled DBAPI connection
+        seen = conn.info.setdefault("prepared_statements", OrderedDict())
+        if statement in seen:
+            seen.move_to_end(statement)
+            self.hits += 1
+            return
+
+        self.misses += 1
+        seen[statement] = None
+        if len(seen) > self.size:
+            seen.popitem(last=False)
+
+    def attach(self, engine: AsyncEngine):
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+
+prepared_statements = PreparedStatementStats()
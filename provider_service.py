@@ -1,15 +1,75 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Optional, List
+from sqlalchemy import select, text
+from typing import Optional, List, Dict
+from datetime import date, time
 from uuid import UUID
 
 from app.db.models import Provider, ProviderSchedule
 from app.schemas.provider import (
     ProviderCreate,
     ProviderUpdate,
-    ProviderScheduleCreate
+    ProviderScheduleCreate,
+    ProviderResponse
 )
+from app.core.schedule_cache import schedule_cache
+from app.core.analytics_cache import analytics_cache
+from app.core.availability import ProviderDayIndex, sql_day_of_week
 from app.utils.exceptions import NotFoundError
+from app.utils.fieldsets import field_columns, select_fields
+from app.utils.batch import ids_match
+
+# Provider, its schedule blocks for the day and every appointment with
+# patient and visit, as one row. Uses idx_appointments_provider_date.
+DAY_SHEET_SQL = text("""
+    SELECT
+        pr.provider_id,
+        pr.first_name || ' ' || pr.last_name AS provider_name,
+        pr.specialty,
+        COALESCE((
+            SELECT json_agg(
+                json_build_object('start_time', s.start_time, 'end_time', s.end_time)
+                ORDER BY s.start_time
+            )
+            FROM provider_schedules s
+            WHERE s.provider_id = pr.provider_id
+            AND s.day_of_week = :day_of_week
+            AND s.effective_from <= :day
+            AND (s.effective_until IS NULL OR s.effective_until >= :day)
+        ), '[]') AS schedule,
+        COALESCE((
+            SELECT json_agg(
+                json_build_object(
+                    'appointment_id', a.appointment_id,
+                    'start_time', a.start_time,
+                    'end_time', a.end_time,
+                    'status', a.status,
+                    'appointment_type', a.appointment_type,
+                    'notes', a.notes,
+                    'patient', json_build_object(
+                        'patient_id', p.patient_id,
+                        'name', p.first_name || ' ' || p.last_name,
+                        'phone', p.phone,
+                        'date_of_birth', p.date_of_birth
+                    ),
+                    'visit', CASE WHEN v.visit_id IS NULL THEN NULL ELSE json_build_object(
+                        'visit_id', v.visit_id,
+                        'chief_complaint', v.chief_complaint,
+                        'diagnosis', v.diagnosis,
+                        'follow_up_required', v.follow_up_required,
+                        'follow_up_date', v.follow_up_date
+                    ) END
+                )
+                ORDER BY a.start_time
+            )
+            FROM appointments a
+            JOIN patients p ON a.patient_id = p.patient_id
+            LEFT JOIN visits v ON v.appointment_id = a.appointment_id
+            WHERE a.provider_id = pr.provider_id
+            AND a.appointment_date = :day
+        ), '[]') AS appointments
+    FROM providers pr
+    WHERE pr.provider_id = :provider_id
+""")
 
 
 class ProviderService:
@@ -30,24 +90,58 @@ class ProviderService:
     @staticmethod
     async def get_provider(
         db: AsyncSession,
-        provider_id: UUID
+        provider_id: UUID,
+        fields: Optional[List[str]] = None
     ) -> Optional[Provider]:
-        """Get provider by ID."""
+        """Get provider by ID, or a row of just `fields` when given."""
+        if fields:
+            result = await db.execute(
+                select(*select_fields(field_columns(Provider, ProviderResponse), fields))
+                .where(Provider.provider_id == provider_id)
+            )
+            return result.mappings().one_or_none()
+        
         result = await db.execute(
             select(Provider).where(Provider.provider_id == provider_id)
         )
         return result.scalar_one_or_none()
     
+    @staticmethod
+    async def get_providers_by_ids(
+        db: AsyncSession,
+        provider_ids: List[UUID],
+        fields: Optional[List[str]] = None
+    ) -> Dict[UUID, Provider]:
+        """Fetch many providers in one query, keyed by provider_id."""
+        if fields:
+            columns = select_fields(
+                field_columns(Provider, ProviderResponse),
+                list(dict.fromkeys(['provider_id', *fields]))
+            )
+            result = await db.execute(
+                select(*columns).where(ids_match(Provider.provider_id, provider_ids))
+            )
+            return {row['provider_id']: row for row in result.mappings()}
+        
+        result = await db.execute(
+            select(Provider).where(ids_match(Provider.provider_id, provider_ids))
+        )
+        return {provider.provider_id: provider for provider in result.scalars()}
+    
     @staticmethod
     async def list_providers(
         db: AsyncSession,
         specialty: Optional[str] = None,
         is_active: Optional[bool] = True,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        fields: Optional[List[str]] = None
     ) -> List[Provider]:
-        """List providers with filters."""
-        query = select(Provider)
+        """List providers with filters; rows of just `fields` when given."""
+        if fields:
+            query = select(*select_fields(field_columns(Provider, ProviderResponse), fields))
+        else:
+            query = select(Provider)
         
         if specialty:
             query = query.where(Provider.specialty.ilike(f"%{specialty}%"))
@@ -57,7 +151,54 @@ class ProviderService:
         
         query = query.offset(skip).limit(limit)
         result = await db.execute(query)
-        return result.scalars().all()
+        return result.mappings().all() if fields else result.scalars().all()
+    
+    @staticmethod
+    async def get_day_sheet(
+        db: AsyncSession,
+        provider_id: UUID,
+        day: date
+    ) -> dict:
+        """
+        Everything a coordinator needs for one provider and day.
+        
+        Schedule, appointments with patient contact details and any visit
+        come back from a single statement; free gaps are then computed from
+        the same rows. Cancelled and no-show appointments are listed but do
+        not block time, and slot holds are not counted.
+        """
+        result = await db.execute(
+            DAY_SHEET_SQL,
+            {"provider_id": str(provider_id), "day": day, "day_of_week": sql_day_of_week(day)}
+        )
+        row = result.mappings().one_or_none()
+        if row is None:
+            raise NotFoundError("Provider not found")
+        
+        index = ProviderDayIndex(
+            [
+                (time.fromisoformat(block["start_time"]), time.fromisoformat(block["end_time"]))
+                for block in row["schedule"]
+            ],
+            [
+                (time.fromisoformat(apt["start_time"]), time.fromisoformat(apt["end_time"]))
+                for apt in row["appointments"]
+                if apt["status"] not in ('cancelled', 'no_show')
+            ]
+        )
+        
+        return {
+            "provider_id": row["provider_id"],
+            "provider_name": row["provider_name"],
+            "specialty": row["specialty"],
+            "date": day,
+            "schedule": row["schedule"],
+            "appointments": row["appointments"],
+            "free_gaps": [
+                {"start_time": str(start), "end_time": str(end)}
+                for start, end in index.free_gaps()
+            ]
+        }
     
     @staticmethod
     async def update_provider(
@@ -94,6 +235,11 @@ class ProviderService:
         db.add(schedule)
         await db.commit()
         await db.refresh(schedule)
+        
+        # Other workers are told through the provider_schedules NOTIFY trigger
+        schedule_cache.invalidate(schedule.provider_id)
+        # Scheduled minutes in utilization change over the effective range
+        analytics_cache.invalidate(schedule.effective_from, schedule.effective_until)
         return schedule
     
     @staticmethod
@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
+from datetime import date
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.core.provider_service import ProviderService
 from app.schemas.provider import (
     ProviderCreate,
@@ -12,7 +13,10 @@ from app.schemas.provider import (
     ProviderScheduleCreate,
     ProviderScheduleResponse
 )
-from app.utils.exceptions import NotFoundError
+from app.utils.exceptions import NotFoundError, ValidationError
+from app.schemas.common import BatchIdsRequest
+from app.utils.fast_json import fast_json_response, fast_json_object, batch_json_response
+from app.utils.fieldsets import parse_fields
 
 router = APIRouter()
 
@@ -41,28 +45,74 @@ async def list_providers(
     is_active: Optional[bool] = Query(True, description="Filter by active status"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    fast: bool = Query(False, description="Encode rows directly with orjson, skipping model validation"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. provider_id,first_name,last_name,specialty"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     List all providers with optional filters.
     """
-    return await ProviderService.list_providers(db, specialty, is_active, skip, limit)
+    try:
+        selected = parse_fields(fields)
+        providers = await ProviderService.list_providers(db, specialty, is_active, skip, limit, selected)
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+    
+    if fast or selected:
+        return fast_json_response(providers, ProviderResponse, selected)
+    return providers
+
+
+@router.post("/batch")
+async def get_providers_batch(
+    batch: BatchIdsRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. provider_id,first_name,last_name,specialty"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Fetch up to 5000 providers by ID in a single query.
+    
+    `items` follows the order of `ids`, with null for IDs that do not
+    exist; those IDs are also listed in `missing`.
+    """
+    try:
+        selected = parse_fields(fields)
+        found = await ProviderService.get_providers_by_ids(db, batch.ids, selected)
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+    return batch_json_response(batch.ids, found, ProviderResponse, selected)
 
 
 @router.get("/{provider_id}", response_model=ProviderResponse)
 async def get_provider(
     provider_id: UUID,
-    db: AsyncSession = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. provider_id,first_name,last_name,specialty"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get a specific provider by ID.
     """
-    provider = await ProviderService.get_provider(db, provider_id)
+    try:
+        selected = parse_fields(fields)
+        provider = await ProviderService.get_provider(db, provider_id, selected)
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
     if not provider:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Provider not found"
         )
+    if selected:
+        return fast_json_object(provider, ProviderResponse, selected)
     return provider
 
 
@@ -111,10 +161,31 @@ async def add_provider_schedule(
 @router.get("/{provider_id}/schedules", response_model=List[ProviderScheduleResponse])
 async def get_provider_schedules(
     provider_id: UUID,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all schedules for a provider.
     """
     return await ProviderService.get_provider_schedules(db, provider_id)
 
+
+@router.get("/{provider_id}/day-sheet")
+async def get_day_sheet(
+    provider_id: UUID,
+    date: date = Query(..., description="Day to assemble"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Composite view of one provider's day in a single database round-trip.
+    
+    Returns the schedule blocks, every appointment with the patient's name,
+    phone and date of birth and any visit record, plus the free gaps
+    between bookings.
+    """
+    try:
+        return await ProviderService.get_day_sheet(db, provider_id, date)
+    except NotFoundError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
@@ -0,0 +1,99 @@
+"""
+Consistency checks for the trigger-maintained appointment_rollup table.
+
+    python rollup.py check      # list rollup rows that disagree with appointments
+    python rollup.py rebuild    # recompute the rollup from appointments
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import List
+import argparse
+import asyncio
+
+# The rollup as it should be, recomputed from appointments
+ROLLUP_SOURCE_SQL = """
+    SELECT
+        provider_id,
+        appointment_date,
+        status,
+        COUNT(*) AS appointment_count,
+        SUM(EXTRACT(EPOCH FROM end_time - start_time)::INTEGER / 60) AS booked_minutes
+    FROM appointments
+    GROUP BY provider_id, appointment_date, status
+"""
+
+ROLLUP_DIFF_SQL = text(f"""
+    WITH expected AS ({ROLLUP_SOURCE_SQL}),
+    actual AS (
+        SELECT * FROM appointment_rollup
+        WHERE appointment_count <> 0 OR booked_minutes <> 0
+    )
+    SELECT
+        provider_id,
+        appointment_date,
+        status,
+        expected.appointment_count AS expected_count,
+        actual.appointment_count AS actual_count,
+        expected.booked_minutes AS expected_minutes,
+        actual.booked_minutes AS actual_minutes
+    FROM expected
+    FULL OUTER JOIN actual USING (provider_id, appointment_date, status)
+    WHERE expected.appointment_count IS DISTINCT FROM actual.appointment_count
+    OR expected.booked_minutes IS DISTINCT FROM actual.booked_minutes
+    ORDER BY appointment_date, provider_id, status
+    LIMIT :limit
+""")
+
+
+class RollupService:
+    """Verification and repair of appointment_rollup."""
+
+    @staticmethod
+    async def check(db: AsyncSession, limit: int = 1000) -> List[dict]:
+        """Rollup keys whose count or booked minutes differ from appointments."""
+        result = await db.execute(ROLLUP_DIFF_SQL, {"limit": limit})
+        return [dict(row) for row in result.mappings()]
+
+    @staticmethod
+    async def rebuild(db: AsyncSession) -> int:
+        """
+        Replace the rollup with a fresh aggregate of appointments.
+
+        Appointment writes are blocked (reads are not) until the rebuild
+        commits, so no trigger update can slip between delete and insert.
+        """
+        await db.execute(text("LOCK TABLE appointments IN SHARE MODE"))
+        await db.execute(text("DELETE FROM appointment_rollup"))
+        result = await db.execute(text(f"""
+            INSERT INTO appointment_rollup
+                (provider_id, appointment_date, status, appointment_count, booked_minutes)
+            {ROLLUP_SOURCE_SQL}
+        """))
+        await db.commit()
+        return result.rowcount
+
+
+async def main(command: str):
+    from app.db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        if command == "rebuild":
+            print(f"Rebuilt appointment_rollup: {await RollupService.rebuild(db)} rows")
+            return
+
+        mismatches = await RollupService.check(db)
+        for row in mismatches:
+            print(
+                f"{row['provider_id']} {row['appointment_date']} {row['status']:<12} "
+                f"count {row['actual_count']} != {row['expected_count']}  "
+                f"minutes {row['actual_minutes']} != {row['expected_minutes']}"
+            )
+        print(f"{len(mismatches)} mismatched rollup rows")
+        if mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["check", "rebuild"])
+    asyncio.run(main(parser.parse_args().command))
@@ -0,0 +1,153 @@
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, AsyncConnection
+from sqlalchemy import select
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, time
+from uuid import UUID
+import logging
+
+from app.db.models import ProviderSchedule
+from app.core.availability import sql_day_of_week, to_seconds
+
+logger = logging.getLogger(__name__)
+
+# Channel notified by the provider_schedules trigger in db.sql
+SCHEDULE_CHANNEL = "provider_schedules_changed"
+
+
+def minute_mask(start_minute: int, end_minute: int) -> int:
+    """Bitmask with one bit per minute in [start_minute, end_minute)."""
+    if end_minute <= start_minute:
+        return 0
+    return ((1 << end_minute) - 1) ^ ((1 << start_minute) - 1)
+
+
+class CompiledSchedule:
+    """
+    A provider's weekly schedules compiled to per-weekday minute bitmasks.
+
+    Each schedule row becomes (effective_from, effective_until, mask) under
+    its weekday. A request is covered when every minute it touches is set
+    in the union of the masks effective on that date.
+    """
+
+    __slots__ = ("_by_weekday",)
+
+    def __init__(self, rows: Iterable):
+        self._by_weekday: Dict[int, List[Tuple[date, Optional[date], int]]] = {}
+        for row in rows:
+            # Only whole minutes inside the block count as covered
+            first_minute = -(-to_seconds(row.start_time) // 60)
+            mask = minute_mask(first_minute, to_seconds(row.end_time) // 60)
+            self._by_weekday.setdefault(row.day_of_week, []).append(
+                (row.effective_from, row.effective_until, mask)
+            )
+
+    def mask_for(self, day: date) -> int:
+        mask = 0
+        blocks = self._by_weekday.get(sql_day_of_week(day), [])
+        for effective_from, effective_until, block in blocks:
+            if effective_from <= day and (effective_until is None or effective_until >= day):
+                mask |= block
+        return mask
+
+    def covers(self, day: date, start_time: time, end_time: time) -> bool:
+        needed = minute_mask(to_seconds(start_time) // 60, -(-to_seconds(end_time) // 60))
+        return needed != 0 and self.mask_for(day) & needed == needed
+
+
+class ScheduleCache:
+    """
+    Process-wide cache of compiled provider schedules.
+
+    Entries are dropped by ProviderService.add_schedule in this worker and
+    by NOTIFY messages on SCHEDULE_CHANNEL from every other writer. If the
+    LISTEN connection is lost the cache is bypassed until restart, so a
+    missed notification can never serve a stale schedule.
+    """
+
+    def __init__(self):
+        self._compiled: Dict[UUID, CompiledSchedule] = {}
+        self._epoch = 0
+        self._bypass = False
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def bypassed(self) -> bool:
+        return self._bypass
+
+    def stats(self) -> dict:
+        return {
+            "providers": len(self._compiled),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "bypassed": self._bypass
+        }
+
+    async def get(self, db: AsyncSession, provider_id: UUID) -> CompiledSchedule:
+        compiled = self._compiled.get(provider_id)
+        if compiled is not None and not self._bypass:
+            self.hits += 1
+            return compiled
+
+        self.misses += 1
+        epoch = self._epoch
+        result = await db.execute(
+            select(
+                ProviderSchedule.day_of_week,
+                ProviderSchedule.start_time,
+                ProviderSchedule.end_time,
+                ProviderSchedule.effective_from,
+                ProviderSchedule.effective_until
+            )
+            .where(ProviderSchedule.provider_id == provider_id)
+        )
+        compiled = CompiledSchedule(result.all())
+
+        # Skip storing if an invalidation arrived while the query was running
+        if epoch == self._epoch and not self._bypass:
+            self._compiled[provider_id] = compiled
+        return compiled
+
+    async def covers(
+        self,
+        db: AsyncSession,
+        provider_id: UUID,
+        day: date,
+        start_time: time,
+        end_time: time
+    ) -> bool:
+        compiled = await self.get(db, provider_id)
+        return compiled.covers(day, start_time, end_time)
+
+    def invalidate(self, provider_id: Optional[UUID] = None):
+        self._epoch += 1
+        self.invalidations += 1
+        if provider_id is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(provider_id, None)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            self.invalidate(UUID(payload))
+        except ValueError:
+            self.invalidate()
+
+    def _on_terminate(self, connection):
+        logger.warning("Schedule cache listener lost its connection; bypassing cache")
+        self._bypass = True
+        self.invalidate()
+
+    async def listen(self, engine: AsyncEngine) -> AsyncConnection:
+        """Subscribe to schedule changes; close the returned connection on shutdown."""
+        conn = await engine.connect()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.add_listener(SCHEDULE_CHANNEL, self._on_notify)
+        raw.driver_connection.add_termination_listener(self._on_terminate)
+        return conn
+
+
+schedule_cache = ScheduleCache()
@@ -8,6 +8,19 @@ from app.schemas.appointment import (
     AppointmentStatus
 )
 from app.schemas.visit import VisitCreate, VisitUpdate, VisitResponse
+from app.schemas.booking import (
+    BulkItemStatus,
+    AppointmentBulkCreate,
+    AppointmentBulkItemResult,
+    AppointmentBulkResponse,
+    RecurrenceFrequency,
+    RecurrenceRule,
+    AppointmentSeriesCreate,
+    AppointmentSeriesItem,
+    AppointmentSeriesResponse,
+    SlotHoldCreate,
+    SlotHoldResponse
+)
 
 __all__ = [
     "PatientCreate",
@@ -24,5 +37,16 @@ __all__ = [
     "VisitCreate",
     "VisitUpdate",
     "VisitResponse",
+    "BulkItemStatus",
+    "AppointmentBulkCreate",
+    "AppointmentBulkItemResult",
+    "AppointmentBulkResponse",
+    "RecurrenceFrequency",
+    "RecurrenceRule",
+    "AppointmentSeriesCreate",
+    "AppointmentSeriesItem",
+    "AppointmentSeriesResponse",
+    "SlotHoldCreate",
+    "SlotHoldResponse",
 ]
 
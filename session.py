@@ -1,6 +1,14 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import text
+from fastapi import Request
 from app.config import settings
-from typing import AsyncGenerator
+from app.utils.settings_defaults import setting
+from app.db.prepared_statements import prepared_statements, PREPARED_STATEMENT_CACHE_SIZE
+from typing import AsyncGenerator, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Create async engine
 engine = create_async_engine(
@@ -9,9 +17,26 @@ engine = create_async_engine(
     future=True,
     pool_pre_ping=True,
     pool_size=10,
-    max_overflow=20
+    max_overflow=20,
+    connect_args={"prepared_statement_cache_size": PREPARED_STATEMENT_CACHE_SIZE}
 )
 
+# Read-only engine for list and analytics traffic; the primary when no replica is configured
+READ_DATABASE_URL = setting("READ_DATABASE_URL")
+read_engine = create_async_engine(
+    READ_DATABASE_URL,
+    echo=settings.DEBUG,
+    future=True,
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20,
+    connect_args={"prepared_statement_cache_size": PREPARED_STATEMENT_CACHE_SIZE}
+) if READ_DATABASE_URL else engine
+
+prepared_statements.attach(engine)
+if read_engine is not engine:
+    prepared_statements.attach(read_engine)
+
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -21,6 +46,98 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False
 )
 
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False
+)
+
+# Set on responses to writes; while present the client's reads go to the primary
+READ_YOUR_WRITES_COOKIE = "read_your_writes"
+
+# Seconds the replica is behind the primary; 0 when fully replayed or not a standby
+REPLICA_LAG_SQL = text("""
+    SELECT COALESCE(
+        CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+             ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END,
+        0
+    )
+""")
+
+
+class ReplicaLagMonitor:
+    """
+    Tracks replica lag so reads fall back to the primary when it is stale.
+    
+    Lag is polled every REPLICA_LAG_CHECK_SECONDS. Until the first check
+    succeeds, and whenever a check fails or lag exceeds
+    REPLICA_MAX_LAG_SECONDS, read sessions are opened on the primary.
+    """
+    
+    def __init__(self, max_lag: float):
+        self.max_lag = max_lag
+        self.lag: Optional[float] = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.sticky_reads = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return read_engine is not engine
+    
+    @property
+    def healthy(self) -> bool:
+        return self.lag is not None and self.lag <= self.max_lag
+    
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "lag_seconds": self.lag,
+            "healthy": self.healthy,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "sticky_reads": self.sticky_reads
+        }
+    
+    async def check(self):
+        try:
+            async with read_engine.connect() as conn:
+                self.lag = float((await conn.execute(REPLICA_LAG_SQL)).scalar())
+        except Exception as exc:
+            logger.warning(f"Replica lag check failed: {exc}")
+            self.lag = None
+    
+    async def run(self, interval: float):
+        """Poll lag until cancelled; started from the app lifespan."""
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+
+replica_monitor = ReplicaLagMonitor(setting("REPLICA_MAX_LAG_SECONDS"))
+
+
+def is_sticky(request: Request) -> bool:
+    """Whether the client wrote recently enough that its reads must see the primary."""
+    return READ_YOUR_WRITES_COOKIE in request.cookies
+
+
+def read_session_factory(sticky: bool = False) -> async_sessionmaker:
+    """Session factory for a read: the replica unless sticky, stale or disabled."""
+    if not replica_monitor.enabled:
+        return AsyncSessionLocal
+    if sticky:
+        replica_monitor.sticky_reads += 1
+        return AsyncSessionLocal
+    if not replica_monitor.healthy:
+        replica_monitor.primary_reads += 1
+        return AsyncSessionLocal
+    replica_monitor.replica_reads += 1
+    return ReadSessionLocal
+
 
 # Dependency for FastAPI
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -32,3 +149,17 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+
+
+# Dependency for read-only routes
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    # Read-only POSTs (batch lookups) must not pin the client to the primary
+    request.state.read_only = True
+    async with read_session_factory(is_sticky(request))() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
@@ -0,0 +1,27 @@
+from typing import Any, Dict
+
+from app.config import settings
+
+# Defaults for settings that a deployed app.config may not declare yet;
+# keep in step with .env.example
+SETTINGS_DEFAULTS: Dict[str, Any] = {
+    "SLOT_HOLD_BACKEND": "memory",
+    "BOOKING_SERIALIZATION": "off",
+    "READ_DATABASE_URL": None,
+    "REPLICA_MAX_LAG_SECONDS": 2,
+    "REPLICA_LAG_CHECK_SECONDS": 1,
+    "READ_YOUR_WRITES_SECONDS": 5,
+    "ANALYTICS_REFRESH_SECONDS": 300,
+    "ANALYTICS_MIN_REFRESH_SECONDS": 30,
+    "ANALYTICS_ENGINE": "views",
+    "ANALYTICS_CACHE_TTL_SECONDS": 30,
+    "ANALYTICS_CACHE_MAX_ENTRIES": 256,
+    "TIMING_SKETCH_SECONDS": 60,
+    "ANALYTICS_SNAPSHOT_DIR": "./snapshots",
+    "ANALYTICS_SNAPSHOT_SECONDS": 600,
+}
+
+
+def setting(name: str) -> Any:
+    """settings.<name>, or its SETTINGS_DEFAULTS entry when app.config lacks it; every name needs one."""
+    return getattr(settings, name, SETTINGS_DEFAULTS[name])
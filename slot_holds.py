@@ -0,0 +1,267 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, and_, or_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Dict, List, Optional, Tuple
+from datetime import date, time, datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+from app.utils.settings_defaults import setting
+from app.db.models import SlotHold
+from app.utils.exceptions import AppointmentConflictError
+
+
+def overlapping_hold(
+    holds: List[dict],
+    patient_id: UUID,
+    start_time: time,
+    end_time: time
+) -> Optional[dict]:
+    """Return a hold by another patient that overlaps [start_time, end_time), if any."""
+    for hold in holds:
+        if (
+            hold["patient_id"] != patient_id
+            and hold["start_time"] < end_time
+            and hold["end_time"] > start_time
+        ):
+            return hold
+    return None
+
+
+class InMemorySlotHoldStore:
+    """
+    Process-local hold table keyed by (provider_id, appointment_date).
+
+    Expired holds are dropped lazily whenever their day is touched, so the
+    table only ever holds live reservations. Only suitable for a single
+    worker; use PostgresSlotHoldStore when running several.
+    """
+
+    def __init__(self):
+        self._holds: Dict[Tuple[UUID, date], List[dict]] = {}
+        self._keys: Dict[UUID, Tuple[UUID, date]] = {}
+
+    def _live(self, key: Tuple[UUID, date]) -> List[dict]:
+        now = datetime.now(timezone.utc)
+        holds = self._holds.get(key, [])
+        live = [hold for hold in holds if hold["expires_at"] > now]
+
+        if len(live) != len(holds):
+            for hold in holds:
+                if hold["expires_at"] <= now:
+                    self._keys.pop(hold["hold_id"], None)
+            if live:
+                self._holds[key] = live
+            else:
+                self._holds.pop(key, None)
+        return live
+
+    async def acquire(
+        self,
+        db: AsyncSession,
+        provider_id: UUID,
+        patient_id: UUID,
+        appointment_date: date,
+        start_time: time,
+        end_time: time,
+        ttl_seconds: int
+    ) -> dict:
+        key = (provider_id, appointment_date)
+        live = self._live(key)
+
+        if overlapping_hold(live, patient_id, start_time, end_time):
+            raise AppointmentConflictError("Time slot is held by another patient")
+
+        # A patient re-holding an overlapping slot replaces their earlier hold
+        for hold in live:
+            if hold["start_time"] < end_time and hold["end_time"] > start_time:
+                await self.release(db, hold["hold_id"])
+
+        hold = {
+            "hold_id": uuid4(),
+            "provider_id": provider_id,
+            "patient_id": patient_id,
+            "appointment_date": appointment_date,
+            "start_time": start_time,
+            "end_time": end_time,
+            "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+        }
+        self._holds.setdefault(key, []).append(hold)
+        self._keys[hold["hold_id"]] = key
+        return hold
+
+    async def release(self, db: AsyncSession, hold_id: UUID) -> bool:
+        key = self._keys.pop(hold_id, None)
+        if key is None:
+            return False
+
+        remaining = [hold for hold in self._holds.get(key, []) if hold["hold_id"] != hold_id]
+        if remaining:
+            self._holds[key] = remaining
+        else:
+            self._holds.pop(key, None)
+        return True
+
+    async def list_active(
+        self,
+        db: AsyncSession,
+        provider_ids: List[UUID],
+        start_date: date,
+        end_date: date
+    ) -> List[dict]:
+        wanted = set(provider_ids)
+        return [
+            hold
+            for key in list(self._holds)
+            if key[0] in wanted and start_date <= key[1] <= end_date
+            for hold in self._live(key)
+        ]
+
+    async def release_matching(
+        self,
+        db: AsyncSession,
+        provider_id: UUID,
+        patient_id: UUID,
+        appointment_date: date,
+        start_time: time,
+        end_time: time
+    ) -> List[UUID]:
+        # Only matched here; a failed commit must leave the patient's hold in place
+        return [
+            hold["hold_id"]
+            for hold in self._live((provider_id, appointment_date))
+            if (
+                hold["patient_id"] == patient_id
+                and hold["start_time"] < end_time
+                and hold["end_time"] > start_time
+            )
+        ]
+
+    async def release_after_commit(self, db: AsyncSession, hold_ids: List[UUID]):
+        for hold_id in hold_ids:
+            await self.release(db, hold_id)
+
+
+class PostgresSlotHoldStore:
+    """
+    Hold table in Postgres, shared by every worker.
+
+    Overlapping holds are rejected by the slot_holds exclusion constraint;
+    expired rows are deleted before each acquire and ignored by reads.
+    """
+
+    @staticmethod
+    def _as_dict(hold: SlotHold) -> dict:
+        return {
+            "hold_id": hold.hold_id,
+            "provider_id": hold.provider_id,
+            "patient_id": hold.patient_id,
+            "appointment_date": hold.appointment_date,
+            "start_time": hold.start_time,
+            "end_time": hold.end_time,
+            "expires_at": hold.expires_at
+        }
+
+    async def acquire(
+        self,
+        db: AsyncSession,
+        provider_id: UUID,
+        patient_id: UUID,
+        appointment_date: date,
+        start_time: time,
+        end_time: time,
+        ttl_seconds: int
+    ) -> dict:
+        # Clear expired holds and this patient's overlapping hold on the same day
+        await db.execute(
+            delete(SlotHold).where(
+                and_(
+                    SlotHold.provider_id == provider_id,
+                    SlotHold.appointment_date == appointment_date,
+                    or_(
+                        SlotHold.expires_at <= func.now(),
+                        and_(
+                            SlotHold.patient_id == patient_id,
+                            SlotHold.start_time < end_time,
+                            SlotHold.end_time > start_time
+                        )
+                    )
+                )
+            )
+        )
+
+        result = await db.execute(
+            pg_insert(SlotHold)
+            .values(
+                provider_id=provider_id,
+                patient_id=patient_id,
+                appointment_date=appointment_date,
+                start_time=start_time,
+                end_time=end_time,
+                expires_at=func.now() + timedelta(seconds=ttl_seconds)
+            )
+            .on_conflict_do_nothing()
+            .returning(SlotHold)
+        )
+        hold = result.scalar_one_or_none()
+        await db.commit()
+
+        if hold is None:
+            raise AppointmentConflictError("Time slot is held by another patient")
+        return self._as_dict(hold)
+
+    async def release(self, db: AsyncSession, hold_id: UUID) -> bool:
+        result = await db.execute(delete(SlotHold).where(SlotHold.hold_id == hold_id))
+        await db.commit()
+        return result.rowcount > 0
+
+    async def list_active(
+        self,
+        db: AsyncSession,
+        provider_ids: List[UUID],
+        start_date: date,
+        end_date: date
+    ) -> List[dict]:
+        result = await db.execute(
+            select(SlotHold).where(
+                and_(
+                    SlotHold.provider_id.in_(provider_ids),
+                    SlotHold.appointment_date.between(start_date, end_date),
+                    SlotHold.expires_at > func.now()
+                )
+            )
+        )
+        return [self._as_dict(hold) for hold in result.scalars()]
+
+    async def release_matching(
+        self,
+        db: AsyncSession,
+        provider_id: UUID,
+        patient_id: UUID,
+        appointment_date: date,
+        start_time: time,
+        end_time: time
+    ) -> List[UUID]:
+        # Runs inside the caller's transaction so it commits with the booking
+        result = await db.execute(
+            delete(SlotHold).where(
+                and_(
+                    SlotHold.provider_id == provider_id,
+                    SlotHold.patient_id == patient_id,
+                    SlotHold.appointment_date == appointment_date,
+                    SlotHold.start_time < end_time,
+                    SlotHold.end_time > start_time
+                )
+            )
+            .returning(SlotHold.hold_id)
+        )
+        return list(result.scalars())
+
+    async def release_after_commit(self, db: AsyncSession, hold_ids: List[UUID]):
+        # Already deleted by release_matching in the committed transaction
+        pass
+
+
+slot_holds = (
+    PostgresSlotHoldStore() if setting("SLOT_HOLD_BACKEND") == "postgres"
+    else InMemorySlotHoldStore()
+)
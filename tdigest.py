@@ -0,0 +1,134 @@
+import math
+import struct
+from typing import Iterable, List, Optional
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (the merging t-digest).
+
+    Values are summarized as weighted centroids that are small near the
+    tails and larger in the middle, so p99 stays accurate while the sketch
+    holds at most about `compression` centroids however many values were
+    added. Two digests merge into one that answers quantiles over the union
+    of their inputs, which is what lets per-day sketches combine into any
+    window.
+    """
+
+    __slots__ = ("compression", "_means", "_weights", "_buffer", "count", "min", "max")
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self._means: List[float] = []
+        self._weights: List[float] = []
+        self._buffer: List[tuple] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __len__(self) -> int:
+        self._flush()
+        return len(self._means)
+
+    def add(self, value: float, weight: float = 1.0):
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) > self.compression * 5:
+            self._flush()
+
+    def update(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "TDigest"):
+        """Fold `other` into this digest."""
+        if not other.count:
+            return
+        self._buffer.extend(zip(other._means, other._weights))
+        self._buffer.extend(other._buffer)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self._buffer) > self.compression * 5:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+
+        items = sorted(list(zip(self._means, self._weights)) + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in items)
+
+        # k1 scale function: centroid sizes shrink towards q=0 and q=1
+        scale = self.compression / (2 * math.pi)
+
+        def q_limit(q: float) -> float:
+            k = scale * math.asin(2 * q - 1) + 1
+            return (math.sin(min(k / scale, math.pi / 2)) + 1) / 2
+
+        means, weights = [], []
+        mean, weight = items[0]
+        weight_so_far = 0.0
+        limit = total * q_limit(0.0)
+        for item_mean, item_weight in items[1:]:
+            if weight_so_far + weight + item_weight <= limit:
+                weight += item_weight
+                mean += (item_mean - mean) * item_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                weight_so_far += weight
+                limit = total * q_limit(min(weight_so_far / total, 1.0))
+                mean, weight = item_mean, item_weight
+        means.append(mean)
+        weights.append(weight)
+
+        self._means = means
+        self._weights = weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q (0..1); None for an empty digest."""
+        self._flush()
+        if not self._means:
+            return None
+        if len(self._means) == 1:
+            return self._means[0]
+
+        means, weights = self._means, self._weights
+        target = q * self.count
+
+        # Interpolate between centroid centres, pinned to min/max at the ends
+        if target <= weights[0] / 2:
+            return self.min + (means[0] - self.min) * target / (weights[0] / 2)
+        if target >= self.count - weights[-1] / 2:
+            tail = self.count - target
+            return self.max - (self.max - means[-1]) * tail / (weights[-1] / 2)
+
+        cumulative = weights[0] / 2
+        for i in range(len(means) - 1):
+            step = (weights[i] + weights[i + 1]) / 2
+            if cumulative + step >= target:
+                return means[i] + (means[i + 1] - means[i]) * (target - cumulative) / step
+            cumulative += step
+        return self.max
+
+    def to_bytes(self) -> bytes:
+        """Pack as little-endian doubles: min, max, then mean/weight pairs."""
+        self._flush()
+        values = [self.min, self.max]
+        for mean, weight in zip(self._means, self._weights):
+            values.extend((mean, weight))
+        return struct.pack(f"<{len(values)}d", *values)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, compression: float = 100) -> "TDigest":
+        values = struct.unpack(f"<{len(data) // 8}d", data)
+        digest = cls(compression)
+        digest.min, digest.max = values[0], values[1]
+        digest._means = list(values[2::2])
+        digest._weights = list(values[3::2])
+        digest.count = sum(digest._weights)
+        return digest
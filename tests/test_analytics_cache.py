@@ -0,0 +1,232 @@
+import asyncio
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import analytics_cache as analytics_cache_module
+from app.core.analytics_cache import AsyncTTLCache, cached, ranges_overlap
+
+JAN = (date(2024, 1, 1), date(2024, 1, 31))
+FEB = (date(2024, 2, 1), date(2024, 2, 29))
+
+
+@pytest.fixture(autouse=True)
+def no_replica(monkeypatch):
+    monitor = SimpleNamespace(enabled=False, healthy=True, lag=0.0, max_lag=2.0)
+    monkeypatch.setattr(analytics_cache_module, "replica_monitor", monitor)
+    return monitor
+
+
+def counting_loader(value="result"):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return value
+
+    return loader, calls
+
+
+def test_ranges_overlap():
+    assert ranges_overlap(JAN, (date(2024, 1, 31), date(2024, 2, 5)))
+    assert not ranges_overlap(JAN, FEB)
+    assert ranges_overlap(JAN, (None, None))
+    assert ranges_overlap((None, date(2024, 1, 1)), JAN)
+    assert not ranges_overlap((date(2024, 2, 1), None), JAN)
+
+
+async def test_hit_after_miss():
+    cache = AsyncTTLCache(maxsize=8, ttl=60)
+    loader, calls = counting_loader()
+    assert await cache.get_or_load("k", JAN, loader) == "result"
+    assert await cache.get_or_load("k", JAN, loader) == "result"
+    assert len(calls) == 1
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+async def test_entry_expires():
+    cache = AsyncTTLCache(maxsize=8, ttl=0.01)
+    loader, calls = counting_loader()
+    await cache.get_or_load("k", JAN, loader)
+    await asyncio.sleep(0.02)
+    await cache.get_or_load("k", JAN, loader)
+    assert len(calls) == 2
+    assert cache.expirations == 1
+
+
+async def test_disabled_cache_always_loads():
+    cache = AsyncTTLCache(maxsize=8, ttl=0)
+    loader, calls = counting_loader()
+    await cache.get_or_load("k", JAN, loader)
+    await cache.get_or_load("k", JAN, loader)
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 0
+
+
+async def test_concurrent_misses_share_one_load():
+    cache = AsyncTTLCache(maxsize=8, ttl=60)
+    release = asyncio.Event()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await release.wait()
+        return "result"
+
+    waiters = [asyncio.ensure_future(cache.get_or_load("k", JAN, loader)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*waiters) == ["result"] * 3
+    assert len(calls) == 1
+    assert (cache.misses, cache.coalesced) == (1, 2)
+
+
+async def test_cancelled_caller_does_not_cancel_shared_load():
+    cache = AsyncTTLCache(maxsize=8, ttl=60)
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return "result"
+
+    first = asyncio.ensure_future(cache.get_or_load("k", JAN, loader))
+    second = asyncio.ensure_future(cache.get_or_load("k", JAN, loader))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == "result"
+
+
+async def test_failed_load_is_not_cached():
+    cache = AsyncTTLCache(maxsize=8, ttl=60)
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("k", JAN, failing)
+    loader, calls = counting_loader()
+    assert await cache.get_or_load("k", JAN, loader) == "result"
+    assert len(calls) == 1
+
+
+async def test_lru_eviction():
+    cache = AsyncTTLCache(maxsize=2, ttl=60)
+    for key in ("a", "b"):
+        await cache.get_or_load(key, JAN, counting_loader(key)[0])
+    # Touch "a" so "b" is the least recently used
+    await cache.get_or_load("a", JAN, counting_loader()[0])
+    await cache.get_or_load("c", JAN, counting_loader("c")[0])
+
+    loader, calls = counting_loader()
+    await cache.get_or_load("a", JAN, loader)
+    await cache.get_or_load("b", JAN, loader)
+    assert len(calls) == 1
+    assert cache.evictions >= 1
+
+
+async def test_invalidate_drops_only_overlapping_entries():
+    cache = AsyncTTLCache(maxsize=8, ttl=60)
+    await cache.get_or_load("jan", JAN, counting_loader()[0])
+    await cache.get_or_load("feb", FEB, counting_loader()[0])
+
+    cache.invalidate(date(2024, 1, 15), date(2024, 1, 15))
+
+    jan_loader, jan_calls = counting_loader()
+    feb_loader, feb_calls = counting_loader()
+    await cache.get_or_load("jan", JAN, jan_loader)
+    await cache.get_or_load("feb", FEB, feb_loader)
+    assert (len(jan_calls), len(feb_calls)) == (1, 0)
+
+
+async def test_invalidate_everything():
+    cache = AsyncTTLCache(maxsize=8, ttl=60)
+    await cache.get_or_load("jan", JAN, counting_loader()[0])
+    await cache.get_or_load("feb", FEB, counting_loader()[0])
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+async def test_load_invalidated_midway_is_returned_but_not_stored():
+    cache = AsyncTTLCache(maxsize=8, ttl=60)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def loader():
+        started.set()
+        await release.wait()
+        return "before write"
+
+    pending = asyncio.ensure_future(cache.get_or_load("k", JAN, loader))
+    await started.wait()
+    cache.invalidate(date(2024, 1, 10), date(2024, 1, 10))
+    release.set()
+    assert await pending == "before write"
+
+    reload, calls = counting_loader("after write")
+    assert await cache.get_or_load("k", JAN, reload) == "after write"
+    assert len(calls) == 1
+
+
+async def test_load_not_stored_while_replica_may_be_behind(no_replica):
+    no_replica.enabled = True
+    no_replica.lag = 0.5
+    cache = AsyncTTLCache(maxsize=8, ttl=60)
+
+    cache.invalidate(date(2024, 1, 10), date(2024, 1, 10))
+    await cache.get_or_load("jan", JAN, counting_loader()[0])
+    await cache.get_or_load("feb", FEB, counting_loader()[0])
+
+    assert cache.replica_skips == 1
+    assert cache.stats()["entries"] == 1
+
+
+async def test_unhealthy_replica_does_not_block_storing(no_replica):
+    no_replica.enabled = True
+    no_replica.healthy = False
+    cache = AsyncTTLCache(maxsize=8, ttl=60)
+
+    cache.invalidate(date(2024, 1, 10), date(2024, 1, 10))
+    await cache.get_or_load("jan", JAN, counting_loader()[0])
+    assert cache.replica_skips == 0
+    assert cache.stats()["entries"] == 1
+
+
+async def test_cached_key_normalizes_equivalent_arguments(monkeypatch):
+    cache = AsyncTTLCache(maxsize=8, ttl=60)
+    monkeypatch.setattr(analytics_cache_module, "analytics_cache", cache)
+
+    def window(days=30, start_date=None, end_date=None):
+        end_date = end_date or date(2024, 1, 31)
+        return (start_date or end_date - timedelta(days=days - 1), end_date)
+
+    calls = []
+
+    @cached(window, key=window)
+    async def report(db, days=30, start_date=None, end_date=None):
+        calls.append(window(days, start_date, end_date))
+        return calls[-1]
+
+    assert await report(None, 31) == JAN
+    assert await report(None, days=7, start_date=date(2024, 1, 1)) == JAN
+    assert await report(None, start_date=date(2024, 1, 1), end_date=date(2024, 1, 31)) == JAN
+    assert await report(None) == (date(2024, 1, 2), date(2024, 1, 31))
+    assert len(calls) == 2
+
+
+async def test_cached_default_key_is_the_arguments(monkeypatch):
+    cache = AsyncTTLCache(maxsize=8, ttl=60)
+    monkeypatch.setattr(analytics_cache_module, "analytics_cache", cache)
+    calls = []
+
+    @cached(lambda group_by: JAN)
+    async def report(db, group_by):
+        calls.append(group_by)
+        return group_by
+
+    assert await report(None, "provider") == "provider"
+    assert await report(None, group_by="provider") == "provider"
+    assert await report(None, "specialty") == "specialty"
+    # Positional and keyword calls are keyed separately
+    assert calls == ["provider", "provider", "specialty"]
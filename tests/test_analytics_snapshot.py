@@ -0,0 +1,368 @@
+"""
+AnalyticsSnapshot group-bys checked against straightforward per-row
+implementations of UTILIZATION_SQL, ROLLUP_DAILY_LOAD_SQL and
+ROLLUP_NO_SHOW_SQL.
+"""
+import os
+import random
+import struct
+from collections import defaultdict
+from datetime import date, time, timedelta
+
+import numpy as np
+import pytest
+
+from app.core.analytics_snapshot import (
+    COLUMNS,
+    COPY_SIGNATURE,
+    OPEN_ENDED,
+    SNAPSHOT_FORMAT,
+    STATUS_CODES,
+    AnalyticsSnapshot,
+    AnalyticsSnapshotter,
+    read_copy,
+    to_day,
+)
+from app.core.availability import merge_intervals, sql_day_of_week, to_seconds
+from app.utils.exceptions import SnapshotUnavailableError
+
+PROVIDERS = [
+    {"provider_id": "p0", "provider_name": "Ada Byrne", "specialty": "cardiology", "is_active": True},
+    {"provider_id": "p1", "provider_name": "Ben Cho", "specialty": "dermatology", "is_active": True},
+    {"provider_id": "p2", "provider_name": "Cara Diaz", "specialty": "cardiology", "is_active": False},
+    {"provider_id": "p3", "provider_name": "Dev Eze", "specialty": "pediatrics", "is_active": True},
+    {"provider_id": "p4", "provider_name": "Eli Fox", "specialty": "pediatrics", "is_active": True},
+]
+
+# (provider, day_of_week, start, end, effective_from, effective_until)
+SCHEDULES = [
+    (0, 1, time(9), time(12), date(2024, 1, 1), None),
+    (0, 1, time(13), time(17), date(2024, 1, 1), None),
+    (0, 3, time(9), time(17), date(2024, 1, 1), date(2024, 3, 31)),
+    (0, 3, time(10), time(14), date(2024, 4, 1), None),
+    # Overlaps both Monday blocks for part of the window
+    (0, 1, time(11), time(14), date(2024, 2, 1), date(2024, 4, 30)),
+    # Duplicates a Wednesday block
+    (0, 3, time(10), time(14), date(2024, 5, 1), date(2024, 5, 31)),
+    (1, 2, time(8), time(16), date(2024, 2, 15), None),
+    (1, 5, time(8), time(12), date(2023, 6, 1), date(2024, 2, 14)),
+    (2, 4, time(9), time(17), date(2024, 1, 1), None),
+    (3, 0, time(10), time(14), date(2024, 3, 1), date(2024, 3, 31)),
+    (3, 6, time(9), time(13), date(2024, 1, 1), None),
+    (3, 6, time(12), time(15), date(2024, 3, 15), None),
+    (3, 6, time(9, 30), time(10, 10, 30), date(2024, 4, 1), date(2024, 4, 30)),
+]
+
+FIRST_DAY = date(2024, 1, 1)
+LAST_DAY = date(2024, 6, 30)
+
+
+def make_appointments(seed: int = 7):
+    rng = random.Random(seed)
+    appointments = []
+    for _ in range(3000):
+        appointment_date = FIRST_DAY + timedelta(days=rng.randrange((LAST_DAY - FIRST_DAY).days + 1))
+        # Provider 4 has no appointments at all
+        provider = rng.randrange(4)
+        status = rng.choice(STATUS_CODES)
+        minutes = rng.choice((15, 30, 45, 60))
+        appointments.append((provider, appointment_date, status, minutes))
+    # Provider 3 only ever cancels in March
+    appointments = [
+        a for a in appointments
+        if not (a[0] == 3 and a[1].month == 3 and a[2] != "cancelled")
+    ]
+    appointments.sort(key=lambda a: a[1])
+    return appointments
+
+
+def extract_rows(appointments, schedules) -> dict:
+    return {
+        "appointments": np.array(
+            [
+                (provider, to_day(day), STATUS_CODES.index(status), minutes)
+                for provider, day, status, minutes in appointments
+            ],
+            dtype=np.int64
+        ).reshape(-1, 4),
+        "schedules": np.array(
+            [
+                (
+                    provider,
+                    dow,
+                    to_seconds(start),
+                    to_seconds(end),
+                    to_day(effective_from),
+                    to_day(effective_until) if effective_until else OPEN_ENDED,
+                )
+                for provider, dow, start, end, effective_from, effective_until in schedules
+            ],
+            dtype=np.int64
+        ).reshape(-1, 6),
+    }
+
+
+def build_snapshot(appointments, schedules) -> AnalyticsSnapshot:
+    extracts = extract_rows(appointments, schedules)
+    columns = {
+        name: np.ascontiguousarray(extracts[extract][:, index], dtype=dtype)
+        for name, (extract, index, dtype) in COLUMNS.items()
+    }
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "created_at": "2024-07-01T00:00:00+00:00",
+        "status_codes": list(STATUS_CODES),
+        "rows": {"appointments": len(appointments), "schedules": len(schedules)},
+        "providers": PROVIDERS,
+    }
+    return AnalyticsSnapshot("snapshot-test", manifest, columns)
+
+
+def percentage(numerator, denominator):
+    if not denominator:
+        return None
+    return round(numerator / denominator * 100, 2)
+
+
+def expected_utilization(appointments, schedules, start_date, end_date):
+    scheduled = defaultdict(int)
+    day = start_date
+    while day <= end_date:
+        blocks = defaultdict(list)
+        for provider, dow, start, end, effective_from, effective_until in schedules:
+            if (
+                dow == sql_day_of_week(day)
+                and effective_from <= day
+                and (effective_until is None or day <= effective_until)
+            ):
+                blocks[provider].append((to_seconds(start), to_seconds(end)))
+        for provider, intervals in blocks.items():
+            scheduled[provider] += sum(
+                (end - start) // 60 for start, end in merge_intervals(intervals)
+            )
+        day += timedelta(days=1)
+
+    counts = defaultdict(lambda: defaultdict(int))
+    for provider, day, status, minutes in appointments:
+        if start_date <= day <= end_date:
+            counts[provider]["total"] += 1
+            counts[provider][status] += 1
+            if status not in ("cancelled", "no_show"):
+                counts[provider]["booked"] += minutes
+
+    rows = []
+    for i, info in enumerate(PROVIDERS):
+        if not info["is_active"]:
+            continue
+        c = counts[i]
+        rows.append({
+            "provider_id": info["provider_id"],
+            "provider_name": info["provider_name"],
+            "specialty": info["specialty"],
+            "scheduled_minutes": scheduled[i],
+            "booked_minutes": c["booked"],
+            "utilization_rate": percentage(c["booked"], scheduled[i]),
+            "total_appointments": c["total"],
+            "completed_appointments": c["completed"],
+            "no_shows": c["no_show"],
+            "cancellations": c["cancelled"],
+            "completion_rate": percentage(c["completed"], c["total"]),
+        })
+    rows.sort(key=lambda row: (
+        row["utilization_rate"] is None,
+        -(row["utilization_rate"] or 0),
+        row["provider_name"]
+    ))
+    return rows
+
+
+def expected_daily_load(appointments, start_date, end_date):
+    days = defaultdict(lambda: {"statuses": defaultdict(int), "providers": set()})
+    for provider, day, status, _ in appointments:
+        if start_date <= day <= end_date:
+            days[day]["statuses"][status] += 1
+            days[day]["providers"].add(provider)
+    return [
+        {
+            "appointment_date": day,
+            "total_appointments": sum(days[day]["statuses"].values()),
+            "active_providers": len(days[day]["providers"]),
+            "upcoming": days[day]["statuses"]["scheduled"] + days[day]["statuses"]["confirmed"],
+            "completed": days[day]["statuses"]["completed"],
+            "cancelled": days[day]["statuses"]["cancelled"],
+            "no_shows": days[day]["statuses"]["no_show"],
+        }
+        for day in sorted(days, reverse=True)
+    ]
+
+
+def expected_no_show_analysis(appointments, today):
+    try:
+        year_ago = today.replace(year=today.year - 1)
+    except ValueError:
+        year_ago = today.replace(year=today.year - 1, day=28)
+    months = defaultdict(lambda: defaultdict(int))
+    for _, day, status, _ in appointments:
+        if year_ago <= day <= today:
+            months[day.replace(day=1)][status] += 1
+    return [
+        {
+            "month": month,
+            "total_appointments": sum(months[month].values()),
+            "no_shows": months[month]["no_show"],
+            "no_show_rate": percentage(
+                months[month]["no_show"], months[month]["completed"] + months[month]["no_show"]
+            ),
+        }
+        for month in sorted(months, reverse=True)
+    ]
+
+
+@pytest.fixture(scope="module")
+def appointments():
+    return make_appointments()
+
+
+@pytest.fixture(scope="module")
+def snapshot(appointments):
+    return build_snapshot(appointments, SCHEDULES)
+
+
+@pytest.mark.parametrize("start_date, end_date", [
+    (date(2024, 1, 1), date(2024, 6, 30)),
+    (date(2024, 2, 10), date(2024, 2, 20)),
+    (date(2024, 3, 1), date(2024, 3, 31)),
+    (date(2024, 3, 31), date(2024, 4, 1)),
+    (date(2023, 12, 1), date(2023, 12, 31)),
+    (date(2024, 5, 15), date(2024, 5, 15)),
+])
+def test_provider_utilization(snapshot, appointments, start_date, end_date):
+    assert snapshot.provider_utilization(start_date, end_date) == \
+        expected_utilization(appointments, SCHEDULES, start_date, end_date)
+
+
+def test_utilization_rates_of_provider_without_appointments(snapshot):
+    rows = {
+        row["provider_id"]: row
+        for row in snapshot.provider_utilization(date(2024, 3, 1), date(2024, 3, 31))
+    }
+    # p3 only cancelled in March: rates are 0, as in UTILIZATION_SQL
+    # p4 has no schedule and no appointments: rates are undefined
+    assert rows["p3"]["utilization_rate"] == 0.0
+    assert rows["p3"]["completion_rate"] == 0.0
+    assert rows["p4"]["utilization_rate"] is None
+    assert rows["p4"]["completion_rate"] is None
+    assert "p2" not in rows
+
+
+@pytest.mark.parametrize("start_date, end_date", [
+    (date(2024, 1, 1), date(2024, 6, 30)),
+    (date(2024, 2, 28), date(2024, 3, 2)),
+    (date(2024, 7, 1), date(2024, 7, 31)),
+    (date(2024, 3, 2), date(2024, 3, 1)),
+])
+def test_daily_load(snapshot, appointments, start_date, end_date):
+    assert snapshot.daily_load(start_date, end_date) == \
+        expected_daily_load(appointments, start_date, end_date)
+
+
+@pytest.mark.parametrize("today", [
+    date(2024, 6, 30), date(2024, 3, 15), date(2025, 2, 1), date(2025, 2, 28), date(2026, 1, 1)
+])
+def test_no_show_analysis(snapshot, appointments, today):
+    assert snapshot.no_show_analysis(today) == expected_no_show_analysis(appointments, today)
+
+
+def test_empty_snapshot():
+    snapshot = build_snapshot([], [])
+    assert snapshot.daily_load(FIRST_DAY, LAST_DAY) == []
+    assert snapshot.no_show_analysis(LAST_DAY) == []
+    rows = snapshot.provider_utilization(FIRST_DAY, LAST_DAY)
+    assert [row["scheduled_minutes"] for row in rows] == [0, 0, 0, 0]
+
+
+def write_copy(path, rows, width):
+    """Write rows of INTEGERs in PostgreSQL's binary COPY format."""
+    with open(path, "wb") as f:
+        f.write(COPY_SIGNATURE + struct.pack(">ii", 0, 0))
+        for row in rows:
+            f.write(struct.pack(">h", width))
+            for value in row:
+                f.write(struct.pack(">ii", 4, int(value)))
+        f.write(struct.pack(">h", -1))
+
+
+def test_read_copy(tmp_path):
+    path = str(tmp_path / "rows.copy")
+    write_copy(path, [(1, -2, 3), (4, 5, 2**31 - 1)], 3)
+    records = read_copy(path, 3)
+    assert records["v0"].tolist() == [1, 4]
+    assert records["v1"].tolist() == [-2, 5]
+    assert records["v2"].tolist() == [3, 2**31 - 1]
+
+
+def test_read_copy_empty(tmp_path):
+    path = str(tmp_path / "rows.copy")
+    write_copy(path, [], 4)
+    assert len(read_copy(path, 4)) == 0
+
+
+def test_read_copy_rejects_nulls(tmp_path):
+    path = str(tmp_path / "rows.copy")
+    with open(path, "wb") as f:
+        f.write(COPY_SIGNATURE + struct.pack(">ii", 0, 0))
+        # A NULL has length -1 and no value, so the row is shorter
+        f.write(struct.pack(">hiii", 2, 4, 1, -1) + struct.pack(">hiiii", 2, 4, 2, 4, 3))
+        f.write(struct.pack(">h", -1))
+    with pytest.raises(ValueError):
+        read_copy(path, 2)
+
+
+def test_write_publishes_loadable_snapshot(tmp_path, appointments):
+    snapshotter = AnalyticsSnapshotter(str(tmp_path), 600)
+    staging = tmp_path / ".staging"
+    staging.mkdir()
+    extracts = extract_rows(appointments, SCHEDULES)
+    write_copy(str(staging / "appointments.copy"), extracts["appointments"], 4)
+    write_copy(str(staging / "schedules.copy"), extracts["schedules"], 6)
+
+    name = snapshotter._write(str(staging), PROVIDERS)
+
+    assert not staging.exists()
+    assert sorted(os.listdir(tmp_path / name)) == sorted(
+        [f"{column}.npy" for column in COLUMNS] + ["manifest.json"]
+    )
+    snapshot = snapshotter.current()
+    assert snapshot.name == name
+    assert snapshot.manifest["rows"] == {"appointments": len(appointments), "schedules": len(SCHEDULES)}
+    assert snapshot.provider_utilization(FIRST_DAY, LAST_DAY) == \
+        expected_utilization(appointments, SCHEDULES, FIRST_DAY, LAST_DAY)
+    assert snapshot.daily_load(FIRST_DAY, LAST_DAY) == \
+        expected_daily_load(appointments, FIRST_DAY, LAST_DAY)
+
+
+def test_overlapping_schedule_rows_are_counted_once(snapshot):
+    # February 2024 has four Mondays and four Wednesdays; the three Monday
+    # rows merge into 09:00-17:00, the same hours as Wednesday
+    rows = {
+        row["provider_id"]: row
+        for row in snapshot.provider_utilization(date(2024, 2, 1), date(2024, 2, 29))
+    }
+    assert rows["p0"]["scheduled_minutes"] == 8 * 8 * 60
+
+
+def test_unsupported_snapshot_format_is_unavailable(tmp_path, appointments):
+    snapshotter = AnalyticsSnapshotter(str(tmp_path), 600)
+    staging = tmp_path / ".staging"
+    staging.mkdir()
+    extracts = extract_rows(appointments, SCHEDULES)
+    write_copy(str(staging / "appointments.copy"), extracts["appointments"], 4)
+    write_copy(str(staging / "schedules.copy"), extracts["schedules"], 6)
+    name = snapshotter._write(str(staging), PROVIDERS)
+
+    manifest_path = tmp_path / name / "manifest.json"
+    manifest_path.write_text(manifest_path.read_text().replace(
+        f'"format": {SNAPSHOT_FORMAT}', '"format": 1'
+    ))
+    with pytest.raises(SnapshotUnavailableError):
+        snapshotter.current()
@@ -0,0 +1,247 @@
+from datetime import date, time, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.core import appointment_service
+from app.core.appointment_service import AppointmentService
+from app.core.availability import ProviderDayIndex
+from app.core.slot_holds import InMemorySlotHoldStore
+from app.schemas.booking import BulkItemStatus
+from app.utils.exceptions import SeriesConflictError
+
+PROVIDER = uuid4()
+ALICE = uuid4()
+BOB = uuid4()
+DAY = date.today() + timedelta(days=7)
+
+
+def t(value: str) -> time:
+    return time.fromisoformat(value)
+
+
+def item(start: str, end: str, patient_id=ALICE, day=DAY):
+    return SimpleNamespace(
+        patient_id=patient_id,
+        provider_id=PROVIDER,
+        appointment_date=day,
+        start_time=t(start),
+        end_time=t(end)
+    )
+
+
+class FakeSession:
+    """Answers the patient lookup; records commits."""
+
+    def __init__(self, patients=(ALICE, BOB), fail_commit=False):
+        self.patients = list(patients)
+        self.fail_commit = fail_commit
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, statement, params=None):
+        return SimpleNamespace(scalars=lambda: iter(self.patients))
+
+    async def commit(self):
+        if self.fail_commit:
+            raise RuntimeError("commit failed")
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def booking(monkeypatch):
+    """Stubs the day indexes, the INSERT and the hold store."""
+    state = SimpleNamespace(
+        indexes={(PROVIDER, DAY): ProviderDayIndex(
+            blocks=[(t("09:00"), t("12:00"))],
+            busy=[(t("11:00"), t("11:30"))]
+        )},
+        inserted=[],
+        lost=set(),
+        holds=InMemorySlotHoldStore()
+    )
+
+    async def load_day_indexes(db, provider_ids, start_date, end_date):
+        return state.indexes
+
+    async def insert_appointment_rows(db, items):
+        state.inserted.extend(items)
+        return {
+            (i.provider_id, i.appointment_date, i.start_time): uuid4()
+            for i in items
+            if i.start_time not in state.lost
+        }
+
+    monkeypatch.setattr(AppointmentService, "load_day_indexes", staticmethod(load_day_indexes))
+    monkeypatch.setattr(AppointmentService, "insert_appointment_rows", staticmethod(insert_appointment_rows))
+    monkeypatch.setattr(appointment_service, "slot_holds", state.holds)
+    return state
+
+
+async def test_bulk_catches_overlaps_within_the_batch(booking):
+    items = [item("09:00", "09:30"), item("09:15", "09:45", BOB), item("09:30", "10:00", BOB)]
+
+    results = await AppointmentService.book_appointments_bulk(FakeSession(), items)
+
+    assert [r["status"] for r in results] == [
+        BulkItemStatus.BOOKED, BulkItemStatus.CONFLICT, BulkItemStatus.BOOKED
+    ]
+    assert results[1]["error"] == "Time slot is already booked"
+    assert booking.inserted == [items[0], items[2]]
+
+
+async def test_bulk_maps_results_by_index(booking):
+    booking.lost = {t("10:30")}
+    items = [
+        item("09:00", "09:30"),
+        item("09:00", "09:05"),
+        item("10:00", "10:30", uuid4()),
+        item("12:00", "12:30"),
+        item("11:15", "11:45"),
+        item("10:30", "11:00"),
+        item("10:00", "10:30", BOB),
+    ]
+
+    results = await AppointmentService.book_appointments_bulk(FakeSession(), items)
+
+    assert [r["index"] for r in results] == list(range(len(items)))
+    assert [r["status"] for r in results] == [
+        BulkItemStatus.BOOKED,
+        BulkItemStatus.INVALID,
+        BulkItemStatus.INVALID,
+        BulkItemStatus.UNAVAILABLE,
+        BulkItemStatus.CONFLICT,
+        BulkItemStatus.CONFLICT,
+        BulkItemStatus.BOOKED,
+    ]
+    assert results[2]["error"] == "Patient not found"
+    assert results[5]["error"] == "Time slot was just booked by another user"
+    booked = [r for r in results if r["status"] == BulkItemStatus.BOOKED]
+    assert all("appointment_id" in r for r in booked)
+    assert results[0]["appointment_id"] != results[6]["appointment_id"]
+    assert not any("appointment_id" in r for r in results if r["status"] != BulkItemStatus.BOOKED)
+
+
+async def test_bulk_rejects_slots_held_by_another_patient(booking):
+    await booking.holds.acquire(None, PROVIDER, BOB, DAY, t("09:00"), t("09:30"), 300)
+
+    results = await AppointmentService.book_appointments_bulk(FakeSession(), [item("09:15", "09:45")])
+
+    assert results[0]["status"] == BulkItemStatus.CONFLICT
+    assert results[0]["error"] == "Time slot is held by another patient"
+
+
+async def test_bulk_releases_holds_of_booked_items_after_commit(booking):
+    booked = await booking.holds.acquire(None, PROVIDER, ALICE, DAY, t("09:00"), t("09:30"), 300)
+    lost = await booking.holds.acquire(None, PROVIDER, ALICE, DAY, t("10:30"), t("11:00"), 300)
+    booking.lost = {t("10:30")}
+    db = FakeSession()
+
+    await AppointmentService.book_appointments_bulk(
+        db, [item("09:00", "09:30"), item("10:30", "11:00")]
+    )
+
+    remaining = {h["hold_id"] for h in await booking.holds.list_active(None, [PROVIDER], DAY, DAY)}
+    assert db.commits == 1
+    assert booked["hold_id"] not in remaining
+    assert lost["hold_id"] in remaining
+
+
+async def test_bulk_keeps_holds_when_the_commit_fails(booking):
+    hold = await booking.holds.acquire(None, PROVIDER, ALICE, DAY, t("09:00"), t("09:30"), 300)
+
+    with pytest.raises(RuntimeError):
+        await AppointmentService.book_appointments_bulk(
+            FakeSession(fail_commit=True), [item("09:00", "09:30")]
+        )
+
+    active = await booking.holds.list_active(None, [PROVIDER], DAY, DAY)
+    assert [h["hold_id"] for h in active] == [hold["hold_id"]]
+
+
+class SeriesItem(SimpleNamespace):
+    def model_copy(self, update):
+        return SeriesItem(**{**vars(self), **update})
+
+
+def weekly(occurrences: int):
+    return SimpleNamespace(frequency=SimpleNamespace(value="weekly"), occurrences=occurrences)
+
+
+def series_start(start: str, end: str, day=DAY):
+    return SeriesItem(**vars(item(start, end, day=day)))
+
+
+def week(n: int) -> date:
+    return DAY + timedelta(weeks=n)
+
+
+def open_weeks(booking, weeks):
+    booking.indexes = {
+        (PROVIDER, week(n)): ProviderDayIndex(blocks=[(t("09:00"), t("12:00"))])
+        for n in weeks
+    }
+
+
+async def test_series_lists_every_failing_date_and_inserts_nothing(booking):
+    open_weeks(booking, [0, 2, 3])
+    booking.indexes[(PROVIDER, week(2))].add_busy(t("09:15"), t("09:45"))
+    await booking.holds.acquire(None, PROVIDER, BOB, week(3), t("09:00"), t("09:30"), 300)
+    db = FakeSession()
+
+    with pytest.raises(SeriesConflictError) as excinfo:
+        await AppointmentService.book_appointment_series(db, series_start("09:00", "09:30"), weekly(4))
+
+    assert excinfo.value.conflicts == [
+        {"appointment_date": week(1), "reason": "Provider is not available at the requested time"},
+        {"appointment_date": week(2), "reason": "Time slot is already booked"},
+        {"appointment_date": week(3), "reason": "Time slot is held by another patient"},
+    ]
+    assert booking.inserted == []
+    assert db.commits == 0
+
+
+async def test_series_reports_every_date_outside_the_booking_window(booking):
+    start = date.today() + timedelta(days=77)
+    db = FakeSession()
+
+    with pytest.raises(SeriesConflictError) as excinfo:
+        await AppointmentService.book_appointment_series(
+            db, series_start("09:00", "09:30", day=start), weekly(4)
+        )
+
+    assert [c["appointment_date"] for c in excinfo.value.conflicts] == [
+        start + timedelta(weeks=2), start + timedelta(weeks=3)
+    ]
+    assert booking.inserted == []
+
+
+async def test_series_rolls_back_when_an_occurrence_loses_a_race(booking):
+    open_weeks(booking, range(3))
+    booking.lost = {t("09:00")}
+    db = FakeSession()
+
+    with pytest.raises(SeriesConflictError) as excinfo:
+        await AppointmentService.book_appointment_series(db, series_start("09:00", "09:30"), weekly(3))
+
+    assert [c["appointment_date"] for c in excinfo.value.conflicts] == [week(0), week(1), week(2)]
+    assert db.rollbacks == 1 and db.commits == 0
+
+
+async def test_series_books_every_occurrence_and_releases_own_holds(booking):
+    open_weeks(booking, range(3))
+    await booking.holds.acquire(None, PROVIDER, ALICE, week(1), t("09:00"), t("09:30"), 300)
+    db = FakeSession()
+
+    booked = await AppointmentService.book_appointment_series(
+        db, series_start("09:00", "09:30"), weekly(3)
+    )
+
+    assert [b["appointment_date"] for b in booked] == [week(0), week(1), week(2)]
+    assert len({b["appointment_id"] for b in booked}) == 3
+    assert db.commits == 1
+    assert await booking.holds.list_active(None, [PROVIDER], week(0), week(2)) == []
@@ -0,0 +1,159 @@
+from datetime import date, time
+
+from app.core.availability import ProviderDayIndex, merge_intervals, sql_day_of_week
+
+
+def t(value: str) -> time:
+    return time.fromisoformat(value)
+
+
+def test_merge_intervals_joins_overlapping_and_touching():
+    assert merge_intervals([(30, 40), (0, 10), (10, 20), (15, 25)]) == [(0, 25), (30, 40)]
+
+
+def test_merge_intervals_keeps_nested_interval_inside_outer():
+    assert merge_intervals([(0, 100), (10, 20)]) == [(0, 100)]
+
+
+def test_merge_intervals_empty():
+    assert merge_intervals([]) == []
+
+
+def test_sql_day_of_week_starts_on_sunday():
+    assert sql_day_of_week(date(2024, 1, 7)) == 0  # Sunday
+    assert sql_day_of_week(date(2024, 1, 13)) == 6  # Saturday
+
+
+def test_covers_spans_touching_blocks():
+    index = ProviderDayIndex(blocks=[(t("09:00"), t("12:00")), (t("12:00"), t("17:00"))])
+    assert index.covers(t("11:30"), t("12:30"))
+
+
+def test_covers_rejects_span_across_gap():
+    index = ProviderDayIndex(blocks=[(t("09:00"), t("12:00")), (t("13:00"), t("17:00"))])
+    assert not index.covers(t("11:30"), t("13:30"))
+    assert not index.covers(t("12:15"), t("12:45"))
+
+
+def test_covers_block_edges():
+    index = ProviderDayIndex(blocks=[(t("09:00"), t("12:00"))])
+    assert index.covers(t("09:00"), t("12:00"))
+    assert not index.covers(t("08:45"), t("09:15"))
+    assert not index.covers(t("11:45"), t("12:15"))
+
+
+def test_covers_overlapping_blocks():
+    index = ProviderDayIndex(blocks=[(t("09:00"), t("12:00")), (t("11:00"), t("14:00"))])
+    assert index.blocks == [(9 * 3600, 14 * 3600)]
+    assert index.covers(t("10:00"), t("13:00"))
+
+
+def test_overlaps_busy_ignores_back_to_back_bookings():
+    index = ProviderDayIndex(busy=[(t("10:00"), t("10:30"))])
+    assert not index.overlaps_busy(t("09:30"), t("10:00"))
+    assert not index.overlaps_busy(t("10:30"), t("11:00"))
+    assert index.overlaps_busy(t("10:15"), t("10:45"))
+    assert index.overlaps_busy(t("09:45"), t("10:15"))
+
+
+def test_overlaps_busy_checks_following_booking():
+    index = ProviderDayIndex(busy=[(t("09:00"), t("09:30")), (t("11:00"), t("11:30"))])
+    assert index.overlaps_busy(t("10:00"), t("12:00"))
+    assert not index.overlaps_busy(t("09:30"), t("11:00"))
+
+
+def test_add_busy_merges_with_existing():
+    index = ProviderDayIndex(busy=[(t("09:00"), t("09:30"))])
+    index.add_busy(t("09:30"), t("10:00"))
+    assert index.busy == [(9 * 3600, 10 * 3600)]
+    assert index.overlaps_busy(t("09:45"), t("10:15"))
+
+
+def test_is_free_needs_coverage_and_no_booking():
+    index = ProviderDayIndex(
+        blocks=[(t("09:00"), t("12:00"))],
+        busy=[(t("10:00"), t("10:30"))]
+    )
+    assert index.is_free(t("09:00"), t("09:30"))
+    assert not index.is_free(t("10:00"), t("10:30"))
+    assert not index.is_free(t("11:45"), t("12:15"))
+
+
+def test_free_slots_are_laid_out_from_block_start():
+    index = ProviderDayIndex(blocks=[(t("09:10"), t("10:30"))])
+    assert index.free_slots(30) == [
+        (t("09:10"), t("09:40")),
+        (t("09:40"), t("10:10")),
+    ]
+
+
+def test_free_slots_jump_to_grid_after_off_grid_booking():
+    index = ProviderDayIndex(
+        blocks=[(t("09:00"), t("11:00"))],
+        busy=[(t("09:10"), t("09:40"))]
+    )
+    # 09:00 and 09:30 overlap the booking; the next grid point is 10:00
+    assert index.free_slots(30) == [
+        (t("10:00"), t("10:30")),
+        (t("10:30"), t("11:00")),
+    ]
+
+
+def test_free_slots_cover_merged_touching_blocks():
+    index = ProviderDayIndex(blocks=[(t("09:00"), t("09:45")), (t("09:45"), t("10:30"))])
+    assert index.free_slots(30) == [
+        (t("09:00"), t("09:30")),
+        (t("09:30"), t("10:00")),
+        (t("10:00"), t("10:30")),
+    ]
+
+
+def test_free_slots_at_end_of_day():
+    index = ProviderDayIndex(blocks=[(t("23:00"), t("23:59"))])
+    assert index.free_slots(15) == [
+        (t("23:00"), t("23:15")),
+        (t("23:15"), t("23:30")),
+        (t("23:30"), t("23:45")),
+    ]
+
+
+def test_free_slots_per_block_with_split_shift():
+    index = ProviderDayIndex(
+        blocks=[(t("09:00"), t("10:00")), (t("13:00"), t("14:00"))],
+        busy=[(t("09:00"), t("09:30")), (t("13:30"), t("14:00"))]
+    )
+    assert index.free_slots(30) == [
+        (t("09:30"), t("10:00")),
+        (t("13:00"), t("13:30")),
+    ]
+
+
+def test_free_gaps_split_by_bookings():
+    index = ProviderDayIndex(
+        blocks=[(t("09:00"), t("12:00"))],
+        busy=[(t("09:00"), t("09:30")), (t("10:00"), t("10:15"))]
+    )
+    assert index.free_gaps() == [
+        (t("09:30"), t("10:00")),
+        (t("10:15"), t("12:00")),
+    ]
+
+
+def test_free_gaps_booking_running_past_block_end():
+    index = ProviderDayIndex(
+        blocks=[(t("09:00"), t("10:00")), (t("11:00"), t("12:00"))],
+        busy=[(t("09:30"), t("11:15"))]
+    )
+    assert index.free_gaps() == [
+        (t("09:00"), t("09:30")),
+        (t("11:15"), t("12:00")),
+    ]
+
+
+def test_free_gaps_fully_booked_and_empty_day():
+    booked = ProviderDayIndex(
+        blocks=[(t("09:00"), t("10:00"))],
+        busy=[(t("08:00"), t("11:00"))]
+    )
+    assert booked.free_gaps() == []
+    assert ProviderDayIndex().free_gaps() == []
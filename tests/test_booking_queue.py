@@ -0,0 +1,131 @@
+import asyncio
+from datetime import date
+from uuid import uuid4
+
+import pytest
+
+from app.core.booking_queue import ADVISORY_LOCK_SQL, BookingSerializer
+
+PROVIDER = uuid4()
+DAY = date(2024, 1, 8)
+
+
+class RecordingSession:
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+
+
+async def book(serializer, key, log, hold=0.01):
+    async with serializer.serialize(None, *key):
+        log.append(("enter", key))
+        await asyncio.sleep(hold)
+        log.append(("exit", key))
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        BookingSerializer("queue")
+
+
+async def test_off_mode_does_not_lock():
+    serializer = BookingSerializer("off")
+    log = []
+    await asyncio.gather(*(book(serializer, (PROVIDER, DAY), log) for _ in range(3)))
+
+    assert [event for event, _ in log[:3]] == ["enter"] * 3
+    assert serializer.stats()["serialized_bookings"] == 0
+    assert serializer._locks == {} and serializer._waiters == {}
+
+
+async def test_local_mode_runs_same_key_one_at_a_time():
+    serializer = BookingSerializer("local")
+    log = []
+    await asyncio.gather(*(book(serializer, (PROVIDER, DAY), log) for _ in range(3)))
+
+    assert [event for event, _ in log] == ["enter", "exit"] * 3
+    stats = serializer.stats()
+    assert stats["serialized_bookings"] == 3
+    assert stats["contended_bookings"] == 2
+
+
+async def test_local_mode_runs_different_keys_concurrently():
+    serializer = BookingSerializer("local")
+    log = []
+    keys = [(PROVIDER, DAY), (PROVIDER, date(2024, 1, 9)), (uuid4(), DAY)]
+    await asyncio.gather(*(book(serializer, key, log) for key in keys))
+
+    assert [event for event, _ in log[:3]] == ["enter"] * 3
+    assert serializer.stats()["contended_bookings"] == 0
+
+
+async def test_waiters_are_counted_per_key_and_cleaned_up():
+    serializer = BookingSerializer("local")
+    key = (PROVIDER, DAY)
+    other = (PROVIDER, date(2024, 1, 9))
+    release = asyncio.Event()
+
+    async def holder(key):
+        async with serializer.serialize(None, *key):
+            await release.wait()
+
+    tasks = [asyncio.create_task(holder(key)) for _ in range(3)]
+    tasks.append(asyncio.create_task(holder(other)))
+    await asyncio.sleep(0)
+
+    assert serializer._waiters == {key: 3, other: 1}
+    assert serializer.stats()["active_keys"] == 2
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert serializer._locks == {} and serializer._waiters == {}
+    assert serializer.stats()["active_keys"] == 0
+
+
+async def test_key_is_cleaned_up_when_the_block_raises():
+    serializer = BookingSerializer("local")
+
+    with pytest.raises(RuntimeError):
+        async with serializer.serialize(None, PROVIDER, DAY):
+            raise RuntimeError("booking failed")
+
+    assert serializer._locks == {} and serializer._waiters == {}
+
+
+async def test_advisory_mode_takes_the_transaction_lock():
+    serializer = BookingSerializer("advisory")
+    db = RecordingSession()
+
+    async with serializer.serialize(db, PROVIDER, DAY):
+        pass
+
+    assert db.executed == [
+        (ADVISORY_LOCK_SQL, {"provider_id": str(PROVIDER), "day": DAY.toordinal()})
+    ]
+
+
+async def test_local_mode_skips_the_advisory_lock():
+    serializer = BookingSerializer("local")
+    db = RecordingSession()
+
+    async with serializer.serialize(db, PROVIDER, DAY):
+        pass
+
+    assert db.executed == []
+
+
+async def test_switching_mode_takes_effect_on_the_next_booking():
+    serializer = BookingSerializer("off")
+    log = []
+    serializer.mode = "local"
+    await asyncio.gather(*(book(serializer, (PROVIDER, DAY), log) for _ in range(2)))
+
+    assert [event for event, _ in log] == ["enter", "exit"] * 2
+
+    serializer.mode = "off"
+    serializer.reset_stats()
+    await book(serializer, (PROVIDER, DAY), log)
+    assert serializer.stats()["serialized_bookings"] == 0
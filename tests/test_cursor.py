@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import date, time
+from uuid import UUID
+
+import pytest
+
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.exceptions import ValidationError
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_round_trip():
+    appointment_id = UUID("12345678-1234-5678-1234-567812345678")
+    cursor = encode_cursor(date(2024, 3, 1), time(9, 30), appointment_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 3) == ["2024-03-01", "09:30:00", str(appointment_id)]
+
+
+def test_encode_rejects_unsupported_values():
+    with pytest.raises(TypeError):
+        encode_cursor(object())
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", "%%%", raw_cursor("x")[:-1] + "$"])
+def test_decode_rejects_garbage(cursor):
+    with pytest.raises(ValidationError):
+        decode_cursor(cursor, 1)
+
+
+def test_decode_rejects_wrong_size():
+    with pytest.raises(ValidationError):
+        decode_cursor(encode_cursor(date(2024, 3, 1)), 2)
+
+
+@pytest.mark.parametrize("payload", [
+    {"a": "2024-03-01"},
+    "2024-03-01",
+    [1, "09:30:00"],
+    [None, "09:30:00"],
+    [["2024-03-01"], "09:30:00"],
+])
+def test_decode_rejects_non_string_values(payload):
+    with pytest.raises(ValidationError):
+        decode_cursor(raw_cursor(payload), 2)
@@ -0,0 +1,31 @@
+import pytest
+
+from app.utils.exceptions import ValidationError
+from app.utils.fieldsets import parse_fields, select_fields
+
+
+def test_parse_fields_absent_means_every_field():
+    assert parse_fields(None) is None
+
+
+def test_parse_fields_strips_and_drops_duplicates_in_order():
+    assert parse_fields(" last_name,first_name , last_name,,") == ["last_name", "first_name"]
+
+
+@pytest.mark.parametrize("fields", ["", " ", ",,"])
+def test_parse_fields_rejects_empty(fields):
+    with pytest.raises(ValidationError):
+        parse_fields(fields)
+
+
+def test_select_fields_in_requested_order():
+    columns = {"patient_id": "c1", "first_name": "c2", "last_name": "c3"}
+    assert select_fields(columns, ["last_name", "patient_id"]) == ["c3", "c1"]
+
+
+def test_select_fields_rejects_unknown_names():
+    columns = {"patient_id": "c1", "first_name": "c2"}
+    with pytest.raises(ValidationError) as exc_info:
+        select_fields(columns, ["first_name", "ssn", "password"])
+    assert "ssn, password" in exc_info.value.message
+    assert "patient_id, first_name" in exc_info.value.message
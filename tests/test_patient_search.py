@@ -0,0 +1,41 @@
+import pytest
+
+from app.core.patient_service import escape_like, normalize_phone
+
+
+@pytest.mark.parametrize("phone", [
+    "(202) 555-1001",
+    "202-555-1001",
+    "+1 202 555 1001",
+    "+12025551001",
+    "2025551001",
+])
+def test_normalize_phone_keeps_last_ten_digits(phone):
+    assert normalize_phone(phone) == "2025551001"
+
+
+def test_normalize_phone_partial_number():
+    assert normalize_phone("555-10") == "55510"
+    assert normalize_phone("no digits") == ""
+
+
+@pytest.mark.parametrize("term, digits", [
+    ("+1 202 555", "202555"),
+    ("+1202555", "202555"),
+    ("1-202-555", "202555"),
+    ("1 (202) 555", "202555"),
+    ("1001", "1001"),
+])
+def test_normalize_phone_drops_country_code_from_partial_number(term, digits):
+    assert normalize_phone(term) == digits
+
+
+@pytest.mark.parametrize("term, escaped", [
+    ("smith", "smith"),
+    ("100%", "100\\%"),
+    ("o_brien", "o\\_brien"),
+    ("back\\slash", "back\\\\slash"),
+    ("\\%_", "\\\\\\%\\_"),
+])
+def test_escape_like(term, escaped):
+    assert escape_like(term) == escaped
@@ -0,0 +1,89 @@
+from datetime import date, time
+from types import SimpleNamespace
+
+from app.core.schedule_cache import CompiledSchedule, minute_mask
+
+MONDAY = date(2024, 1, 8)
+
+
+def t(value: str) -> time:
+    return time.fromisoformat(value)
+
+
+def row(start: str, end: str, effective_from=date(2024, 1, 1), effective_until=None, day_of_week=1):
+    return SimpleNamespace(
+        day_of_week=day_of_week,
+        start_time=t(start),
+        end_time=t(end),
+        effective_from=effective_from,
+        effective_until=effective_until
+    )
+
+
+def test_minute_mask_is_half_open():
+    assert minute_mask(2, 5) == 0b11100
+    assert minute_mask(5, 5) == 0
+    assert minute_mask(6, 5) == 0
+
+
+def test_effective_range_is_inclusive_at_both_ends():
+    schedule = CompiledSchedule([
+        row("09:00", "17:00", effective_from=date(2024, 1, 8), effective_until=date(2024, 1, 22))
+    ])
+    assert schedule.covers(date(2024, 1, 8), t("09:00"), t("10:00"))
+    assert schedule.covers(date(2024, 1, 22), t("09:00"), t("10:00"))
+    assert not schedule.covers(date(2024, 1, 1), t("09:00"), t("10:00"))
+    assert not schedule.covers(date(2024, 1, 29), t("09:00"), t("10:00"))
+
+
+def test_open_ended_row_stays_effective():
+    schedule = CompiledSchedule([row("09:00", "17:00")])
+    assert schedule.covers(date(2030, 1, 7), t("16:00"), t("17:00"))
+
+
+def test_other_weekdays_are_not_covered():
+    schedule = CompiledSchedule([row("09:00", "17:00")])
+    assert not schedule.covers(date(2024, 1, 9), t("09:00"), t("10:00"))
+
+
+def test_mask_only_unions_rows_effective_on_the_day():
+    schedule = CompiledSchedule([
+        row("09:00", "12:00", effective_until=date(2024, 1, 14)),
+        row("13:00", "17:00", effective_from=date(2024, 1, 15))
+    ])
+    assert schedule.mask_for(MONDAY) == minute_mask(9 * 60, 12 * 60)
+    assert schedule.mask_for(date(2024, 1, 15)) == minute_mask(13 * 60, 17 * 60)
+
+
+def test_block_ending_off_the_minute_only_counts_whole_minutes():
+    schedule = CompiledSchedule([row("09:00", "12:00:30")])
+    assert schedule.covers(MONDAY, t("11:45"), t("12:00"))
+    assert not schedule.covers(MONDAY, t("11:45"), t("12:00:30"))
+
+
+def test_block_starting_off_the_minute_skips_its_first_partial_minute():
+    schedule = CompiledSchedule([row("09:00:30", "12:00")])
+    assert not schedule.covers(MONDAY, t("09:00"), t("09:30"))
+    assert schedule.covers(MONDAY, t("09:01"), t("09:30"))
+
+
+def test_overlapping_rows_cover_a_slot_spanning_both():
+    schedule = CompiledSchedule([row("09:00", "12:00"), row("11:00", "14:00")])
+    assert schedule.covers(MONDAY, t("10:00"), t("13:00"))
+    assert schedule.mask_for(MONDAY) == minute_mask(9 * 60, 14 * 60)
+
+
+def test_touching_rows_cover_a_slot_spanning_both():
+    schedule = CompiledSchedule([row("09:00", "12:00"), row("12:00", "17:00")])
+    assert schedule.covers(MONDAY, t("11:30"), t("12:30"))
+
+
+def test_gap_between_rows_is_not_covered():
+    schedule = CompiledSchedule([row("09:00", "10:00"), row("10:30", "11:00")])
+    assert not schedule.covers(MONDAY, t("09:30"), t("10:45"))
+    assert schedule.covers(MONDAY, t("10:30"), t("11:00"))
+
+
+def test_empty_request_is_not_covered():
+    schedule = CompiledSchedule([row("09:00", "17:00")])
+    assert not schedule.covers(MONDAY, t("10:00"), t("10:00"))
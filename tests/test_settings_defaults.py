@@ -0,0 +1,22 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import settings_defaults
+from app.utils.settings_defaults import SETTINGS_DEFAULTS, setting
+
+
+def test_declared_setting_wins(monkeypatch):
+    monkeypatch.setattr(settings_defaults, "settings", SimpleNamespace(SLOT_HOLD_BACKEND="postgres"))
+    assert setting("SLOT_HOLD_BACKEND") == "postgres"
+
+
+def test_missing_setting_falls_back_to_default(monkeypatch):
+    monkeypatch.setattr(settings_defaults, "settings", SimpleNamespace())
+    for name, default in SETTINGS_DEFAULTS.items():
+        assert setting(name) == default
+
+
+def test_unknown_setting_without_default():
+    with pytest.raises(KeyError):
+        setting("NOT_A_SETTING")
@@ -0,0 +1,94 @@
+from datetime import date, time
+from uuid import uuid4
+
+import pytest
+
+from app.core.slot_holds import InMemorySlotHoldStore, overlapping_hold
+from app.utils.exceptions import AppointmentConflictError
+
+PROVIDER = uuid4()
+ALICE = uuid4()
+BOB = uuid4()
+DAY = date(2024, 1, 8)
+
+
+def t(value: str) -> time:
+    return time.fromisoformat(value)
+
+
+async def hold(store, patient_id, start, end, ttl_seconds=300, day=DAY):
+    return await store.acquire(None, PROVIDER, patient_id, day, t(start), t(end), ttl_seconds)
+
+
+async def active(store):
+    return await store.list_active(None, [PROVIDER], DAY, DAY)
+
+
+def test_overlapping_hold_ignores_the_patients_own_holds():
+    holds = [{"patient_id": ALICE, "start_time": t("10:00"), "end_time": t("10:30")}]
+    assert overlapping_hold(holds, ALICE, t("10:15"), t("10:45")) is None
+    assert overlapping_hold(holds, BOB, t("10:15"), t("10:45")) is holds[0]
+
+
+def test_overlapping_hold_allows_touching_slots():
+    holds = [{"patient_id": ALICE, "start_time": t("10:00"), "end_time": t("10:30")}]
+    assert overlapping_hold(holds, BOB, t("10:30"), t("11:00")) is None
+    assert overlapping_hold(holds, BOB, t("09:30"), t("10:00")) is None
+
+
+async def test_overlapping_hold_by_another_patient_is_rejected():
+    store = InMemorySlotHoldStore()
+    await hold(store, ALICE, "10:00", "10:30")
+
+    with pytest.raises(AppointmentConflictError):
+        await hold(store, BOB, "10:15", "10:45")
+
+    await hold(store, BOB, "10:30", "11:00")
+    assert len(await active(store)) == 2
+
+
+async def test_patient_overlapping_their_own_hold_replaces_it():
+    store = InMemorySlotHoldStore()
+    first = await hold(store, ALICE, "10:00", "10:30")
+    second = await hold(store, ALICE, "10:15", "10:45")
+
+    assert [h["hold_id"] for h in await active(store)] == [second["hold_id"]]
+    assert not await store.release(None, first["hold_id"])
+
+
+async def test_expired_holds_are_dropped_lazily():
+    store = InMemorySlotHoldStore()
+    expired = await hold(store, ALICE, "10:00", "10:30", ttl_seconds=0)
+
+    assert await active(store) == []
+    assert store._holds == {} and store._keys == {}
+    assert not await store.release(None, expired["hold_id"])
+
+    await hold(store, BOB, "10:00", "10:30")
+
+
+async def test_list_active_filters_provider_and_dates():
+    store = InMemorySlotHoldStore()
+    await hold(store, ALICE, "10:00", "10:30")
+    await hold(store, ALICE, "10:00", "10:30", day=date(2024, 1, 9))
+
+    assert len(await store.list_active(None, [PROVIDER], DAY, date(2024, 1, 9))) == 2
+    assert len(await active(store)) == 1
+    assert await store.list_active(None, [uuid4()], DAY, DAY) == []
+
+
+async def test_release_matching_waits_for_release_after_commit():
+    store = InMemorySlotHoldStore()
+    booked = await hold(store, ALICE, "10:00", "10:30")
+    other_slot = await hold(store, ALICE, "11:00", "11:30")
+    other_patient = await hold(store, BOB, "10:30", "11:00")
+
+    matched = await store.release_matching(None, PROVIDER, ALICE, DAY, t("10:00"), t("10:30"))
+
+    assert matched == [booked["hold_id"]]
+    assert len(await active(store)) == 3
+
+    await store.release_after_commit(None, matched)
+
+    remaining = {h["hold_id"] for h in await active(store)}
+    assert remaining == {other_slot["hold_id"], other_patient["hold_id"]}
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from app.utils.tdigest import TDigest
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def test_empty_digest():
+    digest = TDigest()
+    assert digest.quantile(0.5) is None
+    assert len(digest) == 0
+
+
+def test_single_value():
+    digest = TDigest()
+    digest.add(42.0)
+    assert digest.quantile(0.01) == 42.0
+    assert digest.quantile(0.99) == 42.0
+
+
+def test_quantiles_stay_within_min_and_max():
+    digest = TDigest()
+    digest.update([5.0, 1.0, 9.0, 3.0])
+    assert digest.quantile(0.0) == 1.0
+    assert digest.quantile(1.0) == 9.0
+    assert 1.0 <= digest.quantile(0.5) <= 9.0
+
+
+def test_size_is_bounded_by_compression():
+    digest = TDigest(compression=100)
+    digest.update(random.Random(1).expovariate(0.1) for _ in range(50_000))
+    assert digest.count == 50_000
+    assert len(digest) <= 200
+
+
+@pytest.mark.parametrize("q", [0.5, 0.9, 0.99])
+def test_quantile_accuracy(q):
+    rng = random.Random(3)
+    values = [rng.lognormvariate(3, 1) for _ in range(20_000)]
+    digest = TDigest()
+    digest.update(values)
+    expected = exact_quantile(values, q)
+    assert digest.quantile(q) == pytest.approx(expected, rel=0.03)
+
+
+@pytest.mark.parametrize("q", [0.5, 0.9, 0.99])
+def test_merged_digests_match_one_digest_over_all_values(q):
+    rng = random.Random(4)
+    days = [[rng.gammavariate(2, 15) for _ in range(500)] for _ in range(30)]
+    merged = TDigest()
+    for values in days:
+        day = TDigest()
+        day.update(values)
+        merged.merge(TDigest.from_bytes(day.to_bytes()))
+
+    everything = [v for values in days for v in values]
+    assert merged.count == len(everything)
+    assert merged.min == min(everything)
+    assert merged.max == max(everything)
+    assert merged.quantile(q) == pytest.approx(exact_quantile(everything, q), rel=0.03)
+
+
+def test_merge_empty_digest_is_a_no_op():
+    digest = TDigest()
+    digest.update([1.0, 2.0, 3.0])
+    digest.merge(TDigest())
+    assert digest.count == 3
+    assert digest.quantile(0.5) == pytest.approx(2.0)
+
+
+def test_bytes_round_trip():
+    digest = TDigest()
+    digest.update(float(i) for i in range(1000))
+    restored = TDigest.from_bytes(digest.to_bytes())
+    assert restored.count == digest.count
+    assert (restored.min, restored.max) == (0.0, 999.0)
+    for q in (0.1, 0.5, 0.99):
+        assert restored.quantile(q) == digest.quantile(q)
@@ -0,0 +1,280 @@
+"""
+Per-provider, per-day quantile sketches of appointment timings.
+
+    python timing_sketches.py build      # provider/days written since the last build
+    python timing_sketches.py rebuild --start 2025-01-01 --end 2025-12-31
+
+Two metrics are sketched, in minutes:
+- lead_time: booking (created_at) to scheduled start, for every appointment
+  that was not cancelled
+- check_in_wait: the checked_in status change to the in_progress one, both
+  taken from audit_logs, for appointments that reached in_progress
+
+Scheduled starts are read in the database session's TimeZone.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import List, Optional
+from datetime import date, datetime, timedelta, timezone
+import argparse
+import asyncio
+import logging
+import time
+
+from app.utils.settings_defaults import setting
+from app.db.session import AsyncSessionLocal
+from app.core.analytics_cache import analytics_cache
+from app.core.analytics_refresh import RECORD_REFRESH_SQL
+from app.utils.tdigest import TDigest
+
+logger = logging.getLogger(__name__)
+
+TIMING_METRICS = ('lead_time', 'check_in_wait')
+
+# analytics_refresh_log row holding the incremental build watermark
+TIMING_SKETCHES_SOURCE = "appointment_timing_sketches"
+
+# Writes whose transaction started before the last build but committed
+# after it carry an older changed_at; look back this far to catch them
+BUILD_LOOKBACK = timedelta(minutes=5)
+
+# Days per transaction when rebuilding a range
+REBUILD_CHUNK_DAYS = 31
+
+SKETCH_COMPRESSION = 100
+
+# Provider/days with an appointment written since :since, before and after
+DIRTY_FROM_AUDIT = """
+    SELECT DISTINCT
+        (d->>'provider_id')::uuid AS provider_id,
+        (d->>'appointment_date')::date AS sketch_date
+    FROM audit_logs l
+    CROSS JOIN LATERAL (VALUES (l.new_data), (l.old_data)) AS v(d)
+    WHERE l.table_name = 'appointments'
+    AND l.changed_at > :since
+    AND d IS NOT NULL
+"""
+
+# Every provider/day in :start_date..:end_date with appointments or a sketch
+DIRTY_FROM_RANGE = """
+    SELECT provider_id, appointment_date AS sketch_date
+    FROM appointments
+    WHERE appointment_date BETWEEN :start_date AND :end_date
+    UNION
+    SELECT provider_id, sketch_date
+    FROM appointment_timing_sketches
+    WHERE sketch_date BETWEEN :start_date AND :end_date
+"""
+
+TIMING_SAMPLES_SQL = """
+    WITH dirty AS ({dirty})
+    SELECT
+        dirty.provider_id,
+        dirty.sketch_date,
+        array_agg(
+            EXTRACT(EPOCH FROM (a.appointment_date + a.start_time)::timestamptz - a.created_at)::float8 / 60
+        ) FILTER (WHERE a.status <> 'cancelled') AS lead_time,
+        array_agg(
+            EXTRACT(EPOCH FROM t.started_at - t.checked_in_at)::float8 / 60
+        ) FILTER (WHERE t.started_at >= t.checked_in_at) AS check_in_wait
+    FROM dirty
+    LEFT JOIN appointments a
+        ON a.provider_id = dirty.provider_id
+        AND a.appointment_date = dirty.sketch_date
+    LEFT JOIN LATERAL (
+        SELECT
+            MIN(l.changed_at) FILTER (WHERE l.new_data->>'status' = 'checked_in') AS checked_in_at,
+            MIN(l.changed_at) FILTER (WHERE l.new_data->>'status' = 'in_progress') AS started_at
+        FROM audit_logs l
+        WHERE l.table_name = 'appointments'
+        AND l.record_id = a.appointment_id
+        AND l.action = 'UPDATE'
+        AND l.old_data->>'status' IS DISTINCT FROM l.new_data->>'status'
+    ) t ON a.status IN ('in_progress', 'completed')
+    GROUP BY dirty.provider_id, dirty.sketch_date
+"""
+
+DELETE_SKETCHES_SQL = text("""
+    DELETE FROM appointment_timing_sketches s
+    USING (
+        SELECT
+            unnest(CAST(:provider_ids AS uuid[])) AS provider_id,
+            unnest(CAST(:sketch_dates AS date[])) AS sketch_date
+    ) AS d
+    WHERE s.provider_id = d.provider_id
+    AND s.sketch_date = d.sketch_date
+""")
+
+INSERT_SKETCH_SQL = text("""
+    INSERT INTO appointment_timing_sketches
+        (provider_id, sketch_date, metric, sample_count, digest)
+    VALUES (:provider_id, :sketch_date, :metric, :sample_count, :digest)
+""")
+
+
+class TimingSketchService:
+    """
+    Builds appointment_timing_sketches from appointments and audit_logs.
+
+    Each build recomputes whole provider/days, so running it twice over
+    the same days is harmless. Builds take a transaction-level advisory
+    lock; a worker that finds it taken skips its build.
+    """
+
+    @staticmethod
+    async def _write(db: AsyncSession, dirty_sql: str, params: dict) -> List[date]:
+        """Rebuild the sketches of every provider/day `dirty_sql` selects; returns their dates."""
+        result = await db.execute(text(TIMING_SAMPLES_SQL.format(dirty=dirty_sql)), params)
+        rows = result.mappings().all()
+        if not rows:
+            return []
+
+        await db.execute(DELETE_SKETCHES_SQL, {
+            "provider_ids": [row["provider_id"] for row in rows],
+            "sketch_dates": [row["sketch_date"] for row in rows]
+        })
+
+        sketches = []
+        for row in rows:
+            for metric in TIMING_METRICS:
+                if not row[metric]:
+                    continue
+                digest = TDigest(SKETCH_COMPRESSION)
+                digest.update(row[metric])
+                sketches.append({
+                    "provider_id": row["provider_id"],
+                    "sketch_date": row["sketch_date"],
+                    "metric": metric,
+                    "sample_count": len(row[metric]),
+                    "digest": digest.to_bytes()
+                })
+        if sketches:
+            await db.execute(INSERT_SKETCH_SQL, sketches)
+
+        return [row["sketch_date"] for row in rows]
+
+    @staticmethod
+    async def _try_lock(db: AsyncSession) -> bool:
+        return (await db.execute(
+            text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"),
+            {"key": TIMING_SKETCHES_SOURCE}
+        )).scalar()
+
+    @staticmethod
+    async def build(db: AsyncSession) -> Optional[int]:
+        """
+        Rebuild the provider/days written since the last build.
+
+        Returns the number of provider/days rebuilt, or None if another
+        worker holds the build lock.
+        """
+        started = time.perf_counter()
+        if not await TimingSketchService._try_lock(db):
+            await db.rollback()
+            return None
+
+        since = (await db.execute(
+            text("SELECT refreshed_at FROM analytics_refresh_log WHERE view_name = :source"),
+            {"source": TIMING_SKETCHES_SOURCE}
+        )).scalar()
+        if since is None:
+            since = datetime.now(timezone.utc)
+
+        written = await TimingSketchService._write(
+            db, DIRTY_FROM_AUDIT, {"since": since - BUILD_LOOKBACK}
+        )
+        # NOW() is the transaction start, so the next build picks up from here
+        await db.execute(RECORD_REFRESH_SQL, {
+            "view_name": TIMING_SKETCHES_SOURCE,
+            "duration_ms": round((time.perf_counter() - started) * 1000)
+        })
+        await db.commit()
+
+        if written:
+            analytics_cache.invalidate(min(written), max(written))
+        return len(written)
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, start_date: date, end_date: date) -> int:
+        """Rebuild every provider/day in start_date..end_date, one chunk per transaction."""
+        rebuilt = 0
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + timedelta(days=REBUILD_CHUNK_DAYS - 1), end_date)
+            if not await TimingSketchService._try_lock(db):
+                await db.rollback()
+                await asyncio.sleep(1)
+                continue
+
+            written = await TimingSketchService._write(
+                db, DIRTY_FROM_RANGE, {"start_date": chunk_start, "end_date": chunk_end}
+            )
+            await db.commit()
+            rebuilt += len(written)
+            chunk_start = chunk_end + timedelta(days=1)
+
+        analytics_cache.invalidate(start_date, end_date)
+        return rebuilt
+
+
+class TimingSketchBuilder:
+    """Runs TimingSketchService.build every TIMING_SKETCH_SECONDS."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.builds = 0
+        self.skipped = 0
+        self.failures = 0
+        self.provider_days_rebuilt = 0
+        self.last_build: Optional[datetime] = None
+
+    def stats(self) -> dict:
+        return {
+            "builds": self.builds,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "provider_days_rebuilt": self.provider_days_rebuilt,
+            "last_build": self.last_build.isoformat() if self.last_build else None
+        }
+
+    async def run(self):
+        """Build loop; started from the app lifespan and cancelled on shutdown."""
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    days = await TimingSketchService.build(db)
+                if days is None:
+                    self.skipped += 1
+                else:
+                    self.builds += 1
+                    self.provider_days_rebuilt += days
+                    self.last_build = datetime.now(timezone.utc)
+            except Exception as exc:
+                self.failures += 1
+                logger.warning(f"Timing sketch build failed: {exc}")
+            await asyncio.sleep(self.interval)
+
+
+timing_sketch_builder = TimingSketchBuilder(setting("TIMING_SKETCH_SECONDS"))
+
+
+async def main(args):
+    async with AsyncSessionLocal() as db:
+        if args.command == "rebuild":
+            days = await TimingSketchService.rebuild(db, args.start, args.end)
+            print(f"Rebuilt timing sketches for {days} provider/days")
+            return
+
+        days = await TimingSketchService.build(db)
+        if days is None:
+            print("Another build is running")
+        else:
+            print(f"Rebuilt timing sketches for {days} provider/days")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["build", "rebuild"])
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today() - timedelta(days=365))
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today())
+    asyncio.run(main(parser.parse_args()))
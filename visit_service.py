@@ -4,8 +4,9 @@ from typing import Optional, List
 from uuid import UUID
 
 from app.db.models import Visit, Appointment
-from app.schemas.visit import VisitCreate, VisitUpdate
+from app.schemas.visit import VisitCreate, VisitUpdate, VisitResponse
 from app.utils.exceptions import NotFoundError, ValidationError
+from app.utils.fieldsets import field_columns, select_fields
 
 
 class VisitService:
@@ -54,9 +55,17 @@ class VisitService:
     @staticmethod
     async def get_visit(
         db: AsyncSession,
-        visit_id: UUID
+        visit_id: UUID,
+        fields: Optional[List[str]] = None
     ) -> Optional[Visit]:
-        """Get visit by ID."""
+        """Get visit by ID, or a row of just `fields` when given."""
+        if fields:
+            result = await db.execute(
+                select(*select_fields(field_columns(Visit, VisitResponse), fields))
+                .where(Visit.visit_id == visit_id)
+            )
+            return result.mappings().one_or_none()
+        
         result = await db.execute(
             select(Visit).where(Visit.visit_id == visit_id)
         )
@@ -68,10 +77,20 @@ class VisitService:
         patient_id: Optional[UUID] = None,
         provider_id: Optional[UUID] = None,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        fields: Optional[List[str]] = None
     ) -> List[Visit]:
-        """List visits with filters."""
-        query = select(Visit)
+        """
+        List visits with filters.
+        
+        With `fields`, only those columns are selected and rows are returned
+        as mappings, so the notes, treatment_plan and prescriptions columns
+        are not read unless asked for.
+        """
+        if fields:
+            query = select(*select_fields(field_columns(Visit, VisitResponse), fields))
+        else:
+            query = select(Visit)
         
         if patient_id:
             query = query.where(Visit.patient_id == patient_id)
@@ -81,7 +100,7 @@ class VisitService:
         
         query = query.order_by(Visit.visit_date.desc()).offset(skip).limit(limit)
         result = await db.execute(query)
-        return result.scalars().all()
+        return result.mappings().all() if fields else result.scalars().all()
     
     @staticmethod
     async def update_visit(
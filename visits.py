@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
+from datetime import date
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db, is_sticky
 from app.core.visit_service import VisitService
+from app.core.export_service import ExportService, EXPORT_MEDIA_TYPES
+from app.utils.fast_json import fast_json_response, fast_json_object
+from app.utils.fieldsets import parse_fields
 from app.schemas.visit import VisitCreate, VisitUpdate, VisitResponse
 from app.utils.exceptions import NotFoundError, ValidationError
 
@@ -42,28 +47,82 @@ async def list_visits(
     provider_id: Optional[UUID] = Query(None, description="Filter by provider"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    fast: bool = Query(False, description="Encode rows directly with orjson, skipping model validation"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. visit_id,visit_date,diagnosis"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     List visit records with optional filters.
     """
-    return await VisitService.list_visits(db, patient_id, provider_id, skip, limit)
+    try:
+        selected = parse_fields(fields)
+        visits = await VisitService.list_visits(db, patient_id, provider_id, skip, limit, selected)
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
+    
+    if fast or selected:
+        return fast_json_response(visits, VisitResponse, selected)
+    return visits
+
+
+@router.get("/export")
+async def export_visits(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    patient_id: Optional[UUID] = Query(None, description="Filter by patient"),
+    provider_id: Optional[UUID] = Query(None, description="Filter by provider"),
+    start_date: Optional[date] = Query(None, description="Earliest visit date"),
+    end_date: Optional[date] = Query(None, description="Latest visit date")
+):
+    """
+    Stream all matching visit records as NDJSON or CSV.
+    
+    Rows are read from a server-side cursor and written as they arrive,
+    oldest first, so exports of any size use bounded memory.
+    """
+    if start_date and end_date and end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must be on or after start_date"
+        )
+    
+    return StreamingResponse(
+        ExportService.stream_visits(
+            format, patient_id, provider_id, start_date, end_date,
+            sticky=is_sticky(request)
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=visits.{format}"}
+    )
 
 
 @router.get("/{visit_id}", response_model=VisitResponse)
 async def get_visit(
     visit_id: UUID,
-    db: AsyncSession = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. visit_id,visit_date,diagnosis"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get a specific visit record by ID.
     """
-    visit = await VisitService.get_visit(db, visit_id)
+    try:
+        selected = parse_fields(fields)
+        visit = await VisitService.get_visit(db, visit_id, selected)
+    except ValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail={
+            "error": e.error_code,
+            "message": e.message
+        })
     if not visit:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Visit not found"
         )
+    if selected:
+        return fast_json_object(visit, VisitResponse, selected)
     return visit
 
 